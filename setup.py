@@ -7,6 +7,7 @@ setup(
     install_requires=[
         "typing",
         "dataclasses",
+        "numpy",
     ],
     author="littlekickoffkittie",
     author_email="littlekickoffkittie@example.com",
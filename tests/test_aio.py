@@ -0,0 +1,63 @@
+import asyncio
+import threading
+import time
+
+from triadnet import AsyncMiner, Blockchain, FractalCoordinate, Transaction, Wallet
+from triadnet.consensus import ConsensusManager
+
+def test_async_miner_streams_blocks_and_stops_promptly():
+    async def scenario():
+        chain = Blockchain(difficulty=2, genesis_timestamp=0)
+        miner = AsyncMiner(Wallet(), chain, FractalCoordinate(1, 2, 3), auto_adjust_coords=False,
+                           consensus=ConsensusManager(chain, retarget=False))
+        chain.balances["alice"] = 10.0
+        await miner.submit(Transaction("alice", "bob", 1.0, timestamp=1.0))
+        feed = chain.new_blocks()
+        await miner.start()
+        assert (await miner.status())["active"]
+        blocks = []
+        async for block in feed:
+            blocks.append(block)
+            if len(blocks) == 3:
+                break
+        await feed.aclose()
+        started = time.monotonic()
+        await miner.stop()
+        assert time.monotonic() - started < 1.0
+        status = await miner.status()
+        assert not status["active"] and status["stats"]["blocks_mined"] >= 3
+        assert [b.index for b in blocks] == [1, 2, 3]
+        assert chain.get_balance("bob") == 1.0
+        assert not chain._listeners
+    asyncio.run(asyncio.wait_for(scenario(), 30))
+
+def test_new_blocks_wakes_on_blocks_connected_from_other_threads():
+    async def scenario():
+        chain = Blockchain(difficulty=1, genesis_timestamp=0)
+        consensus = ConsensusManager(chain, retarget=False)
+        feed = chain.new_blocks()
+        waiter = asyncio.ensure_future(feed.__anext__())
+        await asyncio.sleep(0)
+        worker = threading.Thread(
+            target=lambda: consensus.mine_block(consensus.create_block("m", FractalCoordinate(1, 2, 3)))
+        )
+        worker.start()
+        block = await asyncio.wait_for(waiter, 5)
+        worker.join()
+        assert block.hash == chain.last_block.hash
+        await feed.aclose()
+    asyncio.run(scenario())
+
+def test_new_blocks_keeps_blocks_connected_before_first_iteration():
+    async def scenario():
+        chain = Blockchain(difficulty=1, genesis_timestamp=0)
+        consensus = ConsensusManager(chain, retarget=False)
+        feed = chain.new_blocks()
+        assert consensus.mine_block(consensus.create_block("m", FractalCoordinate(1, 2, 3))).success
+        block = await asyncio.wait_for(feed.__anext__(), 5)
+        assert block.hash == chain.last_block.hash
+        await feed.aclose()
+        assert not chain._listeners
+        async for _ in feed:
+            raise AssertionError("closed feed yielded a block")
+    asyncio.run(scenario())
@@ -0,0 +1,56 @@
+import numpy as np
+
+from triadnet import Blockchain, Transaction
+from triadnet.analytics import ChainAnalytics
+from tests.test_chain import make_block
+
+def build_chain(analytics, blocks):
+    chain = Blockchain(difficulty=1, genesis_timestamp=0)
+    analytics.attach(chain)
+    tip = chain.last_block
+    for i in range(blocks):
+        txs = [Transaction("alice", "bob", 1.0, timestamp=float(i))] * (i % 3)
+        tip = make_block(tip, "m", txs)
+        chain.add_block(tip)
+    return chain
+
+def test_rollups_match_raw_columns_and_survive_reorgs(tmp_path):
+    analytics = ChainAnalytics(str(tmp_path))
+    chain = build_chain(analytics, 300)
+    assert len(analytics) == 301
+    series = analytics.series("tx_count", points=20)
+    assert len(series) <= 20 and series[0]["start_height"] == 0
+    raw = analytics.columns.column("tx_count").astype(float)
+    assert sum(point["mean"] * 16 for point in series[:-1]) == raw[:16 * (len(series) - 1)].sum()
+    assert analytics.summary()["windows"]["10"]["mean_block_time"] == 1.0
+
+    fork = chain.chain[295]
+    for _ in range(7):
+        fork = make_block(fork, "x", [Transaction("x", "y", 1.0, timestamp=1.0)] * 5)
+        chain.add_block(fork)
+    assert chain.last_block.hash == fork.hash and len(analytics) == 303
+    fresh = ChainAnalytics(str(tmp_path / "rebuilt"))
+    fresh.attach(chain)
+    for a, b in zip(analytics.rollups, fresh.rollups):
+        assert a.count == b.count and a.stats == b.stats
+    assert analytics.windows[100].duration_sum == fresh.windows[100].duration_sum
+
+def test_readonly_reader_follows_writer(tmp_path):
+    writer = ChainAnalytics(str(tmp_path))
+    build_chain(writer, 40)
+    reader = ChainAnalytics(str(tmp_path), readonly=True)
+    assert len(reader) == 41
+    writer.block_connected(writer.blockchain.last_block, 41)
+    reader.refresh()
+    assert len(reader) == 42
+    assert reader.series("duration", points=1000)[-1]["mean"] == 0.0
+    histogram = reader.coordinate_histogram(bins=4)
+    assert sum(histogram["a"]["counts"]) == 42
+
+def test_difficulty_column_records_each_blocks_work(tmp_path):
+    from triadnet.analytics import hash_difficulty
+    analytics = ChainAnalytics(str(tmp_path))
+    chain = build_chain(analytics, 30)
+    recorded = analytics.columns.column("difficulty").tolist()
+    assert recorded == [hash_difficulty(block.hash) for block in chain.chain]
+    assert all(d >= 1 for d in recorded[1:]) and hash_difficulty("00a0") == 2
@@ -0,0 +1,356 @@
+import os
+
+from triadnet import Block, Blockchain, Transaction, FractalCoordinate
+from triadnet.enum import BlockStatus
+
+def make_block(parent, miner, txs=(), difficulty=1):
+    block = Block(
+        index=parent.index + 1,
+        timestamp=parent.timestamp + 1,
+        transactions=list(txs),
+        previous_hash=parent.hash,
+        miner=miner,
+        fractal_coord=FractalCoordinate(1, 2, 3)
+    )
+    while True:
+        block.hash = block.calculate_hash()
+        if block.hash.startswith("0" * difficulty):
+            return block
+        block.nonce += 1
+
+def test_out_of_order_blocks_connect_through_orphan_pool():
+    chain = Blockchain(difficulty=1, genesis_timestamp=0)
+    b1 = make_block(chain.last_block, "m")
+    b2 = make_block(b1, "m")
+    assert chain.process_block(b2) == BlockStatus.ORPHAN
+    assert chain.process_block(b1) == BlockStatus.CONNECTED
+    assert chain.last_block.hash == b2.hash
+    assert not chain.orphans
+
+def test_reorg_unwinds_balances_and_returns_transactions():
+    chain = Blockchain(difficulty=1, genesis_timestamp=0)
+    genesis = chain.last_block
+    pay = Transaction("alice", "bob", 5.0, "x", timestamp=1.0)
+    chain.add_pending_transaction(pay)
+    a1 = make_block(genesis, "a", [pay, Transaction("network", "a", 50, "Mining Reward", timestamp=1.0)])
+    assert chain.process_block(a1) == BlockStatus.CONNECTED
+    assert chain.get_balance("bob") == 5.0
+    assert chain.pending_transactions == []
+
+    b1 = make_block(genesis, "b")
+    b2 = make_block(b1, "b")
+    assert chain.process_block(b1) == BlockStatus.SIDE_CHAIN
+    assert chain.process_block(b2) == BlockStatus.REORGANIZED
+    assert [b.hash for b in chain.chain] == [genesis.hash, b1.hash, b2.hash]
+    assert chain.get_balance("bob") == 0.0
+    assert chain.get_balance("a") == 0.0
+    assert [tx.tx_id for tx in chain.pending_transactions] == [pay.tx_id]
+
+def test_undo_records_stop_at_reorg_depth():
+    from triadnet.core.blockchain import MAX_REORG_DEPTH
+    chain = Blockchain(difficulty=1, genesis_timestamp=0)
+    tip = chain.last_block
+    for _ in range(MAX_REORG_DEPTH + 30):
+        tip = make_block(tip, "m")
+        chain.add_block(tip)
+    assert set(chain._undo) == {block.hash for block in chain.chain[-MAX_REORG_DEPTH:]}
+    assert len(chain.undo_records()) == MAX_REORG_DEPTH
+
+def test_failed_branch_blocks_and_descendants_are_invalid():
+    chain = Blockchain(difficulty=1, genesis_timestamp=0)
+    genesis = chain.last_block
+    a1 = make_block(genesis, "a")
+    chain.add_block(a1)
+    chain.add_block(make_block(a1, "a"))
+    b1 = Block(index=1, timestamp=1.0, transactions=[], previous_hash=genesis.hash, miner="b",
+               fractal_coord=FractalCoordinate(1, 2, 3), state_root="11" * 32)
+    b1.hash = b1.calculate_hash()
+    while not b1.hash.startswith("0"):
+        b1.nonce += 1
+        b1.hash = b1.calculate_hash()
+    b2 = make_block(b1, "b")
+    b3 = make_block(b2, "b")
+    assert chain.process_block(b1) == BlockStatus.SIDE_CHAIN
+    assert chain.process_block(b2) == BlockStatus.SIDE_CHAIN
+    assert chain.process_block(b3) == BlockStatus.SIDE_CHAIN
+    # The reorg to b3 fails at b1, so the whole branch is now known bad.
+    assert chain.invalid_blocks == {b1.hash, b2.hash, b3.hash}
+    assert chain.process_block(make_block(b3, "b")) == BlockStatus.INVALID
+    assert chain.process_block(b2) == BlockStatus.INVALID
+    assert chain.last_block.index == 2 and chain.last_block.miner == "a"
+
+def test_block_filters_match_touched_addresses_and_follow_reorgs():
+    from triadnet.core.filters import BlockFilterIndex, LightWalletScanner, GENESIS_FILTER_HEADER
+    chain = Blockchain(difficulty=1, genesis_timestamp=0)
+    index = BlockFilterIndex(chain)
+    genesis = chain.last_block
+    a1 = make_block(genesis, "a", [Transaction("alice", "carol", 1.0, timestamp=1.0)])
+    chain.add_block(a1)
+    header_a1 = index.get_filter_header(1)
+
+    scanner = LightWalletScanner(["carol"])
+    filters = index.get_filters(0, 1)
+    assert scanner.verify_filters(filters, GENESIS_FILTER_HEADER, index.get_filter_headers(0, 1))
+    assert [h for h, _ in scanner.matching_blocks(filters)] == [1]
+    assert scanner.scan(filters, chain.blocks.__getitem__)[0][1].hash == a1.hash
+
+    b1 = make_block(genesis, "b")
+    chain.add_block(b1)
+    chain.add_block(make_block(b1, "b"))
+    assert index.get_filter_header(1) != header_a1
+    assert LightWalletScanner(["carol"]).matching_blocks(index.get_filters(0, 2)) == []
+
+def test_block_filters_persist_and_build_lazily_on_pruned_chains(tmp_path):
+    from triadnet.core.blockchain import PrunedChain
+    from triadnet.core.filters import BlockFilterIndex
+    chain = Blockchain(difficulty=1, genesis_timestamp=0)
+    path = str(tmp_path / "filters.sqlite")
+    index = BlockFilterIndex(chain, path)
+    tip = chain.last_block
+    for i in range(20):
+        tip = make_block(tip, "m", [Transaction("alice", f"user{i}", 1.0, timestamp=float(i))])
+        chain.add_block(tip)
+    headers = index.get_filter_headers(0, 20)
+    blocks = list(chain.chain)
+    loaded = []
+    def load(height):
+        loaded.append(height)
+        return blocks[height]
+    chain.chain = PrunedChain(15, blocks[15:], load)
+
+    reopened = BlockFilterIndex(chain, path)
+    assert reopened.get_filter_headers(0, 20) == headers and loaded == []
+    lazy = BlockFilterIndex(chain)
+    assert loaded == []
+    assert lazy.get_filter_header(20) == headers[20]
+    assert sorted(loaded) == list(range(15))
+    chain.add_block(make_block(tip, "m"))
+    assert len(lazy.get_filter_headers(0, 30)) == 22
+
+def test_transaction_index_pages_history_and_survives_reopen(tmp_path):
+    from triadnet.core.txindex import TransactionIndex
+    chain = Blockchain(difficulty=1, genesis_timestamp=0)
+    path = str(tmp_path / "txindex.sqlite")
+    index = TransactionIndex(chain, path)
+    tip = chain.last_block
+    for i in range(5):
+        tip = make_block(tip, "m", [Transaction("alice", "bob", float(i + 1), timestamp=float(i))])
+        chain.add_block(tip)
+    paid = chain.chain[3].transactions[0]
+    assert index.locate(paid.tx_id).height == 3
+
+    first = index.history("bob", limit=2)
+    assert [p.height for p in first] == [5, 4]
+    second = index.history("bob", limit=2, before=first[-1].cursor)
+    assert [p.height for p in second] == [3, 2]
+    assert index.history("alice", limit=1)[0].direction == "out"
+
+    index.close()
+    tip = make_block(tip, "m", [Transaction("carol", "bob", 9.0, timestamp=9.0)])
+    chain.add_block(tip)
+    reopened = TransactionIndex(chain, path)
+    assert reopened.history_count("bob") == 6
+    assert reopened.locate(tip.transactions[0].tx_id).height == 6
+
+def test_bootstrap_from_snapshot_replays_only_later_blocks(tmp_path):
+    from triadnet.core.storage import BlockStore
+    from triadnet.core.snapshot import SnapshotManager, bootstrap, latest_snapshot
+    store = BlockStore(str(tmp_path / "blocks.jsonl"))
+    chain = bootstrap(store, difficulty=1)
+    SnapshotManager(chain, str(tmp_path / "snapshots"), interval=3)
+    tip = chain.last_block
+    for i in range(7):
+        tip = make_block(tip, "m", [Transaction("alice", f"user{i % 2}", 2.0, timestamp=float(i))])
+        chain.add_block(tip)
+    store.close()
+
+    assert latest_snapshot(str(tmp_path / "snapshots")).height == 6
+    reopened_store = BlockStore(str(tmp_path / "blocks.jsonl"))
+    restored = bootstrap(reopened_store, str(tmp_path / "snapshots"), difficulty=1)
+    assert restored.last_block.hash == tip.hash
+    assert restored.balances == chain.balances
+
+    side = make_block(restored.chain[6], "x")
+    restored.add_block(side)
+    restored.add_block(make_block(side, "x"))
+    assert restored.get_balance("user0") == chain.get_balance("user0") - 2.0
+    assert len(reopened_store) == 9
+
+def test_bootstrap_reads_only_blocks_within_reorg_depth(tmp_path, monkeypatch):
+    from triadnet.core import snapshot as snapshot_module
+    from triadnet.core.storage import BlockStore
+    monkeypatch.setattr(snapshot_module, "MAX_REORG_DEPTH", 3)
+    store = BlockStore(str(tmp_path / "blocks.jsonl"))
+    chain = snapshot_module.bootstrap(store, difficulty=1)
+    snapshot_module.SnapshotManager(chain, str(tmp_path / "snapshots"), interval=10)
+    tip = chain.last_block
+    for i in range(12):
+        tip = make_block(tip, "m", [Transaction("alice", "bob", 1.0, timestamp=float(i))])
+        chain.add_block(tip)
+    store.close()
+
+    reopened = BlockStore(str(tmp_path / "blocks.jsonl"))
+    reads = []
+    original_read = reopened.read
+    monkeypatch.setattr(reopened, "read", lambda height: reads.append(height) or original_read(height))
+    restored = snapshot_module.bootstrap(reopened, str(tmp_path / "snapshots"), difficulty=1)
+    assert restored.last_block.hash == tip.hash
+    assert restored.balances == chain.balances
+    assert 0 < len(reads) <= 10 and min(h for h in reads if h) >= 7
+    assert restored.chain[2].hash == chain.chain[2].hash
+    assert len(restored.chain) == 13 and restored.is_valid_chain()
+
+def test_archive_seals_old_blocks_and_reads_single_frames(tmp_path):
+    from triadnet.core.archive import BlockArchive
+    from triadnet.core.storage import BlockStore
+    from triadnet.core.snapshot import bootstrap
+    archive = BlockArchive(str(tmp_path / "archive"))
+    store = BlockStore(str(tmp_path / "blocks.jsonl"), archive=archive)
+    chain = bootstrap(store, difficulty=1)
+    tip = chain.last_block
+    for i in range(25):
+        txs = [Transaction(f"TX{j:040d}", f"TX{j + 1:040d}", 1.0, timestamp=float(i)) for j in range(5)]
+        tip = make_block(tip, "m", txs)
+        chain.add_block(tip)
+    raw_size = sum(len(store.read_raw(h)) for h in range(len(store)))
+
+    assert archive.seal(store, segment_size=10, keep_recent=5) == 2
+    assert store.base_height == 20 and len(store) == 26
+    assert store.read(7).hash == chain.chain[7].hash
+    packed = sum(os.path.getsize(segment.path) for segment in archive.segments)
+    assert packed < raw_size * 20 / 26 / 2
+    store.close()
+
+    reopened = BlockStore(str(tmp_path / "blocks.jsonl"), archive=BlockArchive(str(tmp_path / "archive")))
+    restored = bootstrap(reopened, difficulty=1)
+    assert restored.last_block.hash == tip.hash
+    assert restored.balances == chain.balances
+
+def test_archive_seal_recovers_from_crash_before_prefix_drop(tmp_path):
+    from triadnet.core.archive import BlockArchive
+    from triadnet.core.storage import BlockStore
+    archive = BlockArchive(str(tmp_path / "archive"))
+    store = BlockStore(str(tmp_path / "blocks.jsonl"), archive=archive)
+    chain = Blockchain(difficulty=1, genesis_timestamp=0)
+    store.attach(chain)
+    tip = chain.last_block
+    for i in range(30):
+        tip = make_block(tip, "m", [Transaction("alice", "bob", 1.0, timestamp=float(i))])
+        chain.add_block(tip)
+    archive.append_segment(0, [store.read_raw(h) for h in range(10)])
+
+    assert archive.seal(store, segment_size=10, keep_recent=5) == 1
+    assert store.base_height == 20 and archive.stop_height == 20
+    assert store.read(5).hash == chain.chain[5].hash
+
+def test_blocks_with_forged_hashes_are_rejected():
+    chain = Blockchain(difficulty=1, genesis_timestamp=0)
+    honest = make_block(chain.last_block, "a")
+    chain.add_block(honest)
+    forged = Block(
+        index=1, timestamp=5.0, previous_hash=chain.chain[0].hash, miner="evil",
+        transactions=[Transaction("network", "evil", 1e9, timestamp=5.0)],
+        fractal_coord=FractalCoordinate(1, 2, 3)
+    )
+    forged.hash = "0" * 64
+    assert chain.process_block(forged) == BlockStatus.INVALID
+    orphan = make_block(honest, "evil")
+    orphan.previous_hash = "f" * 64
+    assert chain.process_block(orphan) == BlockStatus.INVALID
+    assert not chain.orphans
+    assert chain.get_balance("evil") == 0.0
+
+def test_block_index_ancestors_and_fork_point():
+    from triadnet.core.block_index import BlockIndex, last_common_ancestor
+    index = BlockIndex()
+    index.add_root("h0", 0, 1)
+    for height in range(1, 5000):
+        index.add(f"h{height}", f"h{height - 1}", 1)
+    index.add("f3000", "h2999", 1)
+    for height in range(3001, 3500):
+        index.add(f"f{height}", f"f{height - 1}", 1)
+    tip, side = index["h4999"], index["f3499"]
+    assert all(tip.get_ancestor(h).hash == f"h{h}" for h in range(0, 5000, 7))
+    assert side.get_ancestor(2999).hash == "h2999" and side.get_ancestor(3200).hash == "f3200"
+    assert tip.work == 5000
+    assert last_common_ancestor(tip, side).hash == "h2999"
+    assert last_common_ancestor(side, index["h1000"]).hash == "h1000"
+
+def test_locator_finds_fork():
+    chain = Blockchain(difficulty=1, genesis_timestamp=0)
+    blocks = [chain.last_block]
+    for _ in range(30):
+        blocks.append(make_block(blocks[-1], "a"))
+        chain.add_block(blocks[-1])
+    other = Blockchain(difficulty=1, genesis_timestamp=0)
+    for block in blocks[1:21]:
+        other.add_block(block)
+    branch = blocks[20]
+    for _ in range(5):
+        branch = make_block(branch, "b")
+        other.add_block(branch)
+    locator = other.locator()
+    assert locator[0] == other.last_block.hash and locator[-1] == blocks[0].hash
+    assert chain.find_fork(locator) == 20
+    assert chain.get_ancestor(chain.last_block.hash, 12) == blocks[12].hash
+    assert other.fork_point(branch.hash, blocks[20].hash) == blocks[20].hash
+
+def test_compact_transactions_preserve_block_hash():
+    from triadnet.core.columns import TransactionColumns
+    chain = Blockchain(difficulty=1, genesis_timestamp=0)
+    txs = [
+        Transaction("alice", "bob", 2.5, "memo", timestamp=1.0, fee=0.25),
+        Transaction("bob", "carol", 3, timestamp=2, tx_id="wallet-id", signature="c2ln"),
+        Transaction("network", "m", 50, "Mining Reward", timestamp=3.0, extranonce=7),
+    ]
+    block = make_block(chain.last_block, "m", txs)
+    block.compact_transactions()
+    assert isinstance(block.transactions, TransactionColumns)
+    assert block.calculate_hash() == block.hash
+    assert [tx.to_dict() for tx in block.transactions] == [tx.to_dict() for tx in txs]
+    assert block.transactions[-1].amount == 50 and type(block.transactions[-1].amount) is int
+    assert chain.add_block(block)
+    assert chain.get_balance("carol") == 3
+
+def test_buried_blocks_are_compacted_and_still_reorg():
+    from triadnet.core.blockchain import COMPACT_DEPTH
+    from triadnet.core.columns import TransactionColumns
+    chain = Blockchain(difficulty=1, genesis_timestamp=0)
+    chain.balances["alice"] = 100.0
+    tip = chain.last_block
+    for i in range(COMPACT_DEPTH + 3):
+        tip = make_block(tip, "m", [Transaction("alice", "bob", 1.0, timestamp=float(i))])
+        chain.add_block(tip)
+    kinds = [isinstance(block.transactions, TransactionColumns) for block in chain.chain]
+    assert kinds == [False] + [True] * 3 + [False] * COMPACT_DEPTH
+    assert all(block.calculate_hash() == block.hash for block in chain.chain)
+
+    fork = chain.chain[1]
+    for _ in range(COMPACT_DEPTH + 4):
+        fork = make_block(fork, "x")
+        chain.add_block(fork)
+    assert chain.last_block.hash == fork.hash
+    assert len(chain.pending_transactions) == COMPACT_DEPTH + 2
+    assert chain.get_balance("alice") == 99.0
+
+def test_transactions_are_slotted_and_interned():
+    a = Transaction("".join(["ali", "ce"]), "bob", 1.0)
+    b = Transaction("".join(["al", "ice"]), "bob", 1.0)
+    assert not hasattr(a, "__dict__")
+    assert a.sender is b.sender
+    # The default timestamp is taken per transaction, not once at import.
+    import time
+    assert abs(a.timestamp - time.time()) < 60
+
+def test_transaction_index_nets_batches_that_pay_the_sender():
+    from triadnet.core.txindex import TransactionIndex
+    chain = Blockchain(difficulty=1, genesis_timestamp=0)
+    chain.balances["alice"] = 20.0
+    index = TransactionIndex(chain)
+    batch = Transaction.batch("alice", [("alice", 3.0), ("bob", 5.0), ("bob", 1.0)], timestamp=1.0, fee=0.5)
+    chain.add_block(make_block(chain.last_block, "m", [batch]))
+    [alice] = index.history("alice")
+    [bob] = index.history("bob")
+    assert (alice.direction, alice.amount) == ("out", -6.5)
+    assert (bob.direction, bob.amount) == ("in", 6.0)
+    assert chain.get_balance("alice") == 20.0 + alice.amount
@@ -0,0 +1,27 @@
+import numpy as np
+
+from triadnet import FractalCoordinate
+from triadnet.consensus.fractal_score import FractalScoreEngine, MAX_SCORE, MIN_SCORE, PERIOD
+
+def test_batch_and_cached_scores_agree():
+    engine = FractalScoreEngine()
+    a, b, c = np.array([0, 512, 700, 1023]), np.array([512, 512, 300, 0]), np.array([512, 500, 900, 5])
+    batch = engine.score_batch(a, b, c)
+    assert ((batch >= MIN_SCORE) & (batch <= MAX_SCORE)).all()
+    for i in range(len(a)):
+        assert engine.score(FractalCoordinate(int(a[i]), int(b[i]), int(c[i]))) == batch[i]
+    assert engine.score(FractalCoordinate(512, 512, 512)) == MAX_SCORE
+    assert engine.score(FractalCoordinate(512 + PERIOD, 512, 512)) == MAX_SCORE
+
+def test_best_near_matches_brute_force_and_reuses_tiles():
+    engine = FractalScoreEngine(max_tiles=64)
+    center = FractalCoordinate(600, 520, 480)
+    coord, score = engine.best_near(center, 6, MIN_SCORE)
+    grid = np.meshgrid(*(np.arange(v - 6, v + 7) for v in (600, 520, 480)), indexing="ij")
+    assert score == engine.score_batch(*grid).min()
+    assert max(abs(coord.a - 600), abs(coord.b - 520), abs(coord.c - 480)) <= 6
+    misses = engine.misses
+    engine.best_near(center, 6, MAX_SCORE)
+    assert engine.misses == misses and engine.hits > 0
+    engine.region((0, 0, 0), (16 * 5, 16 * 5, 16 * 5))
+    assert len(engine._tiles) == 64
@@ -0,0 +1,67 @@
+import json
+
+from triadnet import Blockchain, FractalCoordinate
+from triadnet.consensus import ConsensusManager
+from triadnet.core.header_proof import build_header_proof, verify_header_proof
+from triadnet.core.mmr import HeaderMMR, verify_inclusion
+from triadnet.enum import BlockStatus
+
+def mined_chain(blocks):
+    chain = Blockchain(difficulty=1, genesis_timestamp=0)
+    consensus = ConsensusManager(chain, retarget=False)
+    for i in range(blocks):
+        assert consensus.mine_block(consensus.create_block(f"m{i % 3}", FractalCoordinate(1, 2, 3))).success
+    return chain, consensus
+
+def test_mmr_proves_every_leaf_of_every_prefix():
+    hashes = [f"{i:064x}" for i in range(40)]
+    mmr = HeaderMMR()
+    for h in hashes:
+        mmr.append(h)
+    for size in (1, 5, 16, 40):
+        for leaf in range(size):
+            assert verify_inclusion(mmr.root(size), size, leaf, hashes[leaf], mmr.prove(leaf, size))
+    assert not verify_inclusion(mmr.root(), 40, 3, hashes[4], mmr.prove(3))
+
+def test_header_proof_verifies_with_few_headers():
+    chain, _ = mined_chain(300)
+    proof = build_header_proof(chain)
+    result = verify_header_proof(proof, chain.chain[0].hash, chain.difficulty)
+    assert result.valid and result.height == 300 and result.tip_hash == chain.last_block.hash
+    assert len(proof["samples"]) < 50
+    assert len(json.dumps(proof)) < 64 * 1024
+
+    forged = json.loads(json.dumps(proof))
+    forged["samples"][3]["header"]["miner"] = "mallory"
+    assert not verify_header_proof(forged, chain.chain[0].hash, chain.difficulty).valid
+
+def test_blocks_must_commit_to_header_history():
+    chain, consensus = mined_chain(3)
+    block = consensus.create_block("m", FractalCoordinate(1, 2, 3))
+    block.mmr_root = "00" * 32
+    consensus.pofw.mine_block(block)
+    assert chain.process_block(block) == BlockStatus.INVALID
+    block = consensus.create_block("m", FractalCoordinate(1, 2, 3))
+    block.mmr_root = ""
+    consensus.pofw.mine_block(block)
+    assert chain.process_block(block) == BlockStatus.INVALID
+
+def test_snapshot_bootstrap_keeps_header_commitments(tmp_path, monkeypatch):
+    from triadnet.core import snapshot as snapshot_module
+    from triadnet.core.storage import BlockStore
+    monkeypatch.setattr(snapshot_module, "MAX_REORG_DEPTH", 3)
+    store = BlockStore(str(tmp_path / "blocks.jsonl"))
+    chain = snapshot_module.bootstrap(store, difficulty=1)
+    snapshot_module.SnapshotManager(chain, str(tmp_path / "snapshots"), interval=10)
+    consensus = ConsensusManager(chain, retarget=False)
+    for _ in range(12):
+        assert consensus.mine_block(consensus.create_block("m", FractalCoordinate(1, 2, 3))).success
+    store.close()
+
+    restored = snapshot_module.bootstrap(BlockStore(str(tmp_path / "blocks.jsonl")), str(tmp_path / "snapshots"), difficulty=1)
+    assert not restored.header_mmr.can_prove
+    assert restored.header_mmr.root() == chain.header_mmr.root()
+    restored_consensus = ConsensusManager(restored, retarget=False)
+    assert restored_consensus.mine_block(restored_consensus.create_block("m", FractalCoordinate(1, 2, 3))).success
+    proof = build_header_proof(restored)
+    assert verify_header_proof(proof, chain.chain[0].hash, 1).valid
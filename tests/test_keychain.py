@@ -0,0 +1,52 @@
+import os
+
+from triadnet.keychain import Keychain, Keystore, RECORD_SIZE, derive_child, master_node, verify_signature
+
+SEED = bytes.fromhex("000102030405060708090a0b0c0d0e0f")
+
+def test_slip10_vector():
+    key, chain_code = master_node(SEED)
+    assert key.hex() == "2b4be7f19ee27bbf30c667b642d5f4aa69fd169872f8fc3059c08ebae2eb19e7"
+    key, chain_code = derive_child(key, chain_code, 0)
+    assert key.hex() == "68e0fe46dfb67e368c75379acec591dad19df3cde26e63b93a8e704f1dade7a3"
+    assert chain_code.hex() == "8b59aa11380b624e81507a27fedda59fea6d0b779a778918a2fd3590e16e9c69"
+
+def test_derivation_is_deterministic():
+    first = Keychain(SEED).derive_batch(0, 5)
+    second = Keychain(SEED).derive_batch(0, 5)
+    assert [k.address for k in first] == [k.address for k in second]
+    assert len({k.address for k in first}) == 5
+    assert Keychain(SEED, account=1).derive(0).address != first[0].address
+
+def test_child_keys_sign():
+    child = Keychain(SEED).derive(7)
+    signature = child.sign(b"payload")
+    assert verify_signature(child.public_key, signature, b"payload")
+    assert not verify_signature(child.public_key, signature, b"tampered")
+
+def test_keystore_round_trip(tmp_path):
+    path = str(tmp_path / "keys.dat")
+    store = Keystore.create(path, Keychain(SEED), count=20)
+    expected = [k.address for k in Keychain(SEED).derive_batch(0, 25)]
+    assert store.issue(5) == expected[20:]
+
+    reopened = Keystore(path)
+    assert len(reopened) == 25
+    assert reopened.address(13) == expected[13]
+    assert reopened.index_of(expected[24]) == 24
+    assert reopened.key(3).address == expected[3]
+    assert reopened.index_of("TXunknown") is None
+    # The header holds the seed in plaintext.
+    assert os.stat(path).st_mode & 0o077 == 0
+
+def test_keystore_overwrites_torn_record(tmp_path):
+    path = str(tmp_path / "keys.dat")
+    Keystore.create(path, Keychain(SEED), count=3)
+    with open(path, "a") as f:
+        f.write("0000000003 TXpartial")
+    store = Keystore(path)
+    assert len(store) == 3
+    store.issue(1)
+    assert len(store) == 4
+    assert store.address(3) == Keychain(SEED).derive(3).address
+    assert (tmp_path / "keys.dat").stat().st_size == store._records_start + 4 * RECORD_SIZE
@@ -0,0 +1,49 @@
+import io
+import json
+import logging
+import threading
+
+from triadnet import logs
+from triadnet.logs import RateLimitFilter, configure_logging, shutdown_logging
+
+def test_pipeline_writes_json_lines_off_thread_and_rate_limits():
+    stream = io.StringIO()
+    configure_logging(stream=stream, burst=3, interval=60.0)
+    try:
+        assert configure_logging(stream=io.StringIO()) is logs._handler
+        logger = logging.getLogger("triadnet.test")
+        for i in range(50):
+            logger.info("retry %d", i, extra={"event": "retry", "attempt": i})
+        assert len(logging.getLogger("triadnet").handlers) == 1
+        writer = [t for t in threading.enumerate() if t.name == "triadnet-log-writer"]
+        assert writer and writer[0] is not threading.current_thread()
+    finally:
+        shutdown_logging()
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [line["attempt"] for line in lines] == [0, 1, 2]
+    assert lines[0]["msg"] == "retry 0" and lines[0]["logger"] == "triadnet.test"
+    assert logging.getLogger("triadnet").propagate
+
+def test_rate_limit_reports_suppressed_count():
+    limiter = RateLimitFilter(burst=1, interval=0.0)
+    record = logging.LogRecord("triadnet.x", logging.INFO, "f.py", 1, "m", (), None)
+    assert limiter.filter(record) and not hasattr(record, "suppressed")
+    limiter.interval = 60.0
+    assert not limiter.filter(logging.LogRecord("triadnet.x", logging.INFO, "f.py", 1, "m", (), None))
+    limiter.interval = 0.0
+    later = logging.LogRecord("triadnet.x", logging.INFO, "f.py", 1, "m", (), None)
+    assert limiter.filter(later) and later.suppressed == 1
+
+def test_miners_do_not_add_handlers():
+    from triadnet import Blockchain, FractalCoordinate, Miner, Wallet
+    chain = Blockchain(difficulty=1, genesis_timestamp=0)
+    before = list(logging.getLogger("triadnet.miner").handlers)
+    Miner(Wallet(), chain, FractalCoordinate(1, 2, 3))
+    Miner(Wallet(), chain, FractalCoordinate(1, 2, 3))
+    assert logging.getLogger("triadnet.miner").handlers == before
+
+def test_rate_limit_never_drops_warnings():
+    limiter = RateLimitFilter(burst=1, interval=60.0)
+    records = [logging.LogRecord("triadnet.x", level, "f.py", 1, "m", (), None)
+               for level in (logging.INFO, logging.INFO, logging.WARNING, logging.ERROR, logging.ERROR)]
+    assert [limiter.filter(record) for record in records] == [True, False, True, True, True]
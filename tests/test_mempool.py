@@ -0,0 +1,74 @@
+from triadnet import Blockchain, FractalCoordinate, Transaction
+from triadnet.consensus import ConsensusManager, BLOCK_REWARD
+from triadnet.core.mempool import Mempool
+
+def tx(sender, fee, n=0):
+    return Transaction(sender, "bob", 1.0, f"n{n}", timestamp=1.0, fee=fee)
+
+def test_select_orders_by_fee_rate_within_weight():
+    pool = Mempool()
+    cheap, rich, middle = tx("a", 0.01), tx("b", 5.0), tx("c", 1.0)
+    for t in (cheap, rich, middle):
+        pool.add(t)
+    assert [t.tx_id for t in pool.select(10 ** 6)] == [rich.tx_id, middle.tx_id, cheap.tx_id]
+    assert [t.tx_id for t in pool.select(rich.weight() + middle.weight())] == [rich.tx_id, middle.tx_id]
+    assert not pool.add(rich)
+
+def test_select_keeps_sender_order():
+    pool = Mempool()
+    parent, child, other = tx("a", 0.0, 1), tx("a", 9.0, 2), tx("b", 1.0)
+    for t in (parent, child, other):
+        pool.add(t)
+    assert [t.tx_id for t in pool.select(10 ** 6)] == [other.tx_id, parent.tx_id, child.tx_id]
+    assert pool.select(other.weight() + parent.weight()) == [other, parent]
+    pool.remove([parent.tx_id])
+    assert pool.select(10 ** 6)[0].tx_id == child.tx_id
+
+def test_block_pays_fees_to_miner():
+    chain = Blockchain(difficulty=1, genesis_timestamp=0)
+    chain.balances["alice"] = 10.0
+    chain.add_pending_transaction(Transaction("alice", "bob", 2.0, timestamp=1.0, fee=0.5))
+    consensus = ConsensusManager(chain, retarget=False)
+    assert consensus.mine_block(consensus.create_block("miner", FractalCoordinate(1, 2, 3))).success
+    assert chain.get_balance("alice") == 7.5
+    assert chain.get_balance("miner") == BLOCK_REWARD + 0.5
+    assert len(chain.mempool) == 0
+
+def test_batch_transaction_pays_every_output_in_less_space():
+    from triadnet.consensus.pipeline import check_transaction
+    from triadnet.core.columns import TransactionColumns
+    outputs = [(f"customer{i}", 1.5) for i in range(100)]
+    batch = Transaction.batch("alice", outputs, timestamp=1.0, fee=0.5)
+    singles = [Transaction("alice", receiver, amount, timestamp=1.0) for receiver, amount in outputs]
+    assert batch.amount == 150.0 and check_transaction(batch)
+    assert batch.weight() * 2 < sum(tx.weight() for tx in singles)
+    assert Transaction.deserialize(batch.serialize()).tx_id == batch.tx_id
+    assert TransactionColumns([batch])[0].to_dict() == batch.to_dict()
+    assert not check_transaction(Transaction("alice", "batch", 1.0, timestamp=1.0))
+    forged = Transaction.from_dict({**batch.to_dict(), "amount": 1.0})
+    assert not check_transaction(forged)
+
+    chain = Blockchain(difficulty=1, genesis_timestamp=0)
+    chain.balances["alice"] = 200.0
+    chain.add_pending_transaction(batch)
+    consensus = ConsensusManager(chain, retarget=False)
+    block = consensus.create_block("miner", FractalCoordinate(1, 2, 3))
+    assert consensus.mine_block(block).success
+    assert chain.get_balance("alice") == 49.5
+    assert chain.get_balance("customer7") == 1.5
+    assert chain.get_balance("batch") == 0.0
+    assert chain.get_balance("miner") == BLOCK_REWARD + 0.5
+
+def test_restore_puts_returned_transactions_before_their_senders_pending_ones():
+    pool = Mempool()
+    pending, other = tx("a", 9.0, 3), tx("b", 1.0)
+    pool.add(pending)
+    pool.add(other)
+    older = [tx("a", 0.0, 2), tx("c", 2.0)]
+    pool.restore(older)
+    pool.restore([tx("a", 0.0, 1)])
+    assert [t.data for t in pool.transactions()] == ["n1", "n2", "n0", "n3", "n0"]
+    assert [(t.sender, t.data) for t in pool.select(10 ** 6)] == [
+        ("c", "n0"), ("b", "n0"), ("a", "n1"), ("a", "n2"), ("a", "n3")]
+    pool.remove([t.tx_id for t in older])
+    assert [(t.sender, t.data) for t in pool.select(10 ** 6)] == [("b", "n0"), ("a", "n1"), ("a", "n3")]
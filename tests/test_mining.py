@@ -0,0 +1,106 @@
+from triadnet import Blockchain, FractalCoordinate, Transaction
+from triadnet.consensus import ConsensusManager, ProofOfFractalWork
+
+def test_hash_template_matches_calculate_hash():
+    chain = Blockchain(difficulty=1)
+    block = ConsensusManager(chain).create_block("miner", FractalCoordinate(1, 2, 3))
+    prefix, suffix = block.hash_template()
+    for nonce in (0, 7, 123456):
+        block.nonce = nonce
+        h = prefix.copy()
+        h.update(b"%d" % nonce + suffix)
+        assert h.hexdigest() == block.calculate_hash()
+
+def test_mining_rolls_extranonce_instead_of_giving_up():
+    chain = Blockchain(difficulty=3)
+    block = ConsensusManager(chain).create_block("miner", FractalCoordinate(1, 2, 3))
+    result = ProofOfFractalWork(difficulty=3, retarget=False).mine_block(block, max_nonce=16)
+    assert result.success
+    assert block.transactions[-1].extranonce > 0
+    assert block.calculate_hash() == result.hash_val
+    assert result.hashes > 16
+
+def test_mining_stops_when_tip_moves():
+    chain = Blockchain(difficulty=1)
+    consensus = ConsensusManager(chain, retarget=False)
+    block = consensus.create_block("miner", FractalCoordinate(1, 2, 3))
+    competing = consensus.create_block("other", FractalCoordinate(3, 2, 1))
+    assert consensus.mine_block(competing).success
+    assert chain.last_block.hash == competing.hash
+    consensus.pofw = ProofOfFractalWork(difficulty=12, retarget=False)
+    result = consensus.mine_block(block, should_stop=None)
+    assert not result.success
+
+def test_template_refreshes_when_transactions_arrive(monkeypatch):
+    from triadnet import Transaction
+    from triadnet.consensus import proof_of_work
+    monkeypatch.setattr(proof_of_work, "TEMPLATE_REFRESH_INTERVAL", 0)
+    chain = Blockchain(difficulty=1)
+    consensus = ConsensusManager(chain, retarget=False)
+    consensus.pofw = ProofOfFractalWork(difficulty=12, retarget=False)
+    block = consensus.create_block("miner", FractalCoordinate(1, 2, 3))
+    arrivals = [Transaction("alice", "bob", 1.0, timestamp=1.0)]
+
+    def deliver_transaction():
+        while arrivals:
+            chain.add_pending_transaction(arrivals.pop())
+        return False
+    assert not consensus.mine_block(block, should_stop=deliver_transaction).success
+
+def test_import_pipeline_replays_chain_in_order():
+    from concurrent.futures import ThreadPoolExecutor
+    from triadnet.consensus import import_blocks
+    source = Blockchain(difficulty=1, genesis_timestamp=0)
+    consensus = ConsensusManager(source, retarget=False)
+    for i in range(12):
+        assert consensus.mine_block(consensus.create_block(f"m{i % 3}", FractalCoordinate(1, 2, 3))).success
+    raw = [block.to_dict() for block in source.chain[1:]]
+    raw[5]["transactions"][0]["amount"] = 1e9
+
+    target = Blockchain(difficulty=1, genesis_timestamp=0)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        report = import_blocks(target, raw, executor=executor, queue_size=2)
+    assert report.rejected == [raw[5]["hash"]]
+    assert report.statuses == {"CONNECTED": 5, "ORPHAN": 6}
+    assert target.last_block.hash == raw[4]["hash"]
+
+    replica = Blockchain(difficulty=1, genesis_timestamp=0)
+    report = import_blocks(replica, [block.to_dict() for block in source.chain[1:]], workers=2)
+    assert report.statuses == {"CONNECTED": 12}
+    assert replica.balances == source.balances
+
+def test_pipeline_verifiers_reject_tampered_and_unsigned_transactions():
+    import pickle
+    from triadnet.consensus.pipeline import SignatureVerifier, check_transaction
+    from triadnet.wallet import Wallet
+    wallet = Wallet()
+    wallet.balance = 10.0
+    tx = wallet.create_transaction("bob", 2.0)
+    assert check_transaction(tx)
+    tampered = Transaction.from_dict({**tx.to_dict(), "amount": 9.0})
+    assert not check_transaction(tampered)
+    forged = Transaction.from_dict({**Transaction("alice", "bob", 1.0).to_dict(), "tx_id": "x", "signature": "x"})
+    assert not check_transaction(forged)
+
+    verifier = pickle.loads(pickle.dumps(SignatureVerifier({wallet.address: wallet._public_pem})))
+    assert verifier(tx)
+    assert verifier(Transaction("network", "m", 50))
+    assert not verifier(Transaction(wallet.address, "bob", 1.0, signature=tx.signature))
+    assert not verifier(Transaction("stranger", "bob", 1.0, signature=tx.signature))
+
+def test_coordinate_search_runs_off_the_mining_thread(monkeypatch):
+    import time
+    import triadnet.mine
+    from triadnet import Miner, Wallet
+    def slow_search(coord, last_block_time):
+        time.sleep(0.2)
+        return FractalCoordinate(9, 9, 9), 1.0, "easier"
+    monkeypatch.setattr(triadnet.mine, "adjusted_coordinates", slow_search)
+    miner = Miner(Wallet(), Blockchain(difficulty=1, genesis_timestamp=0), FractalCoordinate(1, 2, 3))
+    started = time.monotonic()
+    miner._adjust_fractal_coordinates(500.0)
+    miner._adjust_fractal_coordinates(500.0)
+    assert time.monotonic() - started < 0.1
+    assert miner.fractal_coord == FractalCoordinate(1, 2, 3)
+    miner._adjust_thread.join()
+    assert miner.fractal_coord == FractalCoordinate(9, 9, 9)
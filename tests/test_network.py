@@ -0,0 +1,99 @@
+from triadnet.simulator import build_topology, LinkModel, Simulation
+
+def test_topologies_are_connected():
+    for name in ("full", "ring", "line", "star", "random"):
+        links = build_topology(name, 6, seed=7)
+        seen, frontier = {0}, [0]
+        while frontier:
+            for peer in links[frontier.pop()]:
+                if peer not in seen:
+                    seen.add(peer)
+                    frontier.append(peer)
+        assert seen == set(range(6))
+
+def test_simulation_reports_propagation():
+    sim = Simulation(nodes=3, topology="line", link_model=LinkModel(latency=0.01), difficulty=2, tx_rate=5, seed=3)
+    report = sim.run(1.0)
+    assert report.blocks_mined > 0
+    assert report.propagation["count"] > 0
+    assert 0.0 <= report.stale_rate <= 1.0
+
+def test_nodes_serve_filters_to_light_clients():
+    from triadnet import Transaction
+    from triadnet.core.filters import LightWalletScanner, parse_cfilters
+    from triadnet.simulator import SimNode
+    replies = []
+    node = SimNode(0, {1}, lambda src, dst, msg: replies.append(msg), difficulty=1)
+    node.submit_transaction(Transaction("alice", "carol", 2.0, timestamp=1.0))
+    block = node.consensus.create_block(node.address, node.fractal_coord)
+    assert node.consensus.mine_block(block).success
+    replies.clear()
+
+    node.handle_message(1, {"type": "getcfilters", "start_height": 0, "stop_height": 10})
+    filters, previous, headers = parse_cfilters(replies.pop())
+    scanner = LightWalletScanner(["carol"])
+    assert scanner.verify_filters(filters, previous, headers)
+    [(height, block_hash)] = scanner.matching_blocks(filters)
+    node.handle_message(1, {"type": "getblock", "hash": block_hash})
+    assert replies.pop()["block"]["hash"] == block.hash
+
+def test_gossip_delivers_each_item_once_per_node():
+    import socket
+    import time
+    from triadnet import Blockchain, Transaction
+    from triadnet.node import Node
+    from tests.test_chain import make_block
+
+    ports = []
+    for _ in range(4):
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            ports.append(s.getsockname()[1])
+    nodes = [Node(f"n{i}", port=port, blockchain=Blockchain(difficulty=1, genesis_timestamp=0))
+             for i, port in enumerate(ports)]
+    for node in nodes:
+        for other in nodes:
+            if other is not node:
+                node.add_peer(other.node_id, "127.0.0.1", other.port)
+        node.start_server()
+    time.sleep(0.2)
+
+    txs = [Transaction("alice", "bob", 1.0, timestamp=float(i)) for i in range(20)]
+    for tx in txs:
+        nodes[0].announce_transaction(tx)
+    block = make_block(nodes[0].blockchain.last_block, "m")
+    nodes[0].blockchain.add_block(block)
+    nodes[0].announce_block(block)
+
+    deadline = time.time() + 10
+    while time.time() < deadline and not all(
+            len(node.blockchain.pending_transactions) == 20 and node.blockchain.last_block.hash == block.hash
+            for node in nodes):
+        time.sleep(0.05)
+    for node in nodes[1:]:
+        assert len(node.blockchain.pending_transactions) == 20
+        assert node.blockchain.last_block.hash == block.hash
+        assert node.stats.get("tx_received") == 20
+        assert node.stats.get("duplicate_payloads", 0) == 0
+    assert nodes[0].stats["inv_sent"] <= 2 * 3
+    for node in nodes:
+        node.running = False
+
+def test_orphan_blocks_fetch_their_parent_from_the_sender():
+    from triadnet import Blockchain
+    from triadnet.node import Node
+    from tests.test_chain import make_block
+
+    node = Node("n0", blockchain=Blockchain(difficulty=1, genesis_timestamp=0))
+    node.add_peer("p", "127.0.0.1", 1)
+    sent = []
+    node.send = lambda peer_id, messages: sent.append((peer_id, messages))
+    b1 = make_block(node.blockchain.last_block, "m")
+    b2 = make_block(b1, "m")
+    node.handle_message({"type": "block", "block": b2.to_dict(), "sender": "p"})
+    assert sent == [("p", [{"type": "getdata", "items": [["block", b1.hash]]}])]
+    node.handle_message({"type": "block", "block": make_block(b1, "other").to_dict(), "sender": "p"})
+    assert len(sent) == 1
+    node.handle_message({"type": "block", "block": b1.to_dict(), "sender": "p"})
+    assert node.blockchain.last_block.hash == b2.hash
+    assert node.stats["parents_requested"] == 1 and node.stats["blocks_received"] == 3
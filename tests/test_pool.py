@@ -0,0 +1,65 @@
+import json
+import subprocess
+import sys
+import time
+
+from triadnet import Blockchain
+from triadnet.pool import PoolServer, WorkerSession
+
+def test_pool_validates_shares_and_credits_workers():
+    chain = Blockchain(difficulty=3, genesis_timestamp=0)
+    pool = PoolServer(chain, "pool", share_difficulty=1)
+    pool._new_job(clean=True)
+    chain.add_listener(pool)
+
+    class Conn:
+        def __init__(self):
+            self.sent = []
+        def sendall(self, data):
+            self.sent.append(json.loads(data))
+    session = WorkerSession(Conn())
+    pool.handle(session, 1, {"type": "subscribe", "worker": "rig"})
+    job = session.conn.sent[-1]
+    assert job["type"] == "job" and job["extranonce"] == session.extranonce
+
+    block_target = "0" * chain.difficulty
+    _, prefix, suffix = session.templates[(job["job_id"], job["extranonce"])]
+    results = []
+    for nonce in range(200000):
+        h = prefix.copy()
+        h.update(b"%d" % nonce + suffix)
+        digest = h.hexdigest()
+        if digest.startswith("0") and not digest.startswith(block_target):
+            results.append(pool.submit(session, job["job_id"], job["extranonce"], nonce))
+            assert pool.submit(session, job["job_id"], job["extranonce"], nonce)["reason"] == "duplicate"
+        elif digest.startswith(block_target):
+            found = pool.submit(session, job["job_id"], job["extranonce"], nonce)
+            break
+        elif len(results) < 3 and not digest.startswith("0"):
+            assert pool.submit(session, job["job_id"], job["extranonce"], nonce)["reason"] == "low difficulty"
+    assert all(result["accepted"] for result in results)
+    assert found["block"] and chain.last_block.index == 1
+    assert pool.credits["rig"] == len(results) + 1
+    assert session.conn.sent[-1]["clean"] and session.conn.sent[-1]["job_id"] > job["job_id"]
+    assert pool.submit(session, job["job_id"], job["extranonce"], 0)["reason"] == "stale"
+
+def test_standalone_workers_mine_through_pool():
+    chain = Blockchain(difficulty=2, genesis_timestamp=0)
+    pool = PoolServer(chain, "pool", share_difficulty=1)
+    port = pool.start()
+    workers = [
+        subprocess.Popen([sys.executable, "-m", "triadnet.pool", "worker", "--port", str(port),
+                          "--name", f"rig-{i}", "--duration", "3"], stdout=subprocess.PIPE, text=True)
+        for i in range(2)
+    ]
+    try:
+        deadline = time.time() + 10
+        while time.time() < deadline and (len(chain.chain) < 4 or len(pool.credits) < 2):
+            time.sleep(0.1)
+    finally:
+        outputs = [json.loads(worker.communicate(timeout=15)[0].strip().splitlines()[-1]) for worker in workers]
+        pool.stop()
+    assert len(chain.chain) >= 4
+    assert set(pool.credits) == {"rig-0", "rig-1"}
+    assert all(output["accepted"] > 0 for output in outputs)
+    assert chain.get_balance("pool") == 50 * (len(chain.chain) - 1)
@@ -0,0 +1,38 @@
+import threading
+
+from triadnet.profiler import AllocationTracer, SamplingProfiler, profile
+
+def spin(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+def test_sampling_profiler_captures_named_threads():
+    stop = threading.Event()
+    worker = threading.Thread(target=spin, args=(stop,), name="triadnet-miner", daemon=True)
+    worker.start()
+    try:
+        result = profile(duration=0.3, interval=0.01, thread_prefixes=["triadnet-miner"])
+    finally:
+        stop.set()
+        worker.join()
+    assert result.samples > 0
+    lines = result.collapsed().splitlines()
+    assert lines and all(line.startswith("triadnet-miner;") for line in lines)
+    assert any("spin (test_profiler.py" in line for line in lines)
+
+def test_capture_is_bounded():
+    profiler = SamplingProfiler(interval=0.01)
+    profiler.start(duration=0.05)
+    profiler.wait()
+    assert not profiler.running
+
+def test_allocation_tracer_groups_by_subsystem():
+    tracer = AllocationTracer({"tests": ("test_profiler.py",)})
+    tracer.start()
+    try:
+        blob = [bytearray(1024) for _ in range(100)]
+        report = tracer.snapshot()
+    finally:
+        tracer.stop()
+    assert report["tests"]["size"] >= 100 * 1024
+    assert len(blob) == 100
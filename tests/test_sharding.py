@@ -0,0 +1,42 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from triadnet import Transaction
+from triadnet.sharding import ShardCoordinator, shard_of
+
+def addresses_by_shard(count=3):
+    found = {}
+    i = 0
+    while len(found) < count:
+        found.setdefault(shard_of(f"user{i}", count), f"user{i}")
+        i += 1
+    return found
+
+def test_cross_shard_transfer_settles_through_receipt():
+    users = addresses_by_shard()
+    with ThreadPoolExecutor(3) as executor:
+        net = ShardCoordinator("miner", difficulty=1, executor=executor)
+        alice, bob = users[0], users[1]
+        net.shards[0].balances[alice] = 10.0
+        net.submit(Transaction(alice, bob, 4.0, timestamp=1.0))
+        net.mine_round()
+        assert net.get_balance(alice) == 6.0
+        assert len(net.receipts) == 1 and net.receipts[0].destination == 1
+        assert net.get_balance(bob) == 0.0
+        net.mine_round()
+        assert net.get_balance(bob) == 4.0
+        net.mine_round()
+        assert net.get_balance(bob) == 4.0 and len(net.receipts) == 1
+        links = net.committed_links()
+        assert [links[i].block_hash for i in range(3)] == [chain.last_block.hash for chain in net.shards]
+
+def test_throughput_scales_with_shards():
+    def confirmed(shards):
+        with ThreadPoolExecutor(shards) as executor:
+            net = ShardCoordinator("miner", shard_count=shards, difficulty=1, executor=executor)
+            for i in range(600):
+                net.submit(Transaction(f"sender{i}", f"sender{i + 1}", 1.0, timestamp=float(i)))
+            net.mine_round()
+            return net.confirmed_transactions
+    single = confirmed(1)
+    assert single < 600
+    assert confirmed(3) >= 2.5 * single
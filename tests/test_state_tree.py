@@ -0,0 +1,100 @@
+import random
+
+import pytest
+
+from triadnet import Blockchain, FractalCoordinate, Transaction
+from triadnet.consensus import ConsensusManager
+from triadnet.core.header_proof import build_header_proof, verify_header_proof
+from triadnet.core.state_tree import SparseMerkleTree, verify_balance
+from triadnet.enum import BlockStatus
+
+def test_incremental_updates_match_a_fresh_build_and_prove_balances():
+    rng = random.Random(7)
+    tree, balances = SparseMerkleTree(), {}
+    for _ in range(2000):
+        address = f"addr{rng.randrange(300)}"
+        if address in balances and rng.random() < 0.25:
+            del balances[address]
+            tree.update({address: None})
+        else:
+            balances[address] = rng.random()
+            tree.update({address: balances[address]})
+    assert tree.root() == SparseMerkleTree.from_balances(balances).root()
+    root = tree.root()
+    for address in list(balances)[:20] + ["nobody", "addr-missing"]:
+        proof = tree.prove(address)
+        assert verify_balance(root, address, balances.get(address), proof)
+        assert not verify_balance(root, address, 123.0, proof)
+    assert tree.root_after({"new": 1.0}) != root and tree.root() == root
+
+def test_root_after_matches_update_without_touching_the_tree():
+    rng = random.Random(11)
+    balances = {f"addr{i}": rng.random() for i in range(200)}
+    tree = SparseMerkleTree.from_balances(balances)
+    nodes, keys, root = dict(tree._nodes), list(tree._keys), tree.root()
+    for size in (1, 2, 5, 40, 200):
+        changes = {}
+        for _ in range(size):
+            address = f"addr{rng.randrange(260)}"
+            changes[address] = None if rng.random() < 0.3 else rng.random()
+        expected = SparseMerkleTree.from_balances(
+            {a: b for a, b in {**balances, **changes}.items() if b is not None}
+        ).root()
+        assert tree.root_after(changes) == expected
+    assert tree.root_after({a: None for a in balances}) == SparseMerkleTree().root()
+    assert tree._nodes == nodes and tree._keys == keys and tree.root() == root
+
+def mine(chain, consensus, miner, txs=()):
+    for tx in txs:
+        chain.add_pending_transaction(tx)
+    assert consensus.mine_block(consensus.create_block(miner, FractalCoordinate(1, 2, 3))).success
+
+def test_blocks_commit_to_balances_and_reorgs_rewind_them():
+    chain = Blockchain(difficulty=1, genesis_timestamp=0)
+    consensus = ConsensusManager(chain, retarget=False)
+    mine(chain, consensus, "alice")
+    mine(chain, consensus, "m", [Transaction("alice", "bob", 20.0, timestamp=1.0, fee=1.0)])
+    assert chain.last_block.state_root == chain.state_tree.root()
+    assert chain.state_tree.root() == SparseMerkleTree.from_balances(chain.balances).root()
+    after_one = chain.chain[1].state_root
+
+    bad = consensus.create_block("m", FractalCoordinate(1, 2, 3))
+    bad.state_root = "00" * 32
+    consensus.pofw.mine_block(bad)
+    assert chain.process_block(bad) == BlockStatus.INVALID
+
+    rival = Blockchain(difficulty=1, genesis_timestamp=0)
+    rival_consensus = ConsensusManager(rival, retarget=False)
+    mine(rival, rival_consensus, "alice")
+    for miner in ("x", "y"):
+        mine(rival, rival_consensus, miner)
+    assert rival.chain[1].hash != chain.chain[1].hash
+    statuses = [chain.process_block(block) for block in rival.chain[1:]]
+    assert statuses[-1] == BlockStatus.REORGANIZED
+    assert chain.get_balance("bob") == 0.0 and chain.state_tree.root() == rival.state_tree.root()
+    assert chain.state_tree.root() != after_one
+
+def test_balance_proof_checks_against_proven_tip():
+    chain = Blockchain(difficulty=1, genesis_timestamp=0)
+    consensus = ConsensusManager(chain, retarget=False)
+    for i in range(20):
+        mine(chain, consensus, f"m{i % 4}")
+    tip = verify_header_proof(build_header_proof(chain), chain.chain[0].hash, 1)
+    proof = chain.prove_balance("m1")
+    assert proof["block_hash"] == tip.tip_hash
+    assert verify_balance(tip.state_root, "m1", proof["balance"], proof["proof"])
+    assert proof["balance"] == chain.get_balance("m1")
+    assert verify_balance(tip.state_root, "stranger", None, chain.prove_balance("stranger")["proof"])
+
+def test_snapshot_balances_must_match_state_root(tmp_path):
+    from triadnet.core.snapshot import ChainSnapshot
+    chain = Blockchain(difficulty=1, genesis_timestamp=0)
+    consensus = ConsensusManager(chain, retarget=False)
+    for _ in range(3):
+        mine(chain, consensus, "m")
+    snapshot = ChainSnapshot.capture(chain)
+    restored = Blockchain.from_snapshot(snapshot, list(chain.chain), chain.chain.__getitem__)
+    assert restored.state_tree.root() == chain.last_block.state_root
+    snapshot.balances["m"] += 1
+    with pytest.raises(ValueError):
+        Blockchain.from_snapshot(snapshot, list(chain.chain), chain.chain.__getitem__)
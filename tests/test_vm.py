@@ -0,0 +1,40 @@
+from triadnet.vm import TVM, assemble, Opcode, MAX_MEMORY
+
+def test_arithmetic_storage_and_return():
+    vm = TVM()
+    code = assemble("PUSH 7 PUSH 2 SUB DUP 1 PUSH 1 SSTORE PUSH 0 MSTORE PUSH 0 PUSH 32 RETURN")
+    storage = {}
+    result = vm.execute(code, storage)
+    assert result.success
+    assert int.from_bytes(result.output, "big") == 5
+    assert storage == {1: 5}
+
+def test_failed_execution_discards_storage_writes():
+    vm = TVM()
+    storage = {}
+    result = vm.execute(assemble("PUSH 9 PUSH 1 SSTORE PUSH 0 PUSH 0 REVERT"), storage)
+    assert not result.success and result.error == "Reverted"
+    assert storage == {}
+    out_of_gas = vm.execute(assemble("PUSH 9 PUSH 1 SSTORE"), storage, gas_limit=50)
+    assert not out_of_gas.success and out_of_gas.gas_used == 50
+    assert storage == {}
+
+def test_rejects_bad_code_jumps_and_memory():
+    vm = TVM()
+    assert "Unknown opcode" in vm.execute(bytes([0xEE])).error
+    assert "No JUMPDEST" in vm.execute(assemble("PUSH 0 JUMP")).error
+    assert "Stack underflow" in vm.execute(bytes([Opcode.ADD])).error
+    assert "exceeds" in vm.execute(assemble(f"PUSH 1 PUSH {MAX_MEMORY} MSTORE")).error
+
+def test_loops_and_code_cache():
+    vm = TVM()
+    code = assemble("""
+        PUSH 0 CALLDATALOAD
+        loop: DUP 1 ISZERO PUSH @done JUMPI PUSH 1 SUB PUSH @loop JUMP
+        done: STOP
+    """)
+    for _ in range(3):
+        result = vm.execute(code, calldata=(50).to_bytes(32, "big"))
+        assert result.success
+    assert vm.cache.misses == 1 and vm.cache.hits == 2
+    assert result.steps > 50 * 6
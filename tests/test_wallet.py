@@ -0,0 +1,80 @@
+import json
+import os
+
+from triadnet import Transaction
+from triadnet import wallet as wallet_module
+from triadnet.wallet import Wallet, TransactionJournal
+
+def make_txs(start, count):
+    return [Transaction("a", "b", 1.0, timestamp=float(i)) for i in range(start, start + count)]
+
+def test_journal_appends_without_rewriting_header(tmp_path):
+    path = str(tmp_path / "wallet.json")
+    wallet = Wallet()
+    for tx in make_txs(0, 30):
+        wallet.record_transaction(tx)
+    wallet.save(path)
+    header = open(path).read()
+    assert "transactions" not in json.loads(header)
+
+    for tx in make_txs(30, 5):
+        wallet.record_transaction(tx)
+    mtime = os.stat(path).st_mtime_ns
+    wallet.save(path)
+    assert os.stat(path).st_mtime_ns == mtime
+
+    loaded = Wallet(path)
+    assert isinstance(loaded.transactions, TransactionJournal)
+    assert loaded.transactions._offsets is None
+    assert len(loaded.transactions) == 35
+    assert loaded.transactions[34].timestamp == 34.0
+    assert [tx.timestamp for tx in loaded.transactions] == [float(i) for i in range(35)]
+
+def test_compaction_dedupes_and_survives_torn_tail(tmp_path, monkeypatch):
+    monkeypatch.setattr(wallet_module, "COMPACT_TAIL_RECORDS", 10)
+    path = str(tmp_path / "wallet.json")
+    wallet = Wallet()
+    for tx in make_txs(0, 8) + make_txs(0, 4):
+        wallet.record_transaction(tx)
+    wallet.save(path)
+    assert len(wallet.transactions) == 8
+    assert json.load(open(path))["journal"]["compacted_bytes"] == os.path.getsize(path + ".journal")
+
+    with open(path + ".journal", "ab") as f:
+        f.write(b'{"sender": "a", "recei')
+    loaded = Wallet(path)
+    loaded.record_transaction(make_txs(100, 1)[0])
+    loaded.save(path)
+    reopened = Wallet(path)
+    assert [tx.timestamp for tx in reopened.transactions] == [float(i) for i in range(8)] + [100.0]
+
+def test_legacy_inline_history_moves_to_journal(tmp_path):
+    path = str(tmp_path / "wallet.json")
+    wallet = Wallet()
+    wallet.save(path)
+    data = json.load(open(path))
+    del data["journal"]
+    data["transactions"] = [tx.to_dict() for tx in make_txs(0, 3)]
+    json.dump(data, open(path, "w"))
+
+    legacy = Wallet(path)
+    assert len(legacy.transactions) == 3
+    legacy.save(path)
+    assert "transactions" not in json.load(open(path))
+    assert len(Wallet(path).transactions) == 3
+
+def test_batch_transaction_is_signed_once_over_all_outputs():
+    wallet = Wallet()
+    wallet.balance = 10.0
+    tx = wallet.create_batch_transaction([("bob", 2.0), ("carol", 3.0)], fee=0.1)
+    assert tx.amount == 5.0 and tx.credits() == [("bob", 2.0), ("carol", 3.0)]
+    assert wallet.verify_transaction(tx)
+    assert len(wallet.transactions) == 0
+    tx.outputs = (("bob", 2.0), ("mallory", 3.0))
+    assert not wallet.verify_transaction(tx)
+
+def test_fee_less_signing_message_is_unchanged():
+    from triadnet.wallet import signing_message
+    tx = Transaction("a", "b", 1.0, "d", timestamp=2.0, tx_id="id")
+    assert signing_message(tx) == b"idab1.0d2.0"
+    assert signing_message(Transaction("a", "b", 1.0, "d", timestamp=2.0, tx_id="id", fee=0.5)) == b"idab1.0d2.00.5"
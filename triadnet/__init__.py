@@ -6,6 +6,7 @@ from .core.block import Block
 from .core.transaction import Transaction
 from .core.fractal_coordinate import FractalCoordinate
 from .mine import Miner
+from .aio import AsyncMiner
 
 __version__ = "0.1"
 
@@ -15,5 +16,6 @@ __all__ = [
     "Block",
     "Transaction",
     "FractalCoordinate",
-    "Miner"
+    "Miner",
+    "AsyncMiner"
 ]
@@ -0,0 +1,175 @@
+"""asyncio interface to a chain and its miner.
+
+Everything here runs on one event loop, and that loop owns the chain. Block
+templates are built and found blocks are connected on the loop. The nonce
+search and the coordinate search after each block are the CPU-bound steps.
+They run in an executor (the loop's default thread pool unless one is given)
+and only read the chain. So several
+AsyncMiners and any number of block consumers share the executor and need no
+threads of their own.
+
+watch_blocks() (also reachable as Blockchain.new_blocks()) returns a
+BlockFeed. The feed subscribes to the chain as a listener as soon as it is
+created, and hands each connected block to the loop with
+call_soon_threadsafe. Consumers wake as soon as a block connects, on
+whichever thread connected it, instead of polling.
+"""
+
+import asyncio
+import logging
+from concurrent.futures import Executor
+from typing import Dict, Optional
+
+from .core.block import Block
+from .core.blockchain import Blockchain
+from .core.fractal_coordinate import FractalCoordinate
+from .core.transaction import Transaction
+from .core.wallet import Wallet
+from .consensus.proof_of_work import BLOCK_REWARD, ConsensusManager
+from .mine import MiningStats, adjusted_coordinates, status_report
+
+DEFAULT_FEED_SIZE = 1024
+ERROR_BACKOFF = 5.0
+
+logger = logging.getLogger("triadnet.aio")
+
+class BlockFeed:
+    """Async iterator over every block connected to `blockchain` after it was
+    created, in order, including blocks connected by a reorg. It subscribes
+    immediately, so nothing connected before the first `async for` step is
+    lost. If more than `maxsize` blocks are waiting, the oldest are skipped.
+
+    Must be created on the event loop that will consume it; call aclose() (or
+    leave the `async for` with break and close it) to unsubscribe."""
+
+    def __init__(self, blockchain: Blockchain, maxsize: int = DEFAULT_FEED_SIZE):
+        self.blockchain = blockchain
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.dropped = 0
+        self.closed = False
+        blockchain.add_listener(self)
+
+    def block_connected(self, block: Block, height: int) -> None:
+        if self.closed or self.loop.is_closed():
+            return
+        self.loop.call_soon_threadsafe(self._put, block)
+
+    def block_disconnected(self, block: Block, height: int) -> None:
+        pass
+
+    def _put(self, block: Block) -> None:
+        if self.closed:
+            return
+        if self.queue.full():
+            # A consumer this far behind gets the newest blocks, not a stall.
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(block)
+
+    def __aiter__(self) -> "BlockFeed":
+        return self
+
+    async def __anext__(self) -> Block:
+        if self.closed:
+            raise StopAsyncIteration
+        return await self.queue.get()
+
+    async def aclose(self) -> None:
+        if not self.closed:
+            self.closed = True
+            self.blockchain.remove_listener(self)
+
+def watch_blocks(blockchain: Blockchain, maxsize: int = DEFAULT_FEED_SIZE) -> BlockFeed:
+    """Subscribe to `blockchain`'s connected blocks; see BlockFeed."""
+    return BlockFeed(blockchain, maxsize)
+
+class AsyncMiner:
+    def __init__(self,
+                 wallet: Wallet,
+                 blockchain: Blockchain,
+                 fractal_coord: FractalCoordinate,
+                 auto_adjust_coords: bool = True,
+                 executor: Optional[Executor] = None,
+                 consensus: Optional[ConsensusManager] = None):
+        self.wallet = wallet
+        self.blockchain = blockchain
+        self.fractal_coord = fractal_coord
+        self.auto_adjust_coords = auto_adjust_coords
+        self.consensus = consensus or ConsensusManager(blockchain)
+        self.stats = MiningStats()
+        self._executor = executor
+        self._task: Optional[asyncio.Task] = None
+        # Read by the nonce search in the executor; a plain bool is enough.
+        self._stopping = False
+        self._stop_requested: Optional[asyncio.Event] = None
+
+    @property
+    def active(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def submit(self, tx: Transaction) -> None:
+        """Queue `tx` for the next block template."""
+        self.blockchain.add_pending_transaction(tx)
+
+    async def start(self) -> None:
+        if self.active:
+            return
+        self._stopping = False
+        self._stop_requested = asyncio.Event()
+        self.stats = MiningStats()
+        self._task = asyncio.get_running_loop().create_task(self._run(), name="triadnet-async-miner")
+        logger.info("Mining started at coordinates %s", self.fractal_coord,
+                    extra={"event": "mining_started", "address": self.wallet.address})
+
+    async def stop(self) -> None:
+        """Stop mining and wait for the current nonce search to give up, which it
+        does within one stop check (a few thousand hashes)."""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._stop_requested.set()
+        task, self._task = self._task, None
+        await task
+        logger.info("Mining stopped", extra={"event": "mining_stopped"})
+
+    async def status(self) -> Dict[str, any]:
+        return status_report(self, self.active, len(self.blockchain.mempool))
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while not self._stopping:
+            try:
+                block = self.consensus.create_block(self.wallet.address, self.fractal_coord)
+                result = await loop.run_in_executor(
+                    self._executor, self.consensus.solve, block, lambda: self._stopping
+                )
+                self.stats.hashes += result.hashes
+                if not result.success:
+                    continue
+                if not self.blockchain.add_block(result.block):
+                    logger.warning("Block %d failed validation", block.index,
+                                   extra={"event": "block_rejected", "height": block.index})
+                    continue
+                self.stats.update_block_mined(BLOCK_REWARD)
+                logger.info(
+                    "Block %d mined in %.2fs", block.index, result.duration,
+                    extra={"event": "block_mined", "height": block.index, "hash": result.hash_val,
+                           "nonce": result.nonce, "duration": result.duration}
+                )
+                if self.auto_adjust_coords:
+                    # A cold search takes over a second of NumPy work; keep it off the loop.
+                    adjusted = await loop.run_in_executor(
+                        self._executor, adjusted_coordinates, self.fractal_coord, result.duration
+                    )
+                    if adjusted is not None:
+                        self.fractal_coord = adjusted[0]
+            except asyncio.CancelledError:
+                self._stopping = True
+                raise
+            except Exception as e:
+                logger.error("Mining error: %s", e, extra={"event": "mining_error"})
+                try:
+                    await asyncio.wait_for(self._stop_requested.wait(), ERROR_BACKOFF)
+                except asyncio.TimeoutError:
+                    pass
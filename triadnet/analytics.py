@@ -0,0 +1,339 @@
+"""Chain analytics: per-block metric columns plus incrementally maintained rollups.
+
+ChainAnalytics follows a Blockchain as a listener and appends one row per
+connected block to memory-mapped NumPy column files. Alongside the columns it
+keeps rolling windows over the most recent blocks and fixed-size bucket rollups
+(sum/min/max per metric) at several resolutions, updating both per block, so
+dashboard queries only touch as many buckets as points they return.
+
+A second process (the dashboard) can open the same directory read-only and call
+refresh() to fold in rows the writer appended since.
+"""
+
+import json
+import logging
+import os
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .core.block import Block
+
+COLUMNS: Dict[str, str] = {
+    "timestamp": "f8",
+    "duration": "f8",
+    "nonce": "i8",
+    "difficulty": "i4",
+    "a": "i8",
+    "b": "i8",
+    "c": "i8",
+    "tx_count": "i4",
+    "hash_prefix": "u8",
+}
+ROLLUP_METRICS = ("duration", "tx_count", "difficulty")
+BUCKET_SIZES = (16, 256, 4096)
+DEFAULT_WINDOWS = (10, 100, 1000)
+INITIAL_CAPACITY = 4096
+META_FILE = "meta.json"
+
+def hash_prefix(block_hash: str) -> int:
+    return int(block_hash[:16], 16)
+
+def hash_difficulty(block_hash: str) -> int:
+    """Leading zero hex digits of `block_hash`: the difficulty that block
+    actually met, which may exceed the chain's target."""
+    return len(block_hash) - len(block_hash.lstrip("0"))
+
+class ColumnStore:
+    """Fixed-width columns in `<name>.col` files, grown by doubling."""
+
+    def __init__(self, directory: str, readonly: bool = False):
+        self.directory = directory
+        self.readonly = readonly
+        if not readonly:
+            os.makedirs(directory, exist_ok=True)
+        self.count = self._read_count()
+        self.capacity = 0
+        self._columns: Dict[str, np.memmap] = {}
+        self._map(max(self.count, 0 if readonly else INITIAL_CAPACITY))
+
+    def _read_count(self) -> int:
+        try:
+            with open(os.path.join(self.directory, META_FILE)) as f:
+                return json.load(f)["count"]
+        except FileNotFoundError:
+            return 0
+
+    def _write_count(self) -> None:
+        path = os.path.join(self.directory, META_FILE)
+        with open(f"{path}.tmp", "w") as f:
+            json.dump({"count": self.count}, f)
+        os.replace(f"{path}.tmp", path)
+
+    def _map(self, capacity: int) -> None:
+        for column in self._columns.values():
+            column.flush()
+        self._columns = {}
+        for name, dtype in COLUMNS.items():
+            path = os.path.join(self.directory, f"{name}.col")
+            size = capacity * np.dtype(dtype).itemsize
+            if not self.readonly:
+                with open(path, "ab") as f:
+                    if f.tell() < size:
+                        f.truncate(size)
+            if capacity:
+                self._columns[name] = np.memmap(path, dtype=dtype, mode="r" if self.readonly else "r+",
+                                                shape=(capacity,))
+        self.capacity = capacity
+
+    def refresh(self) -> int:
+        """Re-read the row count written by another process; returns it."""
+        self.count = self._read_count()
+        if self.count > self.capacity:
+            self._map(self.count)
+        return self.count
+
+    def column(self, name: str, start: int = 0, stop: Optional[int] = None) -> np.ndarray:
+        stop = self.count if stop is None else min(stop, self.count)
+        if name not in self._columns or start >= stop:
+            return np.empty(0, dtype=COLUMNS[name])
+        return self._columns[name][start:stop]
+
+    def append(self, row: Dict[str, float]) -> None:
+        if self.count >= self.capacity:
+            self._map(max(INITIAL_CAPACITY, self.capacity * 2))
+        for name, column in self._columns.items():
+            column[self.count] = row[name]
+        self.count += 1
+        self._write_count()
+
+    def truncate(self, count: int) -> None:
+        if count < self.count:
+            self.count = count
+            self._write_count()
+
+    def flush(self) -> None:
+        for column in self._columns.values():
+            column.flush()
+
+class RollingWindow:
+    """Running sums over the last `size` blocks."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.rows: deque = deque()
+        self.duration_sum = 0.0
+        self.tx_sum = 0
+
+    def push(self, duration: float, tx_count: int) -> None:
+        self.rows.append((duration, tx_count))
+        self.duration_sum += duration
+        self.tx_sum += tx_count
+        if len(self.rows) > self.size:
+            old_duration, old_tx = self.rows.popleft()
+            self.duration_sum -= old_duration
+            self.tx_sum -= old_tx
+
+    def reset(self, durations: np.ndarray, tx_counts: np.ndarray) -> None:
+        self.rows = deque(zip(durations.tolist(), tx_counts.tolist()))
+        self.duration_sum = float(durations.sum())
+        self.tx_sum = int(tx_counts.sum())
+
+    def summary(self) -> dict:
+        n = len(self.rows)
+        return {
+            "blocks": n,
+            "mean_block_time": self.duration_sum / n if n else 0.0,
+            "mean_tx_per_block": self.tx_sum / n if n else 0.0,
+        }
+
+class Rollup:
+    """Per-bucket count/first timestamp and sum/min/max of each metric."""
+
+    def __init__(self, bucket_size: int):
+        self.bucket_size = bucket_size
+        self.count: List[int] = []
+        self.timestamp: List[float] = []
+        self.stats: Dict[str, Dict[str, List[float]]] = {
+            metric: {"sum": [], "min": [], "max": []} for metric in ROLLUP_METRICS
+        }
+
+    def add(self, height: int, row: Dict[str, float]) -> None:
+        bucket = height // self.bucket_size
+        if bucket == len(self.count):
+            self.count.append(0)
+            self.timestamp.append(row["timestamp"])
+            for stats in self.stats.values():
+                stats["sum"].append(0.0)
+                stats["min"].append(float("inf"))
+                stats["max"].append(float("-inf"))
+        self.count[bucket] += 1
+        for metric, stats in self.stats.items():
+            value = float(row[metric])
+            stats["sum"][bucket] += value
+            stats["min"][bucket] = min(stats["min"][bucket], value)
+            stats["max"][bucket] = max(stats["max"][bucket], value)
+
+    def truncate(self, count: int) -> int:
+        """Drop buckets touching heights >= count; returns the first height to re-add."""
+        keep = count // self.bucket_size
+        del self.count[keep:]
+        del self.timestamp[keep:]
+        for stats in self.stats.values():
+            for values in stats.values():
+                del values[keep:]
+        return keep * self.bucket_size
+
+    def extend(self, start: int, columns: Dict[str, np.ndarray]) -> None:
+        """Vectorized equivalent of add() for rows start.. that begin on a bucket boundary."""
+        n = len(columns["timestamp"])
+        if not n:
+            return
+        offsets = np.arange(0, n, self.bucket_size)
+        self.count.extend(np.diff(np.append(offsets, n)).tolist())
+        self.timestamp.extend(columns["timestamp"][offsets].tolist())
+        for metric, stats in self.stats.items():
+            values = columns[metric].astype(np.float64)
+            stats["sum"].extend(np.add.reduceat(values, offsets).tolist())
+            stats["min"].extend(np.minimum.reduceat(values, offsets).tolist())
+            stats["max"].extend(np.maximum.reduceat(values, offsets).tolist())
+
+    def series(self, metric: str, first: int, last: int) -> Dict[str, np.ndarray]:
+        counts = np.array(self.count[first:last], dtype=np.float64)
+        stats = self.stats[metric]
+        return {
+            "start_height": np.arange(first, last) * self.bucket_size,
+            "count": counts,
+            "timestamp": np.array(self.timestamp[first:last]),
+            "sum": np.array(stats["sum"][first:last]),
+            "min": np.array(stats["min"][first:last]),
+            "max": np.array(stats["max"][first:last]),
+        }
+
+class ChainAnalytics:
+    def __init__(self, directory: str, readonly: bool = False, windows: Tuple[int, ...] = DEFAULT_WINDOWS):
+        self.columns = ColumnStore(directory, readonly)
+        self.windows = {size: RollingWindow(size) for size in windows}
+        self.rollups = [Rollup(size) for size in BUCKET_SIZES]
+        self.blockchain = None
+        self.logger = logging.getLogger("triadnet.analytics")
+        self._rebuild(0)
+
+    def __len__(self) -> int:
+        return self.columns.count
+
+    def _rebuild(self, start: int) -> None:
+        """Re-derive windows and rollups for rows from `start` on."""
+        count = self.columns.count
+        for rollup in self.rollups:
+            begin = rollup.truncate(min(start, count))
+            rollup.extend(begin, {name: self.columns.column(name, begin) for name in ROLLUP_METRICS + ("timestamp",)})
+        for window in self.windows.values():
+            begin = max(0, count - window.size)
+            window.reset(self.columns.column("duration", begin), self.columns.column("tx_count", begin))
+
+    def refresh(self) -> None:
+        previous = len(self)
+        count = self.columns.refresh()
+        if count != previous:
+            self._rebuild(min(previous, count))
+
+    def attach(self, blockchain) -> None:
+        """Bring the columns in line with blockchain.chain, then follow it."""
+        chain = blockchain.chain
+        height = min(len(self), len(chain))
+        prefixes = self.columns.column("hash_prefix")
+        while height and int(prefixes[height - 1]) != hash_prefix(chain[height - 1].hash):
+            height -= 1
+        self.columns.truncate(height)
+        self._rebuild(height)
+        self.blockchain = blockchain
+        for h in range(height, len(chain)):
+            self.block_connected(chain[h], h)
+        blockchain.add_listener(self)
+
+    def block_connected(self, block: Block, height: int) -> None:
+        if height < len(self):
+            self.block_disconnected(block, height)
+        previous = self.columns.column("timestamp", height - 1, height) if height else []
+        row = {
+            "timestamp": block.timestamp,
+            "duration": block.timestamp - float(previous[0]) if len(previous) else 0.0,
+            "nonce": block.nonce,
+            "difficulty": hash_difficulty(block.hash),
+            "a": block.fractal_coord.a,
+            "b": block.fractal_coord.b,
+            "c": block.fractal_coord.c,
+            "tx_count": len(block.transactions),
+            "hash_prefix": hash_prefix(block.hash),
+        }
+        self.columns.append(row)
+        for rollup in self.rollups:
+            rollup.add(height, row)
+        for window in self.windows.values():
+            window.push(row["duration"], row["tx_count"])
+
+    def block_disconnected(self, block: Block, height: int) -> None:
+        self.columns.truncate(height)
+        self._rebuild(height)
+
+    def summary(self, percentile_window: int = 1000) -> dict:
+        count = len(self)
+        durations = self.columns.column("duration", max(1, count - percentile_window))
+        percentiles = np.percentile(durations, [50, 90, 99]).tolist() if len(durations) else [0.0] * 3
+        return {
+            "height": count - 1,
+            "windows": {str(size): window.summary() for size, window in self.windows.items()},
+            "block_time_percentiles": dict(zip(("p50", "p90", "p99"), percentiles)),
+        }
+
+    def series(self, metric: str, points: int = 200, start: int = 0, stop: Optional[int] = None) -> List[dict]:
+        """`metric` over heights [start, stop) in at most `points` buckets of mean/min/max."""
+        if metric not in ROLLUP_METRICS:
+            raise ValueError(f"Unknown metric {metric}")
+        points = max(1, points)
+        stop = len(self) if stop is None else min(stop, len(self))
+        if stop - start <= points:
+            values = self.columns.column(metric, start, stop).astype(np.float64)
+            timestamps = self.columns.column("timestamp", start, stop)
+            return [
+                {"start_height": start + i, "timestamp": float(timestamps[i]),
+                 "mean": float(value), "min": float(value), "max": float(value)}
+                for i, value in enumerate(values)
+            ]
+        rollup = self.rollups[-1]
+        for candidate in self.rollups:
+            if (stop - 1) // candidate.bucket_size - start // candidate.bucket_size + 1 <= points:
+                rollup = candidate
+                break
+        data = rollup.series(metric, start // rollup.bucket_size, (stop - 1) // rollup.bucket_size + 1)
+        group = -(-len(data["count"]) // points)
+        if group > 1:
+            # Even the coarsest rollup has too many buckets; merge neighbours.
+            offsets = np.arange(0, len(data["count"]), group)
+            data = {
+                "start_height": data["start_height"][offsets],
+                "timestamp": data["timestamp"][offsets],
+                "count": np.add.reduceat(data["count"], offsets),
+                "sum": np.add.reduceat(data["sum"], offsets),
+                "min": np.minimum.reduceat(data["min"], offsets),
+                "max": np.maximum.reduceat(data["max"], offsets),
+            }
+        mean = data["sum"] / np.maximum(data["count"], 1)
+        return [
+            {"start_height": int(data["start_height"][i]), "timestamp": float(data["timestamp"][i]),
+             "mean": float(mean[i]), "min": float(data["min"][i]), "max": float(data["max"][i])}
+            for i in range(len(mean))
+        ]
+
+    def coordinate_histogram(self, bins: int = 32) -> Dict[str, dict]:
+        result = {}
+        for axis in ("a", "b", "c"):
+            values = self.columns.column(axis)
+            counts, edges = np.histogram(values, bins=bins) if len(values) else (np.zeros(0), np.zeros(0))
+            result[axis] = {"counts": counts.tolist(), "edges": edges.tolist()}
+        return result
+
+    def close(self) -> None:
+        self.columns.flush()
@@ -1,7 +1,10 @@
 from .proof_of_work import ProofOfFractalWork, ConsensusManager, BLOCK_REWARD
+from .pipeline import ImportPipeline, import_blocks
 
 __all__ = [
     "ProofOfFractalWork",
     "ConsensusManager",
-    "BLOCK_REWARD"
+    "BLOCK_REWARD",
+    "ImportPipeline",
+    "import_blocks"
 ]
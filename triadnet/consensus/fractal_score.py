@@ -0,0 +1,134 @@
+"""Escape-time fractal scoring for (a, b, c) coordinates.
+
+Coordinates wrap onto a PERIOD^3 lattice spanning [-EXTENT, EXTENT]^3, and each
+point is scored by how long the power-8 Mandelbulb iteration takes to escape:
+points that never escape sit inside the bulb and score MAX_SCORE, points that
+escape immediately score MIN_SCORE. Scores are evaluated in NumPy batches and
+memoized per TILE^3 block of coordinates in a bounded LRU, so neighbourhood
+queries such as best_near() mostly read cached tiles.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import numpy as np
+
+from ..core.fractal_coordinate import FractalCoordinate
+
+MIN_SCORE = 0.1
+MAX_SCORE = 2.0
+PERIOD = 1024
+EXTENT = 1.2
+TILE = 16
+DEFAULT_MAX_ITER = 12
+DEFAULT_POWER = 8
+DEFAULT_MAX_TILES = 1024
+
+def escape_times(x: np.ndarray, y: np.ndarray, z: np.ndarray,
+                 max_iter: int = DEFAULT_MAX_ITER, power: int = DEFAULT_POWER, bailout: float = 2.0) -> np.ndarray:
+    """Mandelbulb escape iteration for every point; max_iter for points that stay bounded."""
+    shape = np.shape(x)
+    cx = np.asarray(x, dtype=np.float64).ravel()
+    cy = np.asarray(y, dtype=np.float64).ravel()
+    cz = np.asarray(z, dtype=np.float64).ravel()
+    counts = np.full(cx.size, max_iter, dtype=np.int16)
+    active = np.arange(cx.size)
+    zx, zy, zz = np.zeros_like(cx), np.zeros_like(cy), np.zeros_like(cz)
+    for i in range(max_iter):
+        r = np.sqrt(zx * zx + zy * zy + zz * zz)
+        escaped = r > bailout
+        if escaped.any():
+            counts[active[escaped]] = i
+            # Only points still iterating are carried into the next round.
+            keep = ~escaped
+            active, r = active[keep], r[keep]
+            zx, zy, zz, cx, cy, cz = zx[keep], zy[keep], zz[keep], cx[keep], cy[keep], cz[keep]
+            if not active.size:
+                break
+        theta = np.arccos(np.divide(zz, r, out=np.zeros_like(r), where=r > 0)) * power
+        phi = np.arctan2(zy, zx) * power
+        rn = r ** power
+        sin_theta = np.sin(theta)
+        zx = rn * sin_theta * np.cos(phi) + cx
+        zy = rn * sin_theta * np.sin(phi) + cy
+        zz = rn * np.cos(theta) + cz
+    return counts.reshape(shape)
+
+class FractalScoreEngine:
+    def __init__(self, max_iter: int = DEFAULT_MAX_ITER, power: int = DEFAULT_POWER,
+                 max_tiles: int = DEFAULT_MAX_TILES):
+        self.max_iter = max_iter
+        self.power = power
+        self.max_tiles = max_tiles
+        self.hits = 0
+        self.misses = 0
+        self._tiles: "OrderedDict[Tuple[int, int, int], np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def score_batch(self, a, b, c) -> np.ndarray:
+        """Uncached scores for arrays of integer coordinates."""
+        scale = 2 * EXTENT / PERIOD
+        x, y, z = ((np.asarray(v, dtype=np.int64) % PERIOD) * scale - EXTENT for v in (a, b, c))
+        counts = escape_times(x, y, z, self.max_iter, self.power)
+        return (MIN_SCORE + (MAX_SCORE - MIN_SCORE) * counts / self.max_iter).astype(np.float32)
+
+    def _tile(self, key: Tuple[int, int, int]) -> np.ndarray:
+        with self._lock:
+            tile = self._tiles.get(key)
+            if tile is not None:
+                self.hits += 1
+                self._tiles.move_to_end(key)
+                return tile
+        self.misses += 1
+        axes = [np.arange(k * TILE, (k + 1) * TILE) for k in key]
+        tile = self.score_batch(*np.meshgrid(*axes, indexing="ij"))
+        with self._lock:
+            self._tiles[key] = tile
+            while len(self._tiles) > self.max_tiles:
+                self._tiles.popitem(last=False)
+        return tile
+
+    def region(self, lo: Tuple[int, int, int], hi: Tuple[int, int, int]) -> np.ndarray:
+        """Scores for every coordinate in the box lo <= (a, b, c) < hi, assembled from tiles."""
+        out = np.empty(tuple(h - l for l, h in zip(lo, hi)), dtype=np.float32)
+        ranges = [range(l // TILE, (h - 1) // TILE + 1) for l, h in zip(lo, hi)]
+        for ta in ranges[0]:
+            for tb in ranges[1]:
+                for tc in ranges[2]:
+                    tile = self._tile((ta, tb, tc))
+                    src, dst = [], []
+                    for t, l, h in zip((ta, tb, tc), lo, hi):
+                        start, stop = max(l, t * TILE), min(h, (t + 1) * TILE)
+                        src.append(slice(start - t * TILE, stop - t * TILE))
+                        dst.append(slice(start - l, stop - l))
+                    out[tuple(dst)] = tile[tuple(src)]
+        return out
+
+    def score(self, coord: FractalCoordinate) -> float:
+        tile = self._tile((coord.a // TILE, coord.b // TILE, coord.c // TILE))
+        return float(tile[coord.a % TILE, coord.b % TILE, coord.c % TILE])
+
+    def best_near(self, center: FractalCoordinate, radius: int,
+                  target: float = MAX_SCORE) -> Tuple[FractalCoordinate, float]:
+        """The non-negative coordinate within `radius` (per axis) whose score is closest
+        to `target`; ties go to the one nearest `center`."""
+        lo = tuple(max(0, v - radius) for v in (center.a, center.b, center.c))
+        hi = tuple(v + radius + 1 for v in (center.a, center.b, center.c))
+        scores = self.region(lo, hi)
+        distance = np.abs(scores - np.float32(target))
+        best = distance.min()
+        candidates = np.argwhere(distance == best)
+        offsets = candidates + np.array(lo) - np.array([center.a, center.b, center.c])
+        choice = candidates[np.argmin((offsets * offsets).sum(axis=1))]
+        coord = FractalCoordinate(*(int(v) for v in choice + np.array(lo)))
+        return coord, float(scores[tuple(choice)])
+
+_engine: Optional[FractalScoreEngine] = None
+
+def get_engine() -> FractalScoreEngine:
+    """Process-wide engine, so miners and consensus share one tile cache."""
+    global _engine
+    if _engine is None:
+        _engine = FractalScoreEngine()
+    return _engine
@@ -0,0 +1,242 @@
+"""Staged block import.
+
+    parse -> header/PoW check -> parallel verification -> ordered apply
+
+Each stage runs on its own thread and hands work to the next through a bounded
+queue, so a slow stage applies back-pressure instead of buffering the whole
+chain. The verification stage fans blocks out to an executor (a process pool by
+default, so replay uses every core) where the block hash is recomputed and every
+transaction is checked; its futures are queued in arrival order, so the apply
+stage feeds Blockchain.process_block strictly in sequence.
+"""
+
+import json
+import logging
+import math
+import os
+import queue
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Union
+
+from ..core.block import Block
+from ..core.blockchain import Blockchain
+from ..core.transaction import BATCH_RECEIVER, Transaction
+from ..enum import BlockStatus
+
+DEFAULT_QUEUE_SIZE = 64
+PIPELINE_MIN_BLOCKS = 500
+
+_DONE = object()
+
+def _outputs_valid(tx: Transaction) -> bool:
+    """Batch outputs must be positive payments to real addresses summing to `amount`."""
+    if tx.receiver != BATCH_RECEIVER or not tx.outputs:
+        return False
+    for receiver, amount in tx.outputs:
+        if not isinstance(receiver, str) or not receiver or receiver == "network":
+            return False
+        if not isinstance(amount, (int, float)) or not math.isfinite(amount) or amount <= 0:
+            return False
+    return math.fsum(amount for _, amount in tx.outputs) == tx.amount
+
+def check_transaction(tx: Transaction) -> bool:
+    """Context-free integrity checks; the default verifier.
+
+    Checks that the id matches the contents and that amounts are sane, but not
+    signatures: those need the sender's public key, which the chain does not
+    carry. Deployments with a key directory pass a SignatureVerifier instead.
+    """
+    if not tx.sender or not tx.receiver or not tx.tx_id:
+        return False
+    if not isinstance(tx.amount, (int, float)) or not math.isfinite(tx.amount) or tx.amount < 0:
+        return False
+    if not isinstance(tx.fee, (int, float)) or not math.isfinite(tx.fee) or tx.fee < 0:
+        return False
+    if (tx.outputs is not None or tx.receiver == BATCH_RECEIVER) and not _outputs_valid(tx):
+        return False
+    return tx.tx_id == tx.calculate_hash()
+
+class SignatureVerifier:
+    """Verifier that runs check_transaction and then checks each non-reward
+    transaction's RSA signature against `public_keys` (address -> PEM).
+
+    Picklable, so it can be handed to a process pool; keys are loaded lazily
+    in each worker."""
+
+    def __init__(self, public_keys: Dict[str, Union[str, bytes]]):
+        self.public_keys = {
+            address: pem.encode() if isinstance(pem, str) else pem for address, pem in public_keys.items()
+        }
+        self._loaded: Dict[str, object] = {}
+
+    def __getstate__(self) -> dict:
+        return {"public_keys": self.public_keys}
+
+    def __setstate__(self, state: dict) -> None:
+        self.public_keys = state["public_keys"]
+        self._loaded = {}
+
+    def __call__(self, tx: Transaction) -> bool:
+        if not check_transaction(tx):
+            return False
+        if tx.sender == "network":
+            return True
+        if tx.signature is None or tx.sender not in self.public_keys:
+            return False
+        from ..wallet import verify_signature
+        key = self._loaded.get(tx.sender)
+        if key is None:
+            from cryptography.hazmat.primitives import serialization
+            key = self._loaded[tx.sender] = serialization.load_pem_public_key(self.public_keys[tx.sender])
+        return verify_signature(key, tx)
+
+def verify_block(block: Block, verify_tx: Callable[[Transaction], bool] = check_transaction) -> Optional[str]:
+    """Recompute the block hash and verify its transactions; returns a reason on failure.
+
+    Runs inside executor workers, so it must stay a picklable module-level function.
+    """
+    if block.hash != block.calculate_hash():
+        return "hash mismatch"
+    for tx in block.transactions:
+        if not verify_tx(tx):
+            return f"invalid transaction {tx.tx_id}"
+    return None
+
+@dataclass
+class ImportReport:
+    processed: int = 0
+    statuses: Dict[str, int] = field(default_factory=dict)
+    rejected: List[str] = field(default_factory=list)
+
+    def record(self, status: BlockStatus) -> None:
+        self.processed += 1
+        self.statuses[status.name] = self.statuses.get(status.name, 0) + 1
+
+class ImportPipeline:
+    def __init__(self,
+                 blockchain: Blockchain,
+                 executor: Optional[Executor] = None,
+                 workers: Optional[int] = None,
+                 verify_tx: Callable[[Transaction], bool] = check_transaction,
+                 queue_size: int = DEFAULT_QUEUE_SIZE,
+                 stop_on_invalid: bool = False):
+        self.blockchain = blockchain
+        self.verify_tx = verify_tx
+        self.queue_size = queue_size
+        self.stop_on_invalid = stop_on_invalid
+        self.workers = workers or os.cpu_count() or 1
+        self._executor = executor
+        self._owns_executor = executor is None
+        self.logger = logging.getLogger("triadnet.consensus")
+
+    def run(self, items: Iterable[Union[bytes, str, dict, Block]]) -> ImportReport:
+        """Import blocks given as raw JSON, dicts or Block objects, in order."""
+        executor = self._executor or ProcessPoolExecutor(max_workers=self.workers)
+        report = ImportReport()
+        stop = threading.Event()
+        parsed: "queue.Queue" = queue.Queue(self.queue_size)
+        checked: "queue.Queue" = queue.Queue(self.queue_size)
+        verified: "queue.Queue" = queue.Queue(self.queue_size)
+        errors: List[BaseException] = []
+
+        def stage(target: Callable, *args) -> threading.Thread:
+            def runner():
+                try:
+                    target(*args)
+                except BaseException as e:
+                    errors.append(e)
+                    stop.set()
+                finally:
+                    self._put(args[-1], _DONE, stop)
+            thread = threading.Thread(target=runner, name=f"triadnet-import-{target.__name__.strip('_')}", daemon=True)
+            thread.start()
+            return thread
+
+        threads = [
+            stage(self._parse, items, report, stop, parsed),
+            stage(self._check_headers, parsed, report, stop, checked),
+            stage(self._verify, executor, checked, stop, verified),
+        ]
+        try:
+            self._apply(verified, report, stop)
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+            if self._owns_executor:
+                executor.shutdown(cancel_futures=True)
+        if errors:
+            raise errors[0]
+        return report
+
+    def _put(self, out: "queue.Queue", item, stop: threading.Event) -> bool:
+        while not stop.is_set():
+            try:
+                out.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _get(self, source: "queue.Queue", stop: threading.Event):
+        while not stop.is_set():
+            try:
+                return source.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        return _DONE
+
+    def _reject(self, report: ImportReport, block_hash: str, reason: str, stop: threading.Event) -> None:
+        self.logger.warning(f"Rejected block {block_hash[:12]}: {reason}")
+        report.rejected.append(block_hash)
+        if self.stop_on_invalid:
+            stop.set()
+
+    def _parse(self, items: Iterable, report: ImportReport, stop: threading.Event, out: "queue.Queue") -> None:
+        for item in items:
+            if isinstance(item, (bytes, str)):
+                item = json.loads(item)
+            block = item if isinstance(item, Block) else Block.from_dict(item)
+            if not self._put(out, block, stop):
+                return
+
+    def _check_headers(self, source: "queue.Queue", report: ImportReport, stop: threading.Event,
+                       out: "queue.Queue") -> None:
+        # Cheap checks against the claimed hash, so bad blocks never reach the workers.
+        target = "0" * self.blockchain.difficulty
+        while True:
+            block = self._get(source, stop)
+            if block is _DONE:
+                return
+            if not block.hash.startswith(target) or block.index < 1:
+                self._reject(report, block.hash, "bad header", stop)
+                continue
+            if not self._put(out, block, stop):
+                return
+
+    def _verify(self, executor: Executor, source: "queue.Queue", stop: threading.Event, out: "queue.Queue") -> None:
+        while True:
+            block = self._get(source, stop)
+            if block is _DONE:
+                return
+            future = executor.submit(verify_block, block, self.verify_tx)
+            if not self._put(out, (block, future), stop):
+                future.cancel()
+                return
+
+    def _apply(self, source: "queue.Queue", report: ImportReport, stop: threading.Event) -> None:
+        while True:
+            item = self._get(source, stop)
+            if item is _DONE:
+                return
+            block, future = item
+            failure = future.result()
+            if failure:
+                self._reject(report, block.hash, failure, stop)
+                continue
+            report.record(self.blockchain.process_block(block, hash_verified=True))
+
+def import_blocks(blockchain: Blockchain, items: Iterable, **kwargs) -> ImportReport:
+    return ImportPipeline(blockchain, **kwargs).run(items)
@@ -2,17 +2,23 @@ from dataclasses import dataclass
 import time
 import hashlib
 import random
-from typing import List, Optional, Dict, Tuple
+from typing import Callable, List, Optional, Dict, Tuple
 import logging
 from ..core.block import Block
 from ..core.transaction import Transaction
 from ..core.fractal_coordinate import FractalCoordinate
 from ..core.blockchain import Blockchain
+from .fractal_score import get_engine
 
 BLOCK_REWARD = 50
 TARGET_BLOCK_TIME = 60
 DIFFICULTY_ADJUSTMENT_INTERVAL = 10
-MAX_TRANSACTIONS_PER_BLOCK = 100
+# Encoded transaction bytes per block, coinbase included.
+MAX_BLOCK_WEIGHT = 32000
+COINBASE_RESERVED_WEIGHT = 512
+STOP_CHECK_INTERVAL = 4096
+TIMESTAMP_ROLL_INTERVAL = 30
+TEMPLATE_REFRESH_INTERVAL = 10
 
 @dataclass
 class MiningResult:
@@ -21,18 +27,21 @@ class MiningResult:
     nonce: int = 0
     duration: float = 0
     block: Optional[Block] = None
+    hashes: int = 0
 
 class ProofOfFractalWork:
-    def __init__(self, difficulty: int = 4):
+    def __init__(self, difficulty: int = 4, retarget: bool = True):
         self.difficulty = difficulty
         self.target = "0" * difficulty
+        self.retarget = retarget
         self.logger = logging.getLogger("triadnet.consensus")
         
     def _calculate_fractal_score(self, coord: FractalCoordinate) -> float:
-        base_score = (coord.a + coord.b + coord.c) / 1000.0
-        return max(0.1, min(2.0, base_score))
+        return get_engine().score(coord)
         
     def _adjust_difficulty(self, last_block_time: float, fractal_score: float) -> None:
+        if not self.retarget:
+            return
         time_ratio = TARGET_BLOCK_TIME / max(1, last_block_time)
         difficulty_delta = time_ratio * fractal_score
         if difficulty_delta > 1.2:
@@ -41,47 +50,82 @@ class ProofOfFractalWork:
             self.difficulty = max(1, self.difficulty - 1)
         self.target = "0" * self.difficulty
             
-    def mine_block(self, block: Block, max_nonce: int = 1000000) -> MiningResult:
+    def mine_block(self,
+                   block: Block,
+                   max_nonce: int = 1000000,
+                   should_stop: Optional[Callable[[], bool]] = None) -> MiningResult:
+        """Search for a valid hash until one is found or `should_stop()` returns True.
+
+        Once `max_nonce` nonces are exhausted the search space is extended by
+        bumping the reward transaction's extranonce (and refreshing a stale
+        timestamp) rather than giving up.
+        """
         start_time = time.time()
         fractal_score = self._calculate_fractal_score(block.fractal_coord)
-        nonce = 0
-        while nonce < max_nonce:
-            block.nonce = nonce
-            block_hash = block.calculate_hash()
-            if block_hash.startswith(self.target):
-                duration = time.time() - start_time
-                block.hash = block_hash  # Set the block hash
-                self._adjust_difficulty(duration, fractal_score)
-                self.logger.info(
-                    f"Block mined! Hash: {block_hash[:10]}... "
-                    f"Nonce: {nonce} Time: {duration:.2f}s "
-                    f"Difficulty: {self.difficulty}"
-                )
-                return MiningResult(
-                    success=True,
-                    hash_val=block_hash,
-                    nonce=nonce,
-                    duration=duration,
-                    block=block
-                )
-            nonce += 1
-        duration = time.time() - start_time
-        return MiningResult(success=False, duration=duration)
+        target = self.target
+        hashes = 0
+        while True:
+            prefix, suffix = block.hash_template()
+            for base in range(0, max_nonce, STOP_CHECK_INTERVAL):
+                if should_stop is not None and should_stop():
+                    duration = time.time() - start_time
+                    return MiningResult(success=False, duration=duration, hashes=hashes)
+                for nonce in range(base, min(base + STOP_CHECK_INTERVAL, max_nonce)):
+                    h = prefix.copy()
+                    h.update(b"%d" % nonce + suffix)
+                    block_hash = h.hexdigest()
+                    if block_hash.startswith(target):
+                        hashes += nonce - base + 1
+                        duration = time.time() - start_time
+                        block.nonce = nonce
+                        block.hash = block_hash  # Set the block hash
+                        self._adjust_difficulty(duration, fractal_score)
+                        self.logger.info(
+                            "Found hash %s at nonce %d in %.2fs, difficulty %d",
+                            block_hash[:16], nonce, duration, self.difficulty,
+                            extra={"event": "pow_found", "height": block.index, "hash": block_hash,
+                                   "nonce": nonce, "hashes": hashes, "duration": duration,
+                                   "difficulty": self.difficulty}
+                        )
+                        return MiningResult(
+                            success=True,
+                            hash_val=block_hash,
+                            nonce=nonce,
+                            duration=duration,
+                            block=block,
+                            hashes=hashes
+                        )
+                hashes += min(base + STOP_CHECK_INTERVAL, max_nonce) - base
+            self._roll_search_space(block)
+
+    def _roll_search_space(self, block: Block) -> None:
+        now = time.time()
+        if now - block.timestamp >= TIMESTAMP_ROLL_INTERVAL:
+            block.timestamp = now
+        reward_tx = next((tx for tx in reversed(block.transactions) if tx.sender == "network"), None)
+        if reward_tx is not None:
+            reward_tx.extranonce += 1
+        else:
+            block.timestamp = max(now, block.timestamp + 1e-6)
 
 class ConsensusManager:
-    def __init__(self, blockchain: Blockchain):
+    def __init__(self, blockchain: Blockchain, retarget: bool = True,
+                 block_reward: Optional[Callable[[List[Transaction]], float]] = None):
         self.blockchain = blockchain
-        self.pofw = ProofOfFractalWork(difficulty=blockchain.difficulty)
+        # Subsidy for a block with the given transactions; fees are added on top.
+        self.block_reward = block_reward or (lambda transactions: BLOCK_REWARD)
+        self.pofw = ProofOfFractalWork(difficulty=blockchain.difficulty, retarget=retarget)
         self.logger = logging.getLogger("triadnet.consensus")
         
     def create_block(self, miner_address: str, fractal_coord: FractalCoordinate) -> Block:
         last_block = self.blockchain.last_block
-        transactions = self.blockchain.pending_transactions[:MAX_TRANSACTIONS_PER_BLOCK]
+        transactions = self.blockchain.mempool.select(MAX_BLOCK_WEIGHT - COINBASE_RESERVED_WEIGHT)
         reward_tx = Transaction(
             sender="network",
             receiver=miner_address,
-            amount=BLOCK_REWARD,
-            data="Mining Reward"
+            amount=self.block_reward(transactions) + sum(tx.fee for tx in transactions),
+            data="Mining Reward",
+            timestamp=time.time()
         )
         transactions.append(reward_tx)
         new_block = Block(
@@ -90,21 +134,39 @@ class ConsensusManager:
             transactions=transactions,
             previous_hash=last_block.hash if last_block else "0" * 64,
             miner=miner_address,
-            fractal_coord=fractal_coord
+            fractal_coord=fractal_coord,
+            mmr_root=self.blockchain.header_mmr.root(),
+            state_root=self.blockchain.state_root_after(transactions)
         )
         return new_block
         
-    def mine_block(self, block: Block) -> MiningResult:
-        result = self.pofw.mine_block(block)
+    def mine_block(self, block: Block, should_stop: Optional[Callable[[], bool]] = None) -> MiningResult:
+        """Solve `block` (see solve()) and add it to the chain."""
+        result = self.solve(block, should_stop)
         if result.success:
+            # Connecting the block also drops its transactions from the pending pool
             if self.blockchain.add_block(result.block):  # Use result.block which has the hash set
-                mined_tx_ids = {tx.tx_id for tx in block.transactions}
-                self.blockchain.pending_transactions = [
-                    tx for tx in self.blockchain.pending_transactions 
-                    if tx.tx_id not in mined_tx_ids
-                ]
-                self.logger.info(f"Block {block.index} added to chain")
+                self.logger.info("Block %d added to chain", block.index,
+                                 extra={"event": "block_connected", "height": block.index})
             else:
                 result.success = False
-                self.logger.warning("Block validation failed")
+                self.logger.warning("Block %d failed validation", block.index,
+                                    extra={"event": "block_rejected", "height": block.index, "hash": block.hash})
         return result
+
+    def solve(self, block: Block, should_stop: Optional[Callable[[], bool]] = None) -> MiningResult:
+        """Search for `block`'s proof of work until it is found, the chain tip moves,
+        the template is due a refresh because new transactions arrived, or
+        `should_stop()` says so. Only reads the chain, so it can run off the
+        thread that owns it."""
+        template_revision = self.blockchain.pending_revision
+        template_time = time.time()
+
+        def stale() -> bool:
+            if self.blockchain.last_block.hash != block.previous_hash:
+                return True
+            if (self.blockchain.pending_revision != template_revision
+                    and time.time() - template_time >= TEMPLATE_REFRESH_INTERVAL):
+                return True
+            return should_stop is not None and should_stop()
+        return self.pofw.mine_block(block, should_stop=stale)
@@ -0,0 +1,182 @@
+"""Compressed archival segments for old block ranges.
+
+Sealed ranges are written as segment files holding one zlib frame per block,
+all compressed against a shared dictionary trained from sample blocks, plus a
+per-block offset index so a single block is read by inflating only its frame.
+(lzma has no preset-dictionary support in the standard library, hence zlib.)
+"""
+
+import bisect
+import glob
+import hashlib
+import json
+import logging
+import os
+import re
+import struct
+import threading
+import zlib
+from array import array
+from collections import Counter
+from typing import Iterable, List, Optional
+
+from .block import Block
+
+SEGMENT_MAGIC = b"TRSG"
+SEGMENT_VERSION = 1
+SEGMENT_HEADER = struct.Struct("<4sHQI8s")
+SEGMENT_TRAILER = struct.Struct("<Q")
+DICTIONARY_SIZE = 32 * 1024
+DICTIONARY_FILE = "dictionary.bin"
+
+_TOKEN = re.compile(rb'"[^"]{3,}"|[\[\]{},:]+')
+
+def train_dictionary(samples: Iterable[bytes], size: int = DICTIONARY_SIZE) -> bytes:
+    """Build a zlib preset dictionary from the strings that recur across sample blocks.
+
+    Field names, constant strings and hot addresses are ranked by the bytes they
+    would save; the most valuable go last, where zlib reaches them with the
+    shortest distances.
+    """
+    counts: Counter = Counter()
+    for sample in samples:
+        counts.update(_TOKEN.findall(sample))
+    ranked = sorted(
+        (token for token, count in counts.items() if count > 1),
+        key=lambda token: counts[token] * len(token)
+    )
+    chosen: List[bytes] = []
+    total = 0
+    for token in reversed(ranked):
+        if total + len(token) > size:
+            break
+        chosen.append(token)
+        total += len(token)
+    return b"".join(reversed(chosen))
+
+def dictionary_id(zdict: bytes) -> bytes:
+    return hashlib.sha256(zdict).digest()[:8]
+
+def write_segment(path: str, start_height: int, raw_blocks: List[bytes], zdict: bytes, level: int = 9) -> None:
+    offsets = array("Q")
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(SEGMENT_HEADER.pack(SEGMENT_MAGIC, SEGMENT_VERSION, start_height, len(raw_blocks), dictionary_id(zdict)))
+        for raw in raw_blocks:
+            offsets.append(f.tell())
+            compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS, zdict=zdict)
+            f.write(compressor.compress(raw) + compressor.flush())
+        offsets.append(f.tell())
+        index_offset = f.tell()
+        f.write(offsets.tobytes())
+        f.write(SEGMENT_TRAILER.pack(index_offset))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+class Segment:
+    """A sealed, read-only range of blocks."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            magic, version, self.start_height, self.count, self.dict_id = SEGMENT_HEADER.unpack(
+                f.read(SEGMENT_HEADER.size)
+            )
+            if magic != SEGMENT_MAGIC or version != SEGMENT_VERSION:
+                raise ValueError(f"Not a block segment: {path}")
+            f.seek(-SEGMENT_TRAILER.size, os.SEEK_END)
+            (index_offset,) = SEGMENT_TRAILER.unpack(f.read(SEGMENT_TRAILER.size))
+            f.seek(index_offset)
+            self.offsets = array("Q")
+            self.offsets.frombytes(f.read(8 * (self.count + 1)))
+
+    @property
+    def stop_height(self) -> int:
+        return self.start_height + self.count
+
+    def read_frame(self, height: int, zdict: bytes) -> bytes:
+        pos = height - self.start_height
+        start, end = self.offsets[pos], self.offsets[pos + 1]
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            frame = f.read(end - start)
+        decompressor = zlib.decompressobj(-zlib.MAX_WBITS, zdict=zdict)
+        return decompressor.decompress(frame) + decompressor.flush()
+
+class BlockArchive:
+    """Directory of sealed segments sharing one dictionary."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.logger = logging.getLogger("triadnet.chain")
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.zdict: Optional[bytes] = None
+        dict_path = os.path.join(directory, DICTIONARY_FILE)
+        if os.path.exists(dict_path):
+            with open(dict_path, "rb") as f:
+                self.zdict = f.read()
+        self.segments: List[Segment] = sorted(
+            (Segment(path) for path in glob.glob(os.path.join(directory, "segment_*.blk"))),
+            key=lambda segment: segment.start_height
+        )
+        self._starts = [segment.start_height for segment in self.segments]
+
+    @property
+    def stop_height(self) -> int:
+        return self.segments[-1].stop_height if self.segments else 0
+
+    def __contains__(self, height: int) -> bool:
+        return 0 <= height < self.stop_height
+
+    def _ensure_dictionary(self, samples: List[bytes]) -> bytes:
+        if self.zdict is None:
+            self.zdict = train_dictionary(samples)
+            path = os.path.join(self.directory, DICTIONARY_FILE)
+            with open(f"{path}.tmp", "wb") as f:
+                f.write(self.zdict)
+            os.replace(f"{path}.tmp", path)
+        return self.zdict
+
+    def append_segment(self, start_height: int, raw_blocks: List[bytes]) -> Segment:
+        if start_height != self.stop_height:
+            raise ValueError(f"Segment must start at height {self.stop_height}, not {start_height}")
+        with self._lock:
+            zdict = self._ensure_dictionary(raw_blocks)
+            path = os.path.join(self.directory, f"segment_{start_height:010d}.blk")
+            write_segment(path, start_height, raw_blocks, zdict)
+            segment = Segment(path)
+            self.segments.append(segment)
+            self._starts.append(start_height)
+        raw_size = sum(len(raw) for raw in raw_blocks)
+        packed = os.path.getsize(path)
+        self.logger.info(
+            f"Sealed blocks {start_height}-{segment.stop_height - 1}: {raw_size} -> {packed} bytes"
+        )
+        return segment
+
+    def read_raw(self, height: int) -> bytes:
+        if height not in self:
+            raise KeyError(height)
+        segment = self.segments[bisect.bisect_right(self._starts, height) - 1]
+        if segment.dict_id != dictionary_id(self.zdict):
+            raise ValueError(f"Segment {segment.path} was sealed with a different dictionary")
+        return segment.read_frame(height, self.zdict)
+
+    def read(self, height: int) -> Block:
+        return Block.from_dict(json.loads(self.read_raw(height)))
+
+    def seal(self, store, segment_size: int = 1000, keep_recent: int = 100) -> int:
+        """Move full segments older than the newest `keep_recent` blocks out of `store`."""
+        if self.stop_height > store.base_height:
+            # A crash between append_segment and drop_prefix leaves sealed blocks in the store.
+            store.drop_prefix(self.stop_height)
+        sealed = 0
+        while store.base_height + segment_size <= len(store) - keep_recent:
+            start = store.base_height
+            raw_blocks = [store.read_raw(height) for height in range(start, start + segment_size)]
+            self.append_segment(start, raw_blocks)
+            store.drop_prefix(start + segment_size)
+            sealed += 1
+        return sealed
@@ -1,13 +1,14 @@
 from dataclasses import dataclass, field
-from typing import List, Optional
+from typing import Any, List, Optional, Tuple
 import time
 from datetime import datetime
 from .transaction import Transaction
 from .fractal_coordinate import FractalCoordinate
+from ..crypto.hashing import merkle_root
 import hashlib
 import json
 
-@dataclass
+@dataclass(slots=True)
 class Block:
     index: int
     timestamp: float
@@ -15,14 +16,30 @@ class Block:
     miner: str
     fractal_coord: FractalCoordinate
     previous_hash: str = field(default="0" * 64)
+    # Root of the header MMR over every ancestor (see core/mmr.py). Blocks that
+    # carry one hash a header committing to their transactions' Merkle root
+    # instead of the transactions themselves, so headers can travel alone.
+    mmr_root: str = ""
+    # Root of the balance tree after this block's transactions (see core/state_tree.py).
+    state_root: str = ""
     hash: str = field(default="", init=False)
     nonce: int = field(default=0, init=False)
     
-    def calculate_hash(self) -> str:
-        block_dict = {
+    def _hash_dict(self) -> dict:
+        # Legacy blocks (no commitment) hash their full transaction list.
+        if not self.mmr_root:
+            transactions = {"transactions": [tx.to_dict() for tx in self.transactions]}
+        else:
+            transactions = {
+                "transactions_root": merkle_root([tx.to_dict() for tx in self.transactions]),
+                "mmr_root": self.mmr_root
+            }
+        if self.state_root:
+            transactions["state_root"] = self.state_root
+        return {
             "index": self.index,
             "timestamp": self.timestamp,
-            "transactions": [tx.__dict__ for tx in self.transactions],
+            **transactions,
             "previous_hash": self.previous_hash,
             "miner": self.miner,
             "fractal_coord": {
@@ -32,5 +49,69 @@ class Block:
             },
             "nonce": self.nonce
         }
+
+    def header(self) -> dict:
+        """Everything the block hash covers, for light clients; see header_hash().
+        Only blocks with an mmr_root have headers much smaller than the block."""
+        return self._hash_dict()
+
+    def calculate_hash(self) -> str:
+        return header_hash(self._hash_dict())
+
+    def hash_template(self) -> Tuple[Any, bytes]:
+        """Split the hashed encoding around the nonce.
+
+        Returns a sha256 object already fed everything before the nonce digits and
+        the bytes that follow them, so miners can hash nonce after nonce without
+        re-serializing the block: `h = prefix.copy(); h.update(b"%d" % nonce + suffix)`.
+        """
+        block_dict = self._hash_dict()
+        block_dict["nonce"] = 0
         block_string = json.dumps(block_dict, sort_keys=True)
-        return hashlib.sha256(block_string.encode()).hexdigest()
+        split = block_string.index('"nonce": 0') + len('"nonce": ')
+        prefix = hashlib.sha256(block_string[:split].encode())
+        return prefix, block_string[split + 1:].encode()
+
+    def compact_transactions(self) -> None:
+        """Switch to column-wise transaction storage (see core/columns.py).
+
+        Meant for blocks that are final: transactions are rebuilt on every
+        access, so changes made to them afterwards are not kept.
+        """
+        from .columns import TransactionColumns
+        if not isinstance(self.transactions, TransactionColumns):
+            self.transactions = TransactionColumns(self.transactions)
+
+    def to_dict(self) -> dict:
+        return {
+            "index": self.index,
+            "timestamp": self.timestamp,
+            "transactions": [tx.to_dict() for tx in self.transactions],
+            "previous_hash": self.previous_hash,
+            "miner": self.miner,
+            "fractal_coord": self.fractal_coord.to_dict(),
+            "nonce": self.nonce,
+            "mmr_root": self.mmr_root,
+            "state_root": self.state_root,
+            "hash": self.hash
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Block":
+        block = cls(
+            index=data["index"],
+            timestamp=data["timestamp"],
+            transactions=[Transaction.from_dict(tx) for tx in data["transactions"]],
+            previous_hash=data["previous_hash"],
+            miner=data["miner"],
+            fractal_coord=FractalCoordinate.from_dict(data["fractal_coord"]),
+            mmr_root=data.get("mmr_root", ""),
+            state_root=data.get("state_root", "")
+        )
+        block.nonce = data["nonce"]
+        block.hash = data["hash"]
+        return block
+
+def header_hash(header: dict) -> str:
+    """Block hash from a header() dict (or a legacy block's full hash dict)."""
+    return hashlib.sha256(json.dumps(header, sort_keys=True).encode()).hexdigest()
@@ -0,0 +1,103 @@
+"""Per-block index entries with skip-list ancestor pointers.
+
+Each entry records its block's height, cumulative work, parent entry and a
+`skip` entry further back, chosen as in Bitcoin's CBlockIndex::pskip so that
+get_ancestor() reaches any height in O(log n) hops. Entries are created once,
+when the block joins the tree, and never change.
+"""
+
+from typing import Dict, Iterator, Optional
+
+def _invert_lowest_one(n: int) -> int:
+    return n & (n - 1)
+
+def skip_height(height: int) -> int:
+    """Height the skip pointer of a block at `height` targets. Any height works;
+    this choice makes ancestor walks logarithmic."""
+    if height < 2:
+        return 0
+    if height & 1:
+        return _invert_lowest_one(_invert_lowest_one(height - 1)) + 1
+    return _invert_lowest_one(height)
+
+class BlockIndexEntry:
+    __slots__ = ("hash", "height", "work", "parent", "skip")
+
+    def __init__(self, block_hash: str, height: int, work: int, parent: Optional["BlockIndexEntry"]):
+        self.hash = block_hash
+        self.height = height
+        self.work = work
+        self.parent = parent
+        self.skip = parent.get_ancestor(skip_height(height)) if parent is not None else None
+
+    def get_ancestor(self, height: int) -> Optional["BlockIndexEntry"]:
+        """The ancestor at `height` (self if equal), or None if it is above us or
+        below the oldest indexed block."""
+        if height > self.height or height < 0:
+            return None
+        walk: Optional[BlockIndexEntry] = self
+        walk_height = self.height
+        while walk is not None and walk_height > height:
+            skip_to = skip_height(walk_height)
+            prev_skip = skip_height(walk_height - 1)
+            if walk.skip is not None and (
+                skip_to == height
+                or (skip_to > height and not (prev_skip < skip_to - 2 and prev_skip >= height))
+            ):
+                walk = walk.skip
+                walk_height = skip_to
+            else:
+                walk = walk.parent
+                walk_height -= 1
+        return walk
+
+    def __repr__(self) -> str:
+        return f"BlockIndexEntry(height={self.height}, hash={self.hash[:16]})"
+
+def last_common_ancestor(a: BlockIndexEntry, b: BlockIndexEntry) -> Optional[BlockIndexEntry]:
+    """Fork point of two entries, or None if their indexed histories never meet."""
+    if a.height > b.height:
+        a = a.get_ancestor(b.height)
+    elif b.height > a.height:
+        b = b.get_ancestor(a.height)
+    while a is not b and a is not None and b is not None:
+        # Equal heights have equal skip heights, so both sides can jump together.
+        if a.skip is not None and b.skip is not None and a.skip is not b.skip:
+            a, b = a.skip, b.skip
+        else:
+            a, b = a.parent, b.parent
+    return a if a is b else None
+
+class BlockIndex:
+    """hash -> BlockIndexEntry for every block in the tree."""
+
+    def __init__(self):
+        self._entries: Dict[str, BlockIndexEntry] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, block_hash: str) -> bool:
+        return block_hash in self._entries
+
+    def __getitem__(self, block_hash: str) -> BlockIndexEntry:
+        return self._entries[block_hash]
+
+    def __iter__(self) -> Iterator[BlockIndexEntry]:
+        return iter(self._entries.values())
+
+    def get(self, block_hash: str) -> Optional[BlockIndexEntry]:
+        return self._entries.get(block_hash)
+
+    def add(self, block_hash: str, parent_hash: str, work: int) -> BlockIndexEntry:
+        """Index a block carrying `work` on top of its already indexed parent."""
+        parent = self._entries[parent_hash]
+        entry = BlockIndexEntry(block_hash, parent.height + 1, parent.work + work, parent)
+        self._entries[block_hash] = entry
+        return entry
+
+    def add_root(self, block_hash: str, height: int, chain_work: int) -> BlockIndexEntry:
+        """Index a block with no indexed parent: genesis, or the oldest block kept after pruning."""
+        entry = BlockIndexEntry(block_hash, height, chain_work, None)
+        self._entries[block_hash] = entry
+        return entry
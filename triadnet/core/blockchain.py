@@ -1,54 +1,491 @@
-from typing import List, Optional
+from typing import Callable, Dict, List, Optional, Set
 from datetime import datetime
+from collections import OrderedDict
 import json
 import logging
 from .block import Block
 from .transaction import Transaction
+from .mempool import Mempool
+from .block_index import BlockIndex, last_common_ancestor
+from .mmr import HeaderMMR, bag_peaks, leaf_hash, push_leaf
+from .state_tree import SparseMerkleTree
 from .fractal_coordinate import FractalCoordinate
+from ..enum import BlockStatus
+
+MAX_ORPHAN_BLOCKS = 256
+MAX_REORG_DEPTH = 100
+LOCATOR_DENSE_STEPS = 10
+# Blocks this far below the tip switch to column-wise transaction storage.
+COMPACT_DEPTH = 6
+
+class PrunedChain:
+    """Active chain that keeps only blocks from `base` up in memory.
+
+    Older heights sit below the undo horizon and are loaded through `load`
+    (typically BlockStore.read) only when something asks for them.
+    """
+
+    def __init__(self, base: int, recent: List[Block], load: Callable[[int], Block]):
+        self.base = base
+        self.recent = recent
+        self.load = load
+
+    def __len__(self) -> int:
+        return self.base + len(self.recent)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        if index < self.base:
+            return self.load(index)
+        return self.recent[index - self.base]
+
+    def __iter__(self):
+        for height in range(len(self)):
+            yield self[height]
+
+    def append(self, block: Block) -> None:
+        self.recent.append(block)
+
+    def pop(self) -> Block:
+        if not self.recent:
+            raise IndexError(f"Cannot disconnect below pruned height {self.base}")
+        return self.recent.pop()
 
 class Blockchain:
-    def __init__(self, difficulty: int = 4):
+    def __init__(self, difficulty: int = 4, genesis_timestamp: Optional[float] = None):
+        # `chain` is the active branch; `blocks` holds every known block in the tree.
         self.chain: List[Block] = []
-        self.pending_transactions: List[Transaction] = []
+        self.blocks: Dict[str, Block] = {}
+        self.orphans: "OrderedDict[str, Block]" = OrderedDict()
+        self.mempool = Mempool()
+        # Bumped whenever a transaction enters the pending pool, so miners can
+        # tell when their block template is missing new work.
+        self.pending_revision = 0
+        self.balances: Dict[str, float] = {}
         self.difficulty = difficulty
+        self.index = BlockIndex()
+        self.header_mmr = HeaderMMR()
+        self.state_tree = SparseMerkleTree()
+        self._undo: Dict[str, Dict[str, Optional[float]]] = {}
+        # Blocks that failed validation once connected to their branch, and their
+        # descendants; anything built on them is rejected without rechecking.
+        self.invalid_blocks: Set[str] = set()
+        self._listeners: List = []
+        self.logger = logging.getLogger("triadnet.chain")
         if not self.chain:
-            self._create_genesis_block()
-            
-    def _create_genesis_block(self) -> None:
+            self._create_genesis_block(genesis_timestamp)
+
+    def _create_genesis_block(self, timestamp: Optional[float] = None) -> None:
         genesis_coord = FractalCoordinate(a=0, b=0, c=0)
         genesis_block = Block(
             index=0,
-            timestamp=datetime.utcnow().timestamp(),
+            timestamp=timestamp if timestamp is not None else datetime.utcnow().timestamp(),
             transactions=[],
             previous_hash="0" * 64,
             miner="network",
             fractal_coord=genesis_coord
         )
         genesis_block.hash = genesis_block.calculate_hash()
-        self.chain.append(genesis_block)
-        
+        self.blocks[genesis_block.hash] = genesis_block
+        self.index.add_root(genesis_block.hash, 0, self.block_work(genesis_block))
+        self._connect_block(genesis_block)
+
     @property
     def last_block(self) -> Optional[Block]:
         return self.chain[-1] if self.chain else None
-        
+
+    @property
+    def tip_work(self) -> int:
+        return self.index[self.last_block.hash].work
+
+    def block_work(self, block: Block) -> int:
+        # Every block must meet the same fixed target, so each carries equal work.
+        return 16 ** self.difficulty
+
+    def cumulative_work(self, block_hash: str) -> Optional[int]:
+        entry = self.index.get(block_hash)
+        return entry.work if entry is not None else None
+
+    def height_of(self, block_hash: str) -> Optional[int]:
+        entry = self.index.get(block_hash)
+        return entry.height if entry is not None else None
+
+    def contains(self, block_hash: str) -> bool:
+        return block_hash in self.blocks or block_hash in self.orphans
+
+    def is_on_active_chain(self, block_hash: str) -> bool:
+        entry = self.index.get(block_hash)
+        return entry is not None and entry.height < len(self.chain) and self.chain[entry.height].hash == block_hash
+
+    def get_ancestor(self, block_hash: str, height: int) -> Optional[str]:
+        """Hash of the block at `height` on the branch ending at `block_hash`."""
+        entry = self.index.get(block_hash)
+        ancestor = entry.get_ancestor(height) if entry is not None else None
+        if ancestor is None and entry is not None and 0 <= height <= entry.height:
+            # Below the oldest indexed block of a pruned chain only the active
+            # branch is known, so the ancestor is whatever sits at that height.
+            return self.chain[height].hash
+        return ancestor.hash if ancestor is not None else None
+
+    def fork_point(self, hash_a: str, hash_b: str) -> Optional[str]:
+        """Hash of the last block shared by the branches ending at the two hashes."""
+        common = last_common_ancestor(self.index[hash_a], self.index[hash_b])
+        return common.hash if common is not None else None
+
+    def locator(self, block_hash: Optional[str] = None) -> List[str]:
+        """Block hashes stepping back from `block_hash` (default: the tip), one by one
+        for LOCATOR_DENSE_STEPS blocks and then doubling the gap, ending at genesis.
+        A peer finds the first hash it knows on its own active chain to locate the fork."""
+        entry = self.index[block_hash or self.last_block.hash]
+        hashes = []
+        step = 1
+        height = entry.height
+        while height > 0:
+            hashes.append(self.get_ancestor(entry.hash, height))
+            if len(hashes) >= LOCATOR_DENSE_STEPS:
+                step *= 2
+            height -= step
+        hashes.append(self.chain[0].hash)
+        return hashes
+
+    def provable_header_mmr(self) -> HeaderMMR:
+        """The header range with every node, rebuilt once from stored blocks if
+        this chain was bootstrapped from a snapshot."""
+        if not self.header_mmr.can_prove:
+            rebuilt = HeaderMMR()
+            for block in self.chain:
+                rebuilt.append(block.hash)
+            self.header_mmr = rebuilt
+        return self.header_mmr
+
+    def find_fork(self, locator: List[str]) -> int:
+        """Height of the first locator entry on our active chain (genesis if none)."""
+        for block_hash in locator:
+            if self.is_on_active_chain(block_hash):
+                return self.index[block_hash].height
+        return 0
+
+    def add_listener(self, listener) -> None:
+        """Register an object with block_connected(block, height) and
+        block_disconnected(block, height) callbacks for active-chain changes."""
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener) -> None:
+        self._listeners.remove(listener)
+
+    def new_blocks(self, maxsize: Optional[int] = None):
+        """Async iterator over blocks connected from this call on; see aio.BlockFeed.
+        Must be called from the event loop that consumes it."""
+        from ..aio import DEFAULT_FEED_SIZE, watch_blocks
+        return watch_blocks(self, maxsize or DEFAULT_FEED_SIZE)
+
     def add_block(self, block: Block) -> bool:
-        if not self._is_valid_block(block):
+        return self.process_block(block) in (
+            BlockStatus.CONNECTED, BlockStatus.REORGANIZED, BlockStatus.SIDE_CHAIN
+        )
+
+    def process_block(self, block: Block, hash_verified: bool = False) -> BlockStatus:
+        """Add `block` to the tree. Pass `hash_verified` only if block.hash was
+        already recomputed from its contents (e.g. by the import pipeline)."""
+        if block.hash in self.invalid_blocks:
+            return BlockStatus.INVALID
+        if self.contains(block.hash):
+            return BlockStatus.DUPLICATE
+        if block.previous_hash not in self.blocks:
+            if not self._has_valid_pow(block, hash_verified):
+                return BlockStatus.INVALID
+            self.orphans[block.hash] = block
+            while len(self.orphans) > MAX_ORPHAN_BLOCKS:
+                self.orphans.popitem(last=False)
+            return BlockStatus.ORPHAN
+        status = self._accept_block(block, hash_verified)
+        if status != BlockStatus.INVALID:
+            self._process_orphans(block.hash)
+        return status
+
+    def _accept_block(self, block: Block, hash_verified: bool = False) -> BlockStatus:
+        if block.previous_hash in self.invalid_blocks:
+            self.invalid_blocks.add(block.hash)
+            return BlockStatus.INVALID
+        if not self._is_valid_block(block, hash_verified):
+            return BlockStatus.INVALID
+        self.blocks[block.hash] = block
+        entry = self.index.add(block.hash, block.previous_hash, self.block_work(block))
+        if entry.work <= self.tip_work:
+            return BlockStatus.SIDE_CHAIN
+        if block.previous_hash == self.last_block.hash:
+            self._connect_block(block)
+            return BlockStatus.CONNECTED
+        if not self._reorganize(block):
+            return BlockStatus.SIDE_CHAIN
+        return BlockStatus.REORGANIZED
+
+    def _process_orphans(self, parent_hash: str) -> None:
+        parents = [parent_hash]
+        while parents:
+            parent = parents.pop()
+            children = [o for o in self.orphans.values() if o.previous_hash == parent]
+            for child in children:
+                del self.orphans[child.hash]
+                if self._accept_block(child) != BlockStatus.INVALID:
+                    parents.append(child.hash)
+
+    def _reorganize(self, new_tip: Block) -> bool:
+        fork = last_common_ancestor(self.index[new_tip.hash], self.index[self.last_block.hash])
+        if fork is None:
+            self.logger.warning(f"Refusing reorg to {new_tip.hash[:16]}: no common ancestor is indexed")
+            return False
+        fork_height = fork.height
+        branch = []
+        cursor = new_tip
+        while cursor.hash != fork.hash:
+            branch.append(cursor)
+            cursor = self.blocks[cursor.previous_hash]
+        if any(block.hash not in self._undo for block in self.chain[fork_height + 1:]):
+            self.logger.warning(f"Refusing reorg below undo horizon at height {fork_height}")
+            return False
+        if not self._branch_commitments_valid(fork_height, list(reversed(branch))):
             return False
+        if not self._branch_state_valid(fork_height, list(reversed(branch))):
+            return False
+        self.logger.info(
+            f"Reorganizing: disconnecting {len(self.chain) - 1 - fork_height} blocks, "
+            f"connecting {len(branch)} from fork at height {fork_height}"
+        )
+        while len(self.chain) - 1 > fork_height:
+            self._disconnect_tip()
+        for block in reversed(branch):
+            self._connect_block(block)
+        return True
+
+    def _state_changes(self, transactions: List[Transaction],
+                       balances: Optional[Dict[str, Optional[float]]] = None) -> Dict[str, float]:
+        """New balance of every owned address `transactions` touch, applied over
+        `balances` (an overlay of changes, None meaning absent) and then self.balances."""
+        changes: Dict[str, float] = {}
+        for tx in transactions:
+            for address, delta in ((tx.sender, -tx.amount - tx.fee), *tx.credits()):
+                if address == "network" or not self.owns_address(address):
+                    continue
+                if address in changes:
+                    current = changes[address]
+                elif balances is not None and address in balances:
+                    current = balances[address]
+                else:
+                    current = self.balances.get(address)
+                changes[address] = (current if current is not None else 0.0) + delta
+        return changes
+
+    def state_root_after(self, transactions: List[Transaction]) -> str:
+        """State root a block with `transactions` on the current tip must carry."""
+        return self.state_tree.root_after(self._state_changes(transactions))
+
+    def prove_balance(self, address: str) -> dict:
+        """Balance of `address` at the tip with a proof against the tip's state_root
+        (see state_tree.verify_balance); the root is only committed if the tip carries it."""
+        return {
+            "height": len(self.chain) - 1,
+            "block_hash": self.last_block.hash,
+            "state_root": self.state_tree.root(),
+            "balance": self.state_tree.get(address),
+            "proof": self.state_tree.prove(address),
+        }
+
+    def _connect_block(self, block: Block) -> None:
+        changes = self._state_changes(block.transactions)
+        self._undo[block.hash] = {address: self.balances.get(address) for address in changes}
+        self._prune_undo(block)
+        self.balances.update(changes)
+        self.state_tree.update(changes)
         self.chain.append(block)
+        self.header_mmr.append(block.hash)
+        self.mempool.remove(tx.tx_id for tx in block.transactions)
+        for listener in self._listeners:
+            listener.block_connected(block, len(self.chain) - 1)
+        self._compact_buried(block)
+
+    def _prune_undo(self, tip: Block) -> None:
+        """Drop the undo record that just fell below MAX_REORG_DEPTH; _reorganize
+        refuses to disconnect that far anyway."""
+        entry = self.index.get(tip.hash)
+        expired = entry.get_ancestor(entry.height - MAX_REORG_DEPTH) if entry else None
+        if expired is not None:
+            self._undo.pop(expired.hash, None)
+
+    def _compact_buried(self, tip: Block) -> None:
+        """Compact the block COMPACT_DEPTH below `tip`. Listeners have already
+        read it as a list, and it is rarely reread, but it stays in memory for
+        reorgs and peers, where columns take about a third of the space."""
+        entry = self.index.get(tip.hash)
+        ancestor = entry.get_ancestor(entry.height - COMPACT_DEPTH) if entry else None
+        buried = self.blocks.get(ancestor.hash) if ancestor else None
+        if buried is not None and buried.index > 0:
+            buried.compact_transactions()
+
+    def _disconnect_tip(self) -> Block:
+        block = self.chain.pop()
+        self.header_mmr.truncate(len(self.chain))
+        for listener in reversed(self._listeners):
+            listener.block_disconnected(block, len(self.chain))
+        undo = self._undo.pop(block.hash)
+        for address, previous in undo.items():
+            if previous is None:
+                self.balances.pop(address, None)
+            else:
+                self.balances[address] = previous
+        self.state_tree.update(undo)
+        returned = [tx for tx in block.transactions if tx.sender != "network"]
+        self.mempool.restore(returned)
+        return block
+
+    def undo_records(self, depth: int = MAX_REORG_DEPTH) -> Dict[str, Dict[str, Optional[float]]]:
+        return {
+            block.hash: dict(self._undo[block.hash])
+            for block in self.chain[-depth:] if block.hash in self._undo
+        }
+
+    @classmethod
+    def from_snapshot(cls, snapshot, recent: List[Block], load_block: Callable[[int], Block]) -> "Blockchain":
+        """Rebuild a chain whose state at recent[-1] comes from `snapshot` rather than replay.
+
+        Only `recent` (the blocks a reorg could still disconnect) is held in memory;
+        older heights are fetched through `load_block` on demand.
+        """
+        base = snapshot.height + 1 - len(recent)
+        if not recent or base < 0 or recent[-1].hash != snapshot.block_hash:
+            raise ValueError("Stored blocks do not match snapshot tip")
+        for parent, child in zip(recent, recent[1:]):
+            if child.previous_hash != parent.hash:
+                raise ValueError(f"Stored blocks are not linked at height {child.index}")
+        genesis = recent[0] if base == 0 else load_block(0)
+        chain = cls(difficulty=snapshot.difficulty, genesis_timestamp=genesis.timestamp)
+        if genesis.hash != chain.chain[0].hash:
+            raise ValueError("Stored genesis block does not match")
+        if base:
+            # Blocks carry equal work, so the oldest kept block sits on base + 1 units.
+            chain.index.add_root(recent[0].hash, base, (base + 1) * chain.block_work(recent[0]))
+        for block in recent[1:]:
+            chain.index.add(block.hash, block.previous_hash, chain.block_work(block))
+        for block in recent:
+            chain.blocks[block.hash] = block
+        saved = getattr(snapshot, "header_mmr", None)
+        if base and saved and saved["size"] == base:
+            chain.header_mmr = HeaderMMR(base, [bytes.fromhex(peak) for peak in saved["peaks"]])
+        else:
+            chain.header_mmr = HeaderMMR()
+            for height in range(base):
+                chain.header_mmr.append(load_block(height).hash)
+        for block in recent:
+            chain.header_mmr.append(block.hash)
+        chain.chain = PrunedChain(base, list(recent), load_block) if base else list(recent)
+        chain.balances = dict(snapshot.balances)
+        chain.state_tree = SparseMerkleTree.from_balances(chain.balances)
+        if recent[-1].state_root and chain.state_tree.root() != recent[-1].state_root:
+            raise ValueError("Snapshot balances do not match the tip's state root")
+        chain._undo = {block_hash: dict(undo) for block_hash, undo in snapshot.undo.items()}
+        for tx in snapshot.pending_transactions:
+            chain.mempool.add(Transaction.from_dict(tx))
+        return chain
+
+    def owns_address(self, address: str) -> bool:
+        """Whether this chain keeps the balance of `address`; shard chains keep only their partition."""
         return True
-        
+
+    def get_balance(self, address: str) -> float:
+        return self.balances.get(address, 0.0)
+
+    @property
+    def pending_transactions(self) -> List[Transaction]:
+        return self.mempool.transactions()
+
     def add_pending_transaction(self, transaction: Transaction) -> None:
-        self.pending_transactions.append(transaction)
-        
-    def _is_valid_block(self, block: Block) -> bool:
-        if block.index != len(self.chain):
+        if self.mempool.add(transaction):
+            self.pending_revision += 1
+
+    def _meets_target(self, block: Block) -> bool:
+        return block.hash.startswith("0" * self.difficulty)
+
+    def _has_valid_pow(self, block: Block, hash_verified: bool = False) -> bool:
+        # The hash field comes from the sender; only a recomputed hash proves the work.
+        return self._meets_target(block) and (hash_verified or block.hash == block.calculate_hash())
+
+    def _is_valid_block(self, block: Block, hash_verified: bool = False) -> bool:
+        parent = self.index.get(block.previous_hash)
+        if parent is None:
             return False
-        if block.previous_hash != self.last_block.hash:
+        if block.index != parent.height + 1:
             return False
-        if not block.hash.startswith("0" * self.difficulty):
+        if not self._has_valid_pow(block, hash_verified):
             return False
+        if self.is_on_active_chain(block.previous_hash):
+            # Blocks on other branches are checked when _reorganize reaches them.
+            expected = self.header_mmr.root(parent.height + 1) if block.mmr_root else None
+            if not self._commitment_ok(block, self.blocks[block.previous_hash], expected):
+                return False
+        if block.previous_hash == self.last_block.hash:
+            # The state a block applies to is only at hand when it extends the tip.
+            expected = self.state_root_after(block.transactions) if block.state_root else None
+            if not self._state_root_ok(block, self.last_block, expected):
+                return False
         return True
-        
+
+    def _state_root_ok(self, block: Block, parent: Block, expected_root: Optional[str]) -> bool:
+        if not block.state_root:
+            return not parent.state_root
+        return block.state_root == expected_root
+
+    def _commitment_ok(self, block: Block, parent: Block, expected_root: Optional[str]) -> bool:
+        if not block.mmr_root:
+            # Once a block commits to the header range, every descendant must too.
+            return not parent.mmr_root
+        return block.mmr_root == expected_root
+
+    def _branch_commitments_valid(self, fork_height: int, branch: List[Block]) -> bool:
+        """Check the header commitments of `branch` (oldest first) as if it were
+        connected on top of the active block at `fork_height`."""
+        size = fork_height + 1
+        peaks = self.header_mmr.peaks_at(size)
+        if peaks is None:
+            self.logger.warning(f"Header range no longer covers fork height {fork_height}")
+            return False
+        parent = self.chain[fork_height]
+        for position, block in enumerate(branch):
+            expected = bag_peaks(peaks, size) if block.mmr_root else None
+            if not self._commitment_ok(block, parent, expected):
+                self.logger.warning(f"Refusing reorg: block {block.hash[:16]} has a bad header commitment")
+                self._mark_invalid(branch[position:])
+                return False
+            peaks = push_leaf(peaks, size, leaf_hash(block.hash))
+            size += 1
+            parent = block
+        return True
+
+    def _branch_state_valid(self, fork_height: int, branch: List[Block]) -> bool:
+        """Check the state roots of `branch` (oldest first) against the balances
+        the undo records give back at `fork_height`."""
+        overlay: Dict[str, Optional[float]] = {}
+        for block in reversed(self.chain[fork_height + 1:]):
+            overlay.update(self._undo[block.hash])
+        parent = self.chain[fork_height]
+        for position, block in enumerate(branch):
+            overlay.update(self._state_changes(block.transactions, overlay))
+            expected = self.state_tree.root_after(overlay) if block.state_root else None
+            if not self._state_root_ok(block, parent, expected):
+                self.logger.warning(f"Refusing reorg: block {block.hash[:16]} has a bad state root")
+                self._mark_invalid(branch[position:])
+                return False
+            parent = block
+        return True
+
+    def _mark_invalid(self, blocks: List[Block]) -> None:
+        """Record a failed branch block and its descendants (`blocks`, oldest first)."""
+        self.invalid_blocks.update(block.hash for block in blocks)
+
     def is_valid_chain(self) -> bool:
         for i in range(1, len(self.chain)):
             current = self.chain[i]
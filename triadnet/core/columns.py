@@ -0,0 +1,117 @@
+"""Column-wise storage for a block's transactions.
+
+A TransactionColumns holds each Transaction field in its own compact array:
+amounts, fees and timestamps as doubles, extranonces as int64, addresses as
+indexes into a per-block table of interned strings, and hex tx ids as packed
+32-byte digests. Transactions are rebuilt on access, so it reads like a list
+of Transaction but costs a few dozen bytes per entry instead of a few hundred.
+
+Numbers keep the Python type they were created with (an int amount is hashed
+as "50", a float as "50.0"), so a block whose transactions are compacted
+still hashes the same.
+"""
+
+import re
+import sys
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+from .transaction import Transaction
+
+_HEX_ID = re.compile(r"[0-9a-f]{64}")
+_INT_AMOUNT, _INT_FEE, _INT_TIMESTAMP = 1, 2, 4
+
+class TransactionColumns:
+    def __init__(self, transactions: Iterable[Transaction] = ()):
+        self.addresses: List[str] = []
+        self._address_ids: Dict[str, int] = {}
+        self.senders = array("I")
+        self.receivers = array("I")
+        self.amounts = array("d")
+        self.fees = array("d")
+        self.timestamps = array("d")
+        self.extranonces = array("q")
+        self.int_flags = bytearray()
+        self.data: List[str] = []
+        self.signatures: List[Optional[str]] = []
+        # Batch outputs are rare enough to keep by row rather than as a column.
+        self.outputs: Dict[int, tuple] = {}
+        self._digests: Optional[bytearray] = bytearray()
+        self._tx_ids: Optional[List[str]] = None
+        for tx in transactions:
+            self.append(tx)
+
+    def _address_id(self, address: str) -> int:
+        index = self._address_ids.get(address)
+        if index is None:
+            index = self._address_ids[address] = len(self.addresses)
+            self.addresses.append(sys.intern(address))
+        return index
+
+    def append(self, tx: Transaction) -> None:
+        if self._digests is not None and not _HEX_ID.fullmatch(tx.tx_id):
+            # Fall back to plain strings once any id is not a sha256 hex digest.
+            self._tx_ids = [self.tx_id(i) for i in range(len(self))]
+            self._digests = None
+        if self._digests is not None:
+            self._digests += bytes.fromhex(tx.tx_id)
+        else:
+            self._tx_ids.append(tx.tx_id)
+        self.senders.append(self._address_id(tx.sender))
+        self.receivers.append(self._address_id(tx.receiver))
+        self.amounts.append(tx.amount)
+        self.fees.append(tx.fee)
+        self.timestamps.append(tx.timestamp)
+        self.extranonces.append(tx.extranonce)
+        self.int_flags.append(
+            (_INT_AMOUNT if type(tx.amount) is int else 0)
+            | (_INT_FEE if type(tx.fee) is int else 0)
+            | (_INT_TIMESTAMP if type(tx.timestamp) is int else 0)
+        )
+        self.data.append(sys.intern(tx.data) if isinstance(tx.data, str) else tx.data)
+        if tx.outputs is not None:
+            self.outputs[len(self.signatures)] = tx.outputs
+        self.signatures.append(tx.signature)
+
+    def tx_id(self, index: int) -> str:
+        if self._digests is None:
+            return self._tx_ids[index]
+        return self._digests[index * 32:(index + 1) * 32].hex()
+
+    def __len__(self) -> int:
+        return len(self.senders)
+
+    def _number(self, column: array, index: int, flag: int) -> Union[int, float]:
+        value = column[index]
+        return int(value) if self.int_flags[index] & flag else value
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return Transaction(
+            sender=self.addresses[self.senders[index]],
+            receiver=self.addresses[self.receivers[index]],
+            amount=self._number(self.amounts, index, _INT_AMOUNT),
+            data=self.data[index],
+            timestamp=self._number(self.timestamps, index, _INT_TIMESTAMP),
+            tx_id=self.tx_id(index),
+            signature=self.signatures[index],
+            extranonce=self.extranonces[index],
+            fee=self._number(self.fees, index, _INT_FEE),
+            outputs=self.outputs.get(index),
+        )
+
+    def __iter__(self) -> Iterator[Transaction]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def __reversed__(self) -> Iterator[Transaction]:
+        for index in reversed(range(len(self))):
+            yield self[index]
+
+    def to_list(self) -> List[Transaction]:
+        return list(self)
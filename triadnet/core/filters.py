@@ -0,0 +1,336 @@
+"""Compact per-block address filters for light wallets.
+
+Each block gets a Golomb-coded set (GCS) over the addresses its transactions
+touch, in the style of BIP158. Nodes chain the filter hashes into filter
+headers so a wallet can check filters it downloads against a single header
+it trusts, and only fetch full blocks whose filter matches. BlockFilterIndex
+stores both in sqlite and builds them lazily, so it never walks a pruned
+chain's archived blocks just to start up.
+"""
+
+import hashlib
+import sqlite3
+import threading
+from typing import Callable, Iterable, List, Optional, Set, Tuple
+
+from .block import Block
+
+FILTER_P = 19
+FILTER_M = 784931
+GENESIS_FILTER_HEADER = "0" * 64
+
+def _write_varint(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            return value, pos
+
+class _BitWriter:
+    def __init__(self):
+        self.buffer = bytearray()
+        self._acc = 0
+        self._bits = 0
+
+    def write(self, value: int, nbits: int) -> None:
+        self._acc = (self._acc << nbits) | value
+        self._bits += nbits
+        while self._bits >= 8:
+            self._bits -= 8
+            self.buffer.append((self._acc >> self._bits) & 0xFF)
+        self._acc &= (1 << self._bits) - 1
+
+    def finish(self) -> bytes:
+        if self._bits:
+            self.buffer.append((self._acc << (8 - self._bits)) & 0xFF)
+            self._acc = self._bits = 0
+        return bytes(self.buffer)
+
+class _BitReader:
+    def __init__(self, data: bytes, pos: int = 0):
+        self.data = data
+        self.pos = pos * 8
+
+    def read_bit(self) -> int:
+        byte = self.data[self.pos >> 3]
+        bit = (byte >> (7 - (self.pos & 7))) & 1
+        self.pos += 1
+        return bit
+
+    def read(self, nbits: int) -> int:
+        value = 0
+        for _ in range(nbits):
+            value = (value << 1) | self.read_bit()
+        return value
+
+class GolombCodedSet:
+    """Sorted, Golomb-Rice coded hashes of a set of items, keyed per block."""
+
+    def __init__(self, n: int, data: bytes, key: bytes, p: int = FILTER_P, m: int = FILTER_M):
+        self.n = n
+        self.data = data
+        self.key = key
+        self.p = p
+        self.m = m
+
+    @staticmethod
+    def _hash_items(items: Iterable[bytes], key: bytes, n: int, m: int) -> List[int]:
+        f = n * m
+        values = []
+        for item in items:
+            digest = hashlib.blake2b(item, key=key, digest_size=8).digest()
+            values.append((int.from_bytes(digest, "big") * f) >> 64)
+        return values
+
+    @classmethod
+    def build(cls, items: Iterable[bytes], key: bytes, p: int = FILTER_P, m: int = FILTER_M) -> "GolombCodedSet":
+        unique = set(items)
+        values = sorted(cls._hash_items(unique, key, len(unique), m))
+        writer = _BitWriter()
+        last = 0
+        for value in values:
+            delta = value - last
+            last = value
+            quotient = delta >> p
+            writer.write(((1 << quotient) - 1) << 1, quotient + 1)
+            writer.write(delta & ((1 << p) - 1), p)
+        return cls(len(unique), writer.finish(), key, p, m)
+
+    def _decoded(self) -> Iterable[int]:
+        reader = _BitReader(self.data)
+        value = 0
+        for _ in range(self.n):
+            quotient = 0
+            while reader.read_bit():
+                quotient += 1
+            value += (quotient << self.p) | reader.read(self.p)
+            yield value
+
+    def match_any(self, items: Iterable[bytes]) -> bool:
+        if not self.n:
+            return False
+        queries = sorted(self._hash_items(items, self.key, self.n, self.m))
+        if not queries:
+            return False
+        qi = 0
+        for value in self._decoded():
+            while queries[qi] < value:
+                qi += 1
+                if qi == len(queries):
+                    return False
+            if queries[qi] == value:
+                return True
+        return False
+
+    def match(self, item: bytes) -> bool:
+        return self.match_any([item])
+
+    def to_bytes(self) -> bytes:
+        return _write_varint(self.n) + self.data
+
+    @classmethod
+    def from_bytes(cls, raw: bytes, key: bytes) -> "GolombCodedSet":
+        n, pos = _read_varint(raw, 0)
+        return cls(n, raw[pos:], key)
+
+def filter_key(block_hash: str) -> bytes:
+    return bytes.fromhex(block_hash)[:16]
+
+def block_filter_items(block: Block) -> Set[bytes]:
+    items = set()
+    for tx in block.transactions:
+        for address in (tx.sender, *(receiver for receiver, _ in tx.credits())):
+            if address != "network":
+                items.add(address.encode())
+    return items
+
+def build_block_filter(block: Block) -> GolombCodedSet:
+    return GolombCodedSet.build(block_filter_items(block), filter_key(block.hash))
+
+def filter_header(filter_bytes: bytes, previous_header: str) -> str:
+    filter_hash = hashlib.sha256(filter_bytes).digest()
+    return hashlib.sha256(filter_hash + bytes.fromhex(previous_header)).hexdigest()
+
+FILTER_SCHEMA = """
+CREATE TABLE IF NOT EXISTS block_filters (
+    height INTEGER PRIMARY KEY,
+    hash TEXT NOT NULL,
+    filter BLOB NOT NULL,
+    header TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS block_filters_hash ON block_filters (hash);
+"""
+
+class BlockFilterIndex:
+    """Filters and the filter-header chain for the active chain, kept in sqlite.
+
+    Nothing is built on open: the stored rows are rewound to where they still
+    match the chain, and missing filters are built the first time a height at
+    or above them is asked for. A node restarted on a PrunedChain therefore
+    reads no archived blocks until a light wallet asks for old filters, and
+    with a file-backed `path` it never reads them twice.
+    """
+
+    def __init__(self, blockchain, path: str = ":memory:"):
+        self.blockchain = blockchain
+        self.path = path
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        if path != ":memory:":
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(FILTER_SCHEMA)
+        self._built = self._rewind()
+        blockchain.add_listener(self)
+
+    def _rewind(self) -> int:
+        """Drop stored rows the active chain no longer contains; return the top kept height."""
+        chain = self.blockchain.chain
+        row = self._db.execute("SELECT MAX(height) FROM block_filters").fetchone()
+        height = min(row[0] if row[0] is not None else -1, len(chain) - 1)
+        while height >= 0:
+            row = self._db.execute("SELECT hash FROM block_filters WHERE height = ?", (height,)).fetchone()
+            if row and row[0] == chain[height].hash:
+                break
+            height -= 1
+        with self._db:
+            self._db.execute("DELETE FROM block_filters WHERE height > ?", (height,))
+        return height
+
+    def _header_at(self, height: int) -> str:
+        if height < 0:
+            return GENESIS_FILTER_HEADER
+        return self._db.execute("SELECT header FROM block_filters WHERE height = ?", (height,)).fetchone()[0]
+
+    def _insert(self, block: Block, height: int) -> None:
+        raw = build_block_filter(block).to_bytes()
+        header = filter_header(raw, self._header_at(height - 1))
+        self._db.execute("INSERT INTO block_filters VALUES (?, ?, ?, ?)", (height, block.hash, raw, header))
+        self._built = height
+
+    def _ensure(self, height: int) -> None:
+        """Build filters up to `height` (capped at the tip) if they are missing."""
+        with self._lock:
+            chain = self.blockchain.chain
+            height = min(height, len(chain) - 1)
+            if height <= self._built:
+                return
+            with self._db:
+                for h in range(self._built + 1, height + 1):
+                    self._insert(chain[h], h)
+
+    def block_connected(self, block: Block, height: int) -> None:
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM block_filters WHERE height >= ?", (height,))
+            self._built = min(self._built, height - 1)
+            # Only extend a complete header chain; a gap is filled on demand.
+            if self._built == height - 1:
+                self._insert(block, height)
+
+    def block_disconnected(self, block: Block, height: int) -> None:
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM block_filters WHERE height >= ?", (height,))
+            self._built = min(self._built, height - 1)
+
+    def get_filter(self, block_hash: str) -> Optional[bytes]:
+        entry = self.blockchain.index.get(block_hash)
+        if entry is not None:
+            self._ensure(entry.height)
+        with self._lock:
+            row = self._db.execute("SELECT filter FROM block_filters WHERE hash = ?", (block_hash,)).fetchone()
+        return row[0] if row else None
+
+    def get_filter_header(self, height: int) -> str:
+        self._ensure(height)
+        if not 0 <= height <= self._built:
+            raise IndexError(height)
+        with self._lock:
+            return self._header_at(height)
+
+    def get_filter_headers(self, start_height: int, stop_height: int) -> List[str]:
+        self._ensure(stop_height)
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT header FROM block_filters WHERE height BETWEEN ? AND ? ORDER BY height",
+                (start_height, stop_height)
+            ).fetchall()
+        return [header for header, in rows]
+
+    def get_filters(self, start_height: int, stop_height: int) -> List[Tuple[int, str, bytes]]:
+        self._ensure(stop_height)
+        with self._lock:
+            return self._db.execute(
+                "SELECT height, hash, filter FROM block_filters WHERE height BETWEEN ? AND ? ORDER BY height",
+                (start_height, stop_height)
+            ).fetchall()
+
+    def handle_request(self, message: dict) -> Optional[dict]:
+        """Answer getcfilters / getcfheaders / getblock wire requests; None for anything else."""
+        kind = message.get("type")
+        if kind == "getcfilters":
+            start, stop = message["start_height"], message["stop_height"]
+            filters = self.get_filters(start, stop)
+            return {
+                "type": "cfilters",
+                "previous_header": self.get_filter_header(start - 1) if start else GENESIS_FILTER_HEADER,
+                "filters": [[height, block_hash, raw.hex()] for height, block_hash, raw in filters],
+                "headers": self.get_filter_headers(start, start + len(filters) - 1)
+            }
+        if kind == "getcfheaders":
+            start, stop = message["start_height"], message["stop_height"]
+            return {
+                "type": "cfheaders",
+                "start_height": start,
+                "headers": self.get_filter_headers(start, stop)
+            }
+        if kind == "getblock":
+            block = self.blockchain.blocks.get(message["hash"])
+            return {"type": "blockdata", "block": block.to_dict() if block else None}
+        return None
+
+def parse_cfilters(message: dict) -> Tuple[List[Tuple[int, str, bytes]], str, List[str]]:
+    filters = [(height, block_hash, bytes.fromhex(raw)) for height, block_hash, raw in message["filters"]]
+    return filters, message["previous_header"], message["headers"]
+
+class LightWalletScanner:
+    """Checks served filters against a filter-header chain and fetches only matching blocks."""
+
+    def __init__(self, addresses: Iterable[str]):
+        self.items = [address.encode() for address in addresses]
+
+    def verify_filters(self, filters: List[Tuple[int, str, bytes]], previous_header: str, headers: List[str]) -> bool:
+        for (_, _, raw), expected in zip(filters, headers):
+            previous_header = filter_header(raw, previous_header)
+            if previous_header != expected:
+                return False
+        return len(filters) == len(headers)
+
+    def matching_blocks(self, filters: List[Tuple[int, str, bytes]]) -> List[Tuple[int, str]]:
+        return [
+            (height, block_hash) for height, block_hash, raw in filters
+            if GolombCodedSet.from_bytes(raw, filter_key(block_hash)).match_any(self.items)
+        ]
+
+    def scan(self, filters: List[Tuple[int, str, bytes]], fetch_block: Callable[[str], Block]) -> List[Tuple[int, Block]]:
+        wanted = set(self.items)
+        found = []
+        for height, block_hash in self.matching_blocks(filters):
+            block = fetch_block(block_hash)
+            # Filters have false positives; confirm against the full block.
+            if block_filter_items(block) & wanted:
+                found.append((height, block))
+        return found
@@ -1,7 +1,19 @@
+import random
 from dataclasses import dataclass
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class FractalCoordinate:
     a: int
     b: int
     c: int
+
+    def to_dict(self) -> dict:
+        return {"a": self.a, "b": self.b, "c": self.c}
+
+    @classmethod
+    def generate(cls) -> "FractalCoordinate":
+        return cls(a=random.random(), b=random.random(), c=random.random())
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "FractalCoordinate":
+        return cls(a=data["a"], b=data["b"], c=data["c"])
@@ -0,0 +1,107 @@
+"""Sampled header-chain proofs for light clients, in the style of FlyClient.
+
+A full node proves the work behind its tip by sending the tip header plus a
+logarithmic number of sampled ancestor headers, each with an inclusion proof
+against the tip's header MMR commitment (core/mmr.py). Which heights are
+sampled is derived from the tip hash, so the prover cannot choose them, and
+the samples lean towards recent blocks, where a forked-off attacker's chain
+would have to diverge.
+
+Every block meets the same fixed target, so the claimed work is simply
+(height + 1) blocks' worth; sampling makes it unlikely that a chain with many
+invalid headers still passes. Legacy blocks mined before header commitments
+hash their full transaction list, so their sampled "headers" are larger.
+"""
+
+import math
+import random
+from dataclasses import dataclass
+from typing import List, Optional
+
+from .block import header_hash
+from .blockchain import Blockchain
+from .mmr import verify_inclusion
+
+SAMPLES_PER_LOG2 = 4
+MIN_SAMPLES = 8
+
+def sample_heights(tip_hash: str, size: int) -> List[int]:
+    """Heights below a tip at `size` to sample: genesis, the parent, then
+    heights chosen from the tip hash, half spread log-uniformly back from the
+    tip and half uniformly."""
+    if size <= 0:
+        return []
+    count = max(MIN_SAMPLES, SAMPLES_PER_LOG2 * math.ceil(math.log2(size + 1)))
+    if count >= size:
+        return list(range(size))
+    rng = random.Random(int(tip_hash, 16))
+    heights = {0, size - 1}
+    while len(heights) < count:
+        if len(heights) % 2:
+            distance = int(size ** rng.random()) - 1
+            heights.add(max(0, size - 1 - distance))
+        else:
+            heights.add(rng.randrange(size))
+    return sorted(heights)
+
+def build_header_proof(blockchain: Blockchain) -> dict:
+    tip = blockchain.last_block
+    if not tip.mmr_root:
+        raise ValueError("Tip does not commit to its header history")
+    size = tip.index
+    mmr = blockchain.provable_header_mmr()
+    samples = []
+    for height in sample_heights(tip.hash, size):
+        block = blockchain.chain[height]
+        samples.append({
+            "height": height,
+            "header": block.header(),
+            "proof": mmr.prove(height, size),
+        })
+    return {"tip": tip.header(), "samples": samples}
+
+@dataclass
+class HeaderProofResult:
+    valid: bool
+    height: int = 0
+    tip_hash: str = ""
+    work: int = 0
+    # The tip's balance commitment, for checking state_tree proofs; "" if it has none.
+    state_root: str = ""
+    reason: Optional[str] = None
+
+def verify_header_proof(proof: dict, genesis_hash: str, difficulty: int) -> HeaderProofResult:
+    """Check a proof from build_header_proof against a known genesis and target."""
+    target = "0" * difficulty
+    try:
+        tip = proof["tip"]
+        tip_hash = header_hash(tip)
+        size = tip["index"]
+        root = tip["mmr_root"]
+        samples = proof["samples"]
+    except (KeyError, TypeError):
+        return HeaderProofResult(False, reason="malformed proof")
+    if not root or not tip_hash.startswith(target):
+        return HeaderProofResult(False, reason="tip does not meet target or commit to history")
+    if [sample.get("height") for sample in samples] != sample_heights(tip_hash, size):
+        return HeaderProofResult(False, reason="samples are not the ones the tip selects")
+    try:
+        for sample in samples:
+            height = sample["height"]
+            header = sample["header"]
+            block_hash = header_hash(header)
+            if header.get("index") != height:
+                return HeaderProofResult(False, reason=f"header at {height} has index {header.get('index')}")
+            if height and not block_hash.startswith(target):
+                return HeaderProofResult(False, reason=f"header at {height} does not meet target")
+            if height == 0 and block_hash != genesis_hash:
+                return HeaderProofResult(False, reason="genesis does not match")
+            if height == size - 1 and block_hash != tip["previous_hash"]:
+                return HeaderProofResult(False, reason="tip does not extend the sampled parent")
+            if not verify_inclusion(root, size, height, block_hash, sample["proof"]):
+                return HeaderProofResult(False, reason=f"header at {height} is not in the tip's history")
+    except (KeyError, TypeError, AttributeError, ValueError):
+        return HeaderProofResult(False, reason="malformed sample")
+    work = (size + 1) * 16 ** difficulty
+    return HeaderProofResult(True, height=size, tip_hash=tip_hash, work=work,
+                             state_root=tip.get("state_root", ""))
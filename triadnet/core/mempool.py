@@ -0,0 +1,162 @@
+"""Pending transaction pool ordered by fee rate.
+
+A sender's transactions are chained in arrival order: each depends on the
+sender's previous pending transaction, and select() only takes a transaction
+once its parent is already in the block. Only the head of each chain can be
+taken next, so the pool keeps a heap of chain heads keyed by (-fee per byte,
+arrival). Inserting or removing a transaction costs O(log senders).
+Block assembly copies the heap and pops from it best-first, pushing each
+taken transaction's child. The walk costs O(senders + k log senders) for k
+selected transactions, not O(pool).
+
+Heap entries are removed lazily: an entry whose transaction has left the
+pool, or is no longer a chain head, is skipped when popped, and the heap is
+rebuilt once such entries outnumber the live ones.
+"""
+
+import heapq
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .transaction import Transaction
+
+MAX_CONSECUTIVE_FAILURES = 100
+MIN_HEAP_REBUILD = 64
+
+class MempoolEntry:
+    __slots__ = ("tx", "weight", "seq", "key", "parent", "child")
+
+    def __init__(self, tx: Transaction, seq: int):
+        self.tx = tx
+        self.weight = tx.weight()
+        self.seq = seq
+        self.key: Tuple[float, int, str] = (-tx.fee / self.weight, seq, tx.tx_id)
+        self.parent: Optional[str] = None
+        self.child: Optional[str] = None
+
+class Mempool:
+    def __init__(self):
+        self._entries: Dict[str, MempoolEntry] = {}
+        self._heads: List[Tuple[float, int, str]] = []
+        self._first_by_sender: Dict[str, str] = {}
+        self._last_by_sender: Dict[str, str] = {}
+        self._seq = 0
+        # Restored transactions predate everything pending, so they count down.
+        self._restored_seq = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, tx_id: str) -> bool:
+        return tx_id in self._entries
+
+    def __iter__(self) -> Iterator[Transaction]:
+        return iter(self.transactions())
+
+    def transactions(self) -> List[Transaction]:
+        """Pending transactions in arrival order, restored ones first."""
+        return [entry.tx for entry in sorted(self._entries.values(), key=lambda entry: entry.seq)]
+
+    @property
+    def total_weight(self) -> int:
+        return sum(entry.weight for entry in self._entries.values())
+
+    def _push_head(self, entry: MempoolEntry) -> None:
+        heapq.heappush(self._heads, entry.key)
+        if len(self._heads) > max(MIN_HEAP_REBUILD, 2 * len(self._first_by_sender)):
+            self._heads = [self._entries[tx_id].key for tx_id in self._first_by_sender.values()]
+            heapq.heapify(self._heads)
+
+    def add(self, tx: Transaction) -> bool:
+        """Insert `tx`; returns False if it is already pending."""
+        if tx.tx_id in self._entries:
+            return False
+        self._seq += 1
+        entry = MempoolEntry(tx, self._seq)
+        self._entries[tx.tx_id] = entry
+        previous = self._last_by_sender.get(tx.sender)
+        self._last_by_sender[tx.sender] = tx.tx_id
+        if previous is not None:
+            entry.parent = previous
+            self._entries[previous].child = tx.tx_id
+        else:
+            self._first_by_sender[tx.sender] = tx.tx_id
+            self._push_head(entry)
+        return True
+
+    def remove(self, tx_ids: Iterable[str]) -> None:
+        for tx_id in tx_ids:
+            entry = self._entries.pop(tx_id, None)
+            if entry is None:
+                continue
+            sender = entry.tx.sender
+            if entry.parent is not None:
+                self._entries[entry.parent].child = entry.child
+            if entry.child is not None:
+                child = self._entries[entry.child]
+                child.parent = entry.parent
+                if child.parent is None:
+                    self._first_by_sender[sender] = child.tx.tx_id
+                    self._push_head(child)
+            elif entry.parent is not None:
+                self._last_by_sender[sender] = entry.parent
+            if entry.parent is None and entry.child is None:
+                del self._first_by_sender[sender]
+                del self._last_by_sender[sender]
+
+    def restore(self, txs: List[Transaction]) -> None:
+        """Put transactions from a disconnected block back ahead of their
+        senders' pending transactions, since they were issued before them.
+        Costs O(len(txs) log senders), whatever the pool size."""
+        txs = [tx for tx in txs if tx.tx_id not in self._entries]
+        # Blocks are disconnected tip first, so each call restores older
+        # transactions than the last and numbers them below it.
+        base = self._restored_seq - len(txs)
+        self._restored_seq = base
+        chains: Dict[str, List[MempoolEntry]] = {}
+        for offset, tx in enumerate(txs):
+            entry = MempoolEntry(tx, base + offset)
+            self._entries[tx.tx_id] = entry
+            chains.setdefault(tx.sender, []).append(entry)
+        for sender, chain in chains.items():
+            for parent, child in zip(chain, chain[1:]):
+                parent.child = child.tx.tx_id
+                child.parent = parent.tx.tx_id
+            first = self._first_by_sender.get(sender)
+            if first is not None:
+                chain[-1].child = first
+                self._entries[first].parent = chain[-1].tx.tx_id
+            else:
+                self._last_by_sender[sender] = chain[-1].tx.tx_id
+            self._first_by_sender[sender] = chain[0].tx.tx_id
+            self._push_head(chain[0])
+
+    def select(self, max_weight: int) -> List[Transaction]:
+        """Greedily pick the highest fee-rate transactions that fit in `max_weight`
+        bytes, never placing a transaction before its parent."""
+        selected: List[Transaction] = []
+        chosen = set()
+        ready = list(self._heads)
+        weight = 0
+        failures = 0
+        while ready:
+            key = heapq.heappop(ready)
+            tx_id = key[2]
+            entry = self._entries.get(tx_id)
+            if entry is None or entry.key != key or tx_id in chosen:
+                continue
+            if entry.parent is not None and entry.parent not in chosen:
+                # A stale head, or a child pushed before its turn.
+                continue
+            if weight + entry.weight > max_weight:
+                # A nearly full block rarely finds a fit further down; stop looking.
+                failures += 1
+                if failures >= MAX_CONSECUTIVE_FAILURES:
+                    break
+                continue
+            failures = 0
+            selected.append(entry.tx)
+            chosen.add(tx_id)
+            weight += entry.weight
+            if entry.child is not None:
+                heapq.heappush(ready, self._entries[entry.child].key)
+        return selected
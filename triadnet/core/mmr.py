@@ -0,0 +1,178 @@
+"""Merkle mountain range over the active chain's block hashes.
+
+Leaf i is block i. The range for `size` leaves is a list of perfect Merkle
+trees ("peaks") whose heights are the set bits of `size`, and its root bags
+the peaks together with the size. Appending a block touches O(1) nodes
+amortized, and every prefix of the range is still inside the node list, so
+the root after any earlier block is a lookup of O(log n) peaks.
+
+Blocks commit to the root over all of their ancestors (Block.mmr_root), which
+is what lets header proofs (core/header_proof.py) show that a sampled block
+sits on the tip's chain with O(log n) hashes.
+
+Nodes are stored in post-order. A range built from peaks alone (after a
+snapshot bootstrap) can validate and extend commitments but cannot prove
+inclusion; it remembers the peaks of its last few sizes so a reorg can still
+rewind.
+"""
+
+import hashlib
+from typing import Dict, List, Optional, Sequence, Tuple
+
+LEAF_PREFIX = b"\x00"
+NODE_PREFIX = b"\x01"
+ROOT_PREFIX = b"\x02"
+DEFAULT_HISTORY = 128
+
+def leaf_hash(block_hash: str) -> bytes:
+    return hashlib.sha256(LEAF_PREFIX + bytes.fromhex(block_hash)).digest()
+
+def node_hash(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(NODE_PREFIX + left + right).digest()
+
+def peak_heights(size: int) -> List[int]:
+    """Tree heights of the peaks for `size` leaves, oldest (tallest) first."""
+    return [h for h in range(size.bit_length() - 1, -1, -1) if size >> h & 1]
+
+def node_count(size: int) -> int:
+    return 2 * size - bin(size).count("1")
+
+def bag_peaks(peaks: Sequence[bytes], size: int) -> str:
+    acc = b"\x00" * 32
+    if peaks:
+        acc = peaks[-1]
+        for peak in reversed(peaks[:-1]):
+            acc = node_hash(peak, acc)
+    return hashlib.sha256(ROOT_PREFIX + size.to_bytes(8, "big") + acc).hexdigest()
+
+def push_leaf(peaks: Sequence[bytes], size: int, leaf: bytes) -> List[bytes]:
+    """Peaks after appending `leaf` to a range of `size` leaves."""
+    peaks = list(peaks)
+    peaks.append(leaf)
+    while size & 1:
+        right = peaks.pop()
+        peaks.append(node_hash(peaks.pop(), right))
+        size >>= 1
+    return peaks
+
+def _locate(size: int, leaf_index: int) -> Tuple[int, int, int, int]:
+    """(peak number, peak height, first leaf under it, its first node position)."""
+    first_leaf = 0
+    first_node = 0
+    for number, height in enumerate(peak_heights(size)):
+        if leaf_index < first_leaf + (1 << height):
+            return number, height, first_leaf, first_node
+        first_leaf += 1 << height
+        first_node += (1 << (height + 1)) - 1
+    raise IndexError(leaf_index)
+
+def verify_inclusion(root: str, size: int, leaf_index: int, block_hash: str, proof: dict) -> bool:
+    """Check a proof from HeaderMMR.prove() that block `leaf_index` of a
+    `size`-leaf range with root `root` is `block_hash`."""
+    if not 0 <= leaf_index < size:
+        return False
+    try:
+        peaks = [bytes.fromhex(p) for p in proof["peaks"]]
+        siblings = [bytes.fromhex(s) for s in proof["siblings"]]
+    except (KeyError, TypeError, ValueError):
+        return False
+    number, height, first_leaf, _ = _locate(size, leaf_index)
+    if len(peaks) != len(peak_heights(size)) or len(siblings) != height:
+        return False
+    offset = leaf_index - first_leaf
+    acc = leaf_hash(block_hash)
+    for level, sibling in enumerate(siblings):
+        acc = node_hash(sibling, acc) if offset >> level & 1 else node_hash(acc, sibling)
+    return acc == peaks[number] and bag_peaks(peaks, size) == root
+
+class HeaderMMR:
+    def __init__(self, size: int = 0, peaks: Sequence[bytes] = (), history: int = DEFAULT_HISTORY):
+        self.size = size
+        self._peaks = list(peaks)
+        # Every node when built from the first block; otherwise only recent peaks.
+        self.nodes: Optional[List[bytes]] = [] if size == 0 else None
+        self.history = history
+        self._history: Dict[int, List[bytes]] = {size: list(peaks)}
+
+    @property
+    def can_prove(self) -> bool:
+        return self.nodes is not None
+
+    def append(self, block_hash: str) -> None:
+        leaf = leaf_hash(block_hash)
+        if self.nodes is not None:
+            self.nodes.append(leaf)
+            size, node, height = self.size, leaf, 0
+            while size & 1:
+                # The left sibling is the previous peak of this height, one subtree back.
+                node = node_hash(self.nodes[-(1 << (height + 1))], node)
+                self.nodes.append(node)
+                size >>= 1
+                height += 1
+        self._peaks = push_leaf(self._peaks, self.size, leaf)
+        self.size += 1
+        if self.nodes is None:
+            self._history[self.size] = self._peaks
+            self._history.pop(self.size - self.history, None)
+
+    def truncate(self, size: int) -> None:
+        if size > self.size:
+            raise ValueError(f"Cannot grow range from {self.size} to {size} by truncating")
+        peaks = self.peaks_at(size)
+        if peaks is None:
+            raise ValueError(f"Range no longer remembers size {size}")
+        if self.nodes is not None:
+            del self.nodes[node_count(size):]
+        else:
+            for dropped in range(size + 1, self.size + 1):
+                self._history.pop(dropped, None)
+        self.size = size
+        self._peaks = peaks
+
+    def peaks_at(self, size: int) -> Optional[List[bytes]]:
+        if size == self.size:
+            return list(self._peaks)
+        if size > self.size:
+            return None
+        if self.nodes is None:
+            peaks = self._history.get(size)
+            return list(peaks) if peaks is not None else None
+        peaks = []
+        position = 0
+        for height in peak_heights(size):
+            position += (1 << (height + 1)) - 1
+            peaks.append(self.nodes[position - 1])
+        return peaks
+
+    def root(self, size: Optional[int] = None) -> Optional[str]:
+        size = self.size if size is None else size
+        peaks = self.peaks_at(size)
+        return bag_peaks(peaks, size) if peaks is not None else None
+
+    def prove(self, leaf_index: int, size: Optional[int] = None) -> dict:
+        """Sibling path from leaf `leaf_index` to its peak plus every peak, for
+        the range of `size` leaves (default: all of them)."""
+        if self.nodes is None:
+            raise ValueError("Range was restored from peaks and cannot build proofs")
+        size = self.size if size is None else size
+        if not 0 <= leaf_index < size <= self.size:
+            raise IndexError(leaf_index)
+        _, height, first_leaf, first_node = _locate(size, leaf_index)
+        offset = leaf_index - first_leaf
+        siblings = []
+        start = first_node
+        while height:
+            half = 1 << (height - 1)
+            left_root = start + (1 << height) - 2
+            right_root = start + (1 << (height + 1)) - 3
+            if offset < half:
+                siblings.append(self.nodes[right_root])
+            else:
+                siblings.append(self.nodes[left_root])
+                start = left_root + 1
+                offset -= half
+            height -= 1
+        return {
+            "siblings": [s.hex() for s in reversed(siblings)],
+            "peaks": [p.hex() for p in self.peaks_at(size)],
+        }
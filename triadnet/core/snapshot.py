@@ -0,0 +1,153 @@
+"""Chain state snapshots for fast node bootstrap.
+
+A snapshot captures balances, recent undo records and pending transactions
+at one height, plus a sha256 commitment over all of it. A node
+restarting from a BlockStore loads the newest valid snapshot and only replays
+blocks above its height. Only the last MAX_REORG_DEPTH blocks below the
+snapshot are read back; older ones stay on disk until something asks for them.
+Indexes such as TransactionIndex track their own position by block hash, so
+the snapshot does not record it.
+"""
+
+import glob
+import hashlib
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from .blockchain import Blockchain, MAX_REORG_DEPTH
+from .block import Block
+from .storage import BlockStore
+from ..consensus.pipeline import PIPELINE_MIN_BLOCKS, import_blocks
+
+SNAPSHOT_VERSION = 1
+
+@dataclass
+class ChainSnapshot:
+    height: int
+    block_hash: str
+    difficulty: int
+    balances: Dict[str, float]
+    undo: Dict[str, Dict[str, Optional[float]]]
+    pending_transactions: List[dict]
+    created_at: float = field(default_factory=time.time)
+    version: int = SNAPSHOT_VERSION
+    commitment: str = ""
+    # Header MMR peaks at the oldest block bootstrap keeps in memory (see
+    # Blockchain.from_snapshot); absent from snapshots that predate it.
+    header_mmr: Optional[dict] = None
+
+    def payload(self) -> dict:
+        data = dict(self.__dict__)
+        data.pop("commitment")
+        if data["header_mmr"] is None:
+            data.pop("header_mmr")
+        return data
+
+    def compute_commitment(self) -> str:
+        canonical = json.dumps(self.payload(), sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    @classmethod
+    def capture(cls, blockchain: Blockchain) -> "ChainSnapshot":
+        tip = blockchain.last_block
+        height = len(blockchain.chain) - 1
+        kept_from = max(0, height - MAX_REORG_DEPTH)
+        peaks = blockchain.header_mmr.peaks_at(kept_from)
+        snapshot = cls(
+            height=height,
+            block_hash=tip.hash,
+            difficulty=blockchain.difficulty,
+            balances=dict(blockchain.balances),
+            undo=blockchain.undo_records(MAX_REORG_DEPTH),
+            pending_transactions=[tx.to_dict() for tx in blockchain.pending_transactions],
+            header_mmr={"size": kept_from, "peaks": [p.hex() for p in peaks]} if peaks is not None else None
+        )
+        snapshot.commitment = snapshot.compute_commitment()
+        return snapshot
+
+    def save(self, path: str) -> None:
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.__dict__, f, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "ChainSnapshot":
+        with open(path, "r") as f:
+            snapshot = cls(**json.load(f))
+        if snapshot.version != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot version {snapshot.version}")
+        if snapshot.compute_commitment() != snapshot.commitment:
+            raise ValueError(f"Snapshot commitment mismatch in {path}")
+        return snapshot
+
+def snapshot_path(directory: str, height: int) -> str:
+    return os.path.join(directory, f"snapshot_{height:010d}.json")
+
+def latest_snapshot(directory: str) -> Optional[ChainSnapshot]:
+    logger = logging.getLogger("triadnet.chain")
+    for path in sorted(glob.glob(os.path.join(directory, "snapshot_*.json")), reverse=True):
+        try:
+            return ChainSnapshot.load(path)
+        except (ValueError, OSError, TypeError, KeyError) as e:
+            logger.warning(f"Skipping unusable snapshot {path}: {e}")
+    return None
+
+class SnapshotManager:
+    """Writes a snapshot every `interval` connected blocks and keeps the newest `keep`."""
+
+    def __init__(self, blockchain: Blockchain, directory: str, interval: int = 1000, keep: int = 2):
+        self.blockchain = blockchain
+        self.directory = directory
+        self.interval = interval
+        self.keep = keep
+        self.logger = logging.getLogger("triadnet.chain")
+        os.makedirs(directory, exist_ok=True)
+        blockchain.add_listener(self)
+
+    def block_connected(self, block: Block, height: int) -> None:
+        if height and height % self.interval == 0:
+            self.write()
+
+    def block_disconnected(self, block: Block, height: int) -> None:
+        pass
+
+    def write(self) -> ChainSnapshot:
+        snapshot = ChainSnapshot.capture(self.blockchain)
+        snapshot.save(snapshot_path(self.directory, snapshot.height))
+        self.logger.info(f"Wrote snapshot at height {snapshot.height} ({snapshot.commitment[:12]})")
+        self._prune()
+        return snapshot
+
+    def _prune(self) -> None:
+        paths = sorted(glob.glob(os.path.join(self.directory, "snapshot_*.json")))
+        for path in paths[:-self.keep]:
+            os.remove(path)
+
+def bootstrap(store: BlockStore, snapshot_dir: Optional[str] = None, difficulty: int = 4) -> Blockchain:
+    """Start a chain from the newest snapshot that matches `store`, replaying only later blocks."""
+    logger = logging.getLogger("triadnet.chain")
+    snapshot = latest_snapshot(snapshot_dir) if snapshot_dir and os.path.isdir(snapshot_dir) else None
+    if snapshot and snapshot.height < len(store) and store.read(snapshot.height).hash == snapshot.block_hash:
+        recent = list(store.read_range(max(0, snapshot.height - MAX_REORG_DEPTH), snapshot.height + 1))
+        blockchain = Blockchain.from_snapshot(snapshot, recent, store.read)
+        start = snapshot.height + 1
+        logger.info(f"Loaded snapshot at height {snapshot.height}, replaying {len(store) - start} blocks")
+    else:
+        genesis_timestamp = store.read(0).timestamp if len(store) else None
+        blockchain = Blockchain(difficulty=difficulty, genesis_timestamp=genesis_timestamp)
+        start = 1
+    if len(store) - start >= PIPELINE_MIN_BLOCKS:
+        report = import_blocks(blockchain, (store.read_raw(h) for h in range(start, len(store))))
+        logger.info(f"Replayed {report.processed} blocks through the import pipeline")
+    else:
+        for block in store.read_range(start):
+            blockchain.process_block(block)
+    store.attach(blockchain)
+    return blockchain
@@ -0,0 +1,212 @@
+"""Sparse Merkle tree over account balances.
+
+Each address is a leaf at the 256-bit path sha256(address). Empty subtrees
+hash to EMPTY, and a subtree holding a single leaf hashes to that leaf. Only
+subtrees with two or more leaves get an interior node. So the root depends
+only on the set of (address, balance) pairs, and a path has about log2(n)
+interior nodes rather than 256.
+
+Interior hashes are cached by (depth, path prefix). Changing one balance
+rehashes only the nodes on that leaf's path. Blocks commit to the root after
+their transactions (Block.state_root). prove() / verify_balance() show what
+an address holds under that root, including that it holds nothing, with
+O(log n) hashes.
+"""
+
+import bisect
+import hashlib
+import struct
+from typing import Dict, List, Mapping, Optional, Tuple
+
+KEY_BITS = 256
+EMPTY = b"\x00" * 32
+LEAF_PREFIX = b"\x00"
+NODE_PREFIX = b"\x01"
+
+def key_of(address: str) -> int:
+    return int.from_bytes(hashlib.sha256(address.encode()).digest(), "big")
+
+def leaf_hash(key: int, balance: float) -> bytes:
+    return hashlib.sha256(LEAF_PREFIX + key.to_bytes(32, "big") + struct.pack(">d", float(balance))).digest()
+
+def node_hash(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(NODE_PREFIX + left + right).digest()
+
+def _common_prefix(a: int, b: int) -> int:
+    return KEY_BITS - (a ^ b).bit_length()
+
+def verify_balance(root: str, address: str, balance: Optional[float], proof: dict) -> bool:
+    """Check a proof from SparseMerkleTree.prove() that `address` holds
+    `balance` under `root`; a `balance` of None claims the address is absent."""
+    key = key_of(address)
+    try:
+        siblings = [bytes.fromhex(s) for s in proof["siblings"]]
+        leaf = proof.get("leaf")
+        depth = len(siblings)
+        if depth > KEY_BITS:
+            return False
+        if leaf is None:
+            if balance is not None:
+                return False
+            acc = EMPTY
+        else:
+            leaf_key = int(leaf["key"], 16)
+            # The leaf must sit in the subtree the path leads to.
+            if leaf_key >> (KEY_BITS - depth) != key >> (KEY_BITS - depth):
+                return False
+            if leaf_key == key:
+                if balance is None or float(balance) != float(leaf["balance"]):
+                    return False
+            elif balance is not None:
+                return False
+            acc = leaf_hash(leaf_key, leaf["balance"])
+    except (KeyError, TypeError, ValueError, AttributeError):
+        return False
+    for depth in range(len(siblings) - 1, -1, -1):
+        sibling = siblings[depth]
+        acc = node_hash(sibling, acc) if key >> (KEY_BITS - 1 - depth) & 1 else node_hash(acc, sibling)
+    return acc.hex() == root
+
+class SparseMerkleTree:
+    def __init__(self):
+        self._keys: List[int] = []
+        self._values: Dict[int, float] = {}
+        # (depth, prefix) -> hash, for subtrees with at least two leaves.
+        self._nodes: Dict[Tuple[int, int], bytes] = {}
+
+    @classmethod
+    def from_balances(cls, balances: Mapping[str, float]) -> "SparseMerkleTree":
+        """Build a tree in one pass, e.g. to check a snapshot against a block's state_root."""
+        tree = cls()
+        tree._values = {key_of(address): balance for address, balance in balances.items()}
+        tree._keys = sorted(tree._values)
+        tree._build(0, 0, 0, len(tree._keys))
+        return tree
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _build(self, depth: int, prefix: int, lo: int, hi: int) -> bytes:
+        if hi - lo < 2:
+            return self._leaf_or_empty(lo, hi)
+        middle = bisect.bisect_left(self._keys, (2 * prefix + 1) << (KEY_BITS - depth - 1), lo, hi)
+        digest = node_hash(
+            self._build(depth + 1, 2 * prefix, lo, middle),
+            self._build(depth + 1, 2 * prefix + 1, middle, hi),
+        )
+        self._nodes[(depth, prefix)] = digest
+        return digest
+
+    def _range(self, depth: int, prefix: int) -> Tuple[int, int]:
+        shift = KEY_BITS - depth
+        return (bisect.bisect_left(self._keys, prefix << shift),
+                bisect.bisect_left(self._keys, (prefix + 1) << shift))
+
+    def _leaf_or_empty(self, lo: int, hi: int) -> bytes:
+        if lo == hi:
+            return EMPTY
+        key = self._keys[lo]
+        return leaf_hash(key, self._values[key])
+
+    def _subtree(self, depth: int, prefix: int) -> bytes:
+        lo, hi = self._range(depth, prefix)
+        if hi - lo < 2:
+            return self._leaf_or_empty(lo, hi)
+        return self._nodes[(depth, prefix)]
+
+    def _split_depth(self, key: int) -> int:
+        """Deepest depth at which `key` (present) shares a subtree with another leaf, or -1."""
+        index = bisect.bisect_left(self._keys, key)
+        depth = -1
+        if index > 0:
+            depth = _common_prefix(key, self._keys[index - 1])
+        if index + 1 < len(self._keys):
+            depth = max(depth, _common_prefix(key, self._keys[index + 1]))
+        return depth
+
+    def _rehash_path(self, key: int, deepest: int) -> None:
+        for depth in range(deepest, -1, -1):
+            prefix = key >> (KEY_BITS - depth)
+            lo, hi = self._range(depth, prefix)
+            if hi - lo < 2:
+                self._nodes.pop((depth, prefix), None)
+            else:
+                self._nodes[(depth, prefix)] = node_hash(
+                    self._subtree(depth + 1, 2 * prefix), self._subtree(depth + 1, 2 * prefix + 1)
+                )
+
+    def _set(self, key: int, balance: Optional[float]) -> None:
+        before = self._split_depth(key) if key in self._values else -1
+        if balance is None:
+            if key not in self._values:
+                return
+            del self._values[key]
+            del self._keys[bisect.bisect_left(self._keys, key)]
+            after = -1
+        else:
+            if key not in self._values:
+                bisect.insort(self._keys, key)
+            self._values[key] = balance
+            after = self._split_depth(key)
+        self._rehash_path(key, max(before, after))
+
+    def update(self, changes: Mapping[str, Optional[float]]) -> None:
+        """Set each address's balance; None removes the address."""
+        for address, balance in changes.items():
+            self._set(key_of(address), balance)
+
+    def get(self, address: str) -> Optional[float]:
+        return self._values.get(key_of(address))
+
+    def root(self) -> str:
+        return self._subtree(0, 0).hex()
+
+    def root_after(self, changes: Mapping[str, Optional[float]]) -> str:
+        """Root the tree would have after update(changes). Only reads the tree,
+        so provers on other threads never see the candidate root."""
+        overlay = {key_of(address): balance for address, balance in changes.items()}
+        return self._subtree_with(0, 0, sorted(overlay), overlay).hex()
+
+    def _subtree_with(self, depth: int, prefix: int, changed: List[int],
+                      overlay: Dict[int, Optional[float]]) -> bytes:
+        """_subtree() as if `overlay` were applied; `changed` are its keys under this prefix."""
+        if not changed:
+            return self._subtree(depth, prefix)
+        lo, hi = self._range(depth, prefix)
+        count = hi - lo
+        for key in changed:
+            count += (overlay[key] is not None) - (key in self._values)
+        if count == 0:
+            return EMPTY
+        if count == 1:
+            # The one leaf left is either set by the overlay or an untouched
+            # stored key; at most len(changed) stored keys are skipped.
+            for key in changed:
+                if overlay[key] is not None:
+                    return leaf_hash(key, overlay[key])
+            for key in self._keys[lo:hi]:
+                if key not in overlay:
+                    return leaf_hash(key, self._values[key])
+        split = bisect.bisect_left(changed, (2 * prefix + 1) << (KEY_BITS - depth - 1))
+        return node_hash(
+            self._subtree_with(depth + 1, 2 * prefix, changed[:split], overlay),
+            self._subtree_with(depth + 1, 2 * prefix + 1, changed[split:], overlay),
+        )
+
+    def prove(self, address: str) -> dict:
+        """Siblings from the root down to where `address` would be, plus the
+        leaf found there (the address itself, another address, or none)."""
+        key = key_of(address)
+        siblings: List[str] = []
+        depth, prefix = 0, 0
+        lo, hi = self._range(0, 0)
+        while hi - lo >= 2:
+            bit = key >> (KEY_BITS - 1 - depth) & 1
+            siblings.append(self._subtree(depth + 1, 2 * prefix + 1 - bit).hex())
+            depth, prefix = depth + 1, 2 * prefix + bit
+            lo, hi = self._range(depth, prefix)
+        leaf = None
+        if hi - lo == 1:
+            leaf_key = self._keys[lo]
+            leaf = {"key": leaf_key.to_bytes(32, "big").hex(), "balance": self._values[leaf_key]}
+        return {"siblings": siblings, "leaf": leaf}
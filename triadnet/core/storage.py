@@ -0,0 +1,122 @@
+import json
+import os
+import threading
+from typing import Iterator, List, Optional
+
+from .block import Block
+
+BASE_MARKER = b'{"base_height"'
+
+class BlockStore:
+    """Active-chain blocks as JSON lines with an in-memory height -> offset index.
+
+    Attach it to a Blockchain to append connected blocks and truncate on disconnects.
+    With an `archive`, heights below `base_height` live in sealed segments instead.
+    """
+
+    def __init__(self, path: str, archive=None):
+        self.path = path
+        self.archive = archive
+        self._lock = threading.Lock()
+        self.base_height = 0
+        self._offsets: List[int] = []
+        self._file = open(path, "a+b")
+        self._file.seek(0)
+        offset = 0
+        for line in self._file:
+            if offset == 0 and line.startswith(BASE_MARKER):
+                self.base_height = json.loads(line)["base_height"]
+            else:
+                self._offsets.append(offset)
+            offset += len(line)
+        self._end = offset
+        if self.base_height and (archive is None or archive.stop_height < self.base_height):
+            raise ValueError(f"{path} starts at height {self.base_height} but the archive does not cover it")
+
+    def __len__(self) -> int:
+        return self.base_height + len(self._offsets)
+
+    def append(self, block: Block) -> int:
+        line = (json.dumps(block.to_dict(), separators=(",", ":")) + "\n").encode()
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            self._offsets.append(self._end)
+            self._end += len(line)
+            return len(self) - 1
+
+    def truncate(self, height: int) -> None:
+        """Drop the blocks at `height` and above."""
+        with self._lock:
+            if height >= len(self):
+                return
+            if height < self.base_height:
+                raise ValueError(f"Cannot truncate below archived height {self.base_height}")
+            self._end = self._offsets[height - self.base_height]
+            del self._offsets[height - self.base_height:]
+            self._file.truncate(self._end)
+            self._file.flush()
+
+    def drop_prefix(self, height: int) -> None:
+        """Forget blocks below `height` once they have been archived."""
+        with self._lock:
+            if height <= self.base_height:
+                return
+            if self.archive is None or self.archive.stop_height < height:
+                raise ValueError(f"Blocks below {height} are not archived")
+            cut = self._offsets[height - self.base_height] if height < len(self) else self._end
+            self._file.seek(cut)
+            remainder = self._file.read()
+            # The base height travels in a header line so the swap is a single atomic replace.
+            header = json.dumps({"base_height": height}).encode() + b"\n"
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(header)
+                f.write(remainder)
+                f.flush()
+                os.fsync(f.fileno())
+            self._file.close()
+            os.replace(tmp, self.path)
+            self._file = open(self.path, "a+b")
+            shift = cut - len(header)
+            self._offsets = [offset - shift for offset in self._offsets[height - self.base_height:]]
+            self._end -= shift
+            self.base_height = height
+
+    def read_raw(self, height: int) -> bytes:
+        if height < self.base_height:
+            return self.archive.read_raw(height)
+        with self._lock:
+            self._file.seek(self._offsets[height - self.base_height])
+            return self._file.readline()
+
+    def read(self, height: int) -> Block:
+        return Block.from_dict(json.loads(self.read_raw(height)))
+
+    def read_range(self, start: int, stop: Optional[int] = None) -> Iterator[Block]:
+        stop = len(self) if stop is None else min(stop, len(self))
+        for height in range(start, stop):
+            yield self.read(height)
+
+    def attach(self, blockchain) -> None:
+        """Bring the store in line with blockchain.chain, then follow it."""
+        chain = blockchain.chain
+        height = min(len(self), len(chain))
+        while height > self.base_height and self.read(height - 1).hash != chain[height - 1].hash:
+            height -= 1
+        self.truncate(height)
+        for block in chain[height:]:
+            self.append(block)
+        blockchain.add_listener(self)
+
+    def block_connected(self, block: Block, height: int) -> None:
+        self.truncate(height)
+        self.append(block)
+
+    def block_disconnected(self, block: Block, height: int) -> None:
+        self.truncate(height)
+
+    def close(self) -> None:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
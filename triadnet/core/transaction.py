@@ -1,22 +1,88 @@
 import hashlib
+import json
+import math
+import sys
 import time
-from typing import Optional
-from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+from dataclasses import dataclass, field, fields
 
-@dataclass
+@dataclass(slots=True)
 class Transaction:
     sender: str
     receiver: str
     amount: float
     data: str = ""
-    timestamp: float = time.time()
+    timestamp: float = field(default_factory=time.time)
     tx_id: Optional[str] = None
     signature: Optional[str] = None
+    extranonce: int = 0
+    fee: float = 0.0
+    # Batch payments: (receiver, amount) pairs; `receiver` is then BATCH_RECEIVER
+    # and `amount` the total paid out.
+    outputs: Optional[Tuple[Tuple[str, float], ...]] = None
 
     def __post_init__(self):
+        # A pool holds many transactions between few addresses; share the strings.
+        if isinstance(self.sender, str):
+            self.sender = sys.intern(self.sender)
+        if isinstance(self.receiver, str):
+            self.receiver = sys.intern(self.receiver)
+        if self.outputs is not None:
+            self.outputs = tuple((sys.intern(receiver), amount) for receiver, amount in self.outputs)
         if self.tx_id is None:
             self.tx_id = self.calculate_hash()
 
     def calculate_hash(self) -> str:
         tx_string = f"{self.sender}{self.receiver}{self.amount}{self.data}{self.timestamp}"
+        if self.fee:
+            # Fee-less transactions keep the ids they had before fees existed.
+            tx_string += f"{self.fee}"
+        if self.outputs is not None:
+            tx_string += json.dumps(self.outputs)
         return hashlib.sha256(tx_string.encode()).hexdigest()
+
+    @classmethod
+    def batch(cls, sender: str, outputs: Sequence[Tuple[str, float]], data: str = "", **kwargs) -> "Transaction":
+        """One transaction paying every (receiver, amount) in `outputs`."""
+        outputs = tuple((receiver, amount) for receiver, amount in outputs)
+        if not outputs:
+            raise ValueError("Batch transaction needs at least one output")
+        return cls(sender, BATCH_RECEIVER, math.fsum(amount for _, amount in outputs), data,
+                   outputs=outputs, **kwargs)
+
+    @property
+    def is_batch(self) -> bool:
+        return self.outputs is not None
+
+    def credits(self) -> List[Tuple[str, float]]:
+        """(receiver, amount) for every payment this transaction makes."""
+        if self.outputs is not None:
+            return list(self.outputs)
+        return [(self.receiver, self.amount)]
+
+    def weight(self) -> int:
+        """Encoded size in bytes, the unit block space is measured in."""
+        return len(self.serialize().encode())
+
+    def to_dict(self) -> dict:
+        data = {name: getattr(self, name) for name in TRANSACTION_FIELDS}
+        if self.outputs is None:
+            # Keep single-payment encodings (and the block hashes over them) unchanged.
+            del data["outputs"]
+        else:
+            data["outputs"] = [list(output) for output in self.outputs]
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Transaction":
+        return cls(**data)
+
+    def serialize(self) -> str:
+        return json.dumps(self.to_dict(), sort_keys=True)
+
+    @classmethod
+    def deserialize(cls, data: str) -> "Transaction":
+        return cls.from_dict(json.loads(data))
+
+BATCH_RECEIVER = "batch"
+TRANSACTION_FIELDS = tuple(f.name for f in fields(Transaction))
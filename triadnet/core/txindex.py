@@ -0,0 +1,164 @@
+"""Persistent tx_id and address indexes over the active chain.
+
+Backed by sqlite so the explorer and support tooling can answer "where is tx Y"
+and "recent history of address X" without scanning Blockchain.chain. The index
+follows the chain as a listener and catches up (or rewinds) on open.
+"""
+
+import sqlite3
+import threading
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from .block import Block
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS indexed_blocks (
+    height INTEGER PRIMARY KEY,
+    hash TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tx_locations (
+    tx_id TEXT PRIMARY KEY,
+    block_hash TEXT NOT NULL,
+    height INTEGER NOT NULL,
+    position INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tx_locations_height ON tx_locations (height);
+CREATE TABLE IF NOT EXISTS address_postings (
+    address TEXT NOT NULL,
+    height INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    tx_id TEXT NOT NULL,
+    direction TEXT NOT NULL,
+    amount REAL NOT NULL,
+    PRIMARY KEY (address, height, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS address_postings_height ON address_postings (height);
+"""
+
+@dataclass
+class TxLocation:
+    tx_id: str
+    block_hash: str
+    height: int
+    position: int
+
+@dataclass
+class AddressPosting:
+    address: str
+    height: int
+    position: int
+    tx_id: str
+    direction: str
+    amount: float
+
+    @property
+    def cursor(self) -> Tuple[int, int]:
+        return (self.height, self.position)
+
+class TransactionIndex:
+    """tx_id -> (height, position) and address -> postings, kept in step with the active chain."""
+
+    def __init__(self, blockchain, path: str = ":memory:"):
+        self.blockchain = blockchain
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        if path != ":memory:":
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self._catch_up()
+        blockchain.add_listener(self)
+
+    @property
+    def indexed_height(self) -> int:
+        row = self._db.execute("SELECT MAX(height) FROM indexed_blocks").fetchone()
+        return row[0] if row[0] is not None else -1
+
+    def _catch_up(self) -> None:
+        chain = self.blockchain.chain
+        height = min(self.indexed_height, len(chain) - 1)
+        while height >= 0:
+            row = self._db.execute("SELECT hash FROM indexed_blocks WHERE height = ?", (height,)).fetchone()
+            if row and row[0] == chain[height].hash:
+                break
+            height -= 1
+        with self._lock, self._db:
+            self._delete_above(height)
+            for h in range(height + 1, len(chain)):
+                self._insert_block(chain[h], h)
+
+    def block_connected(self, block: Block, height: int) -> None:
+        with self._lock, self._db:
+            self._delete_above(height - 1)
+            self._insert_block(block, height)
+
+    def block_disconnected(self, block: Block, height: int) -> None:
+        with self._lock, self._db:
+            self._delete_above(height - 1)
+
+    def _delete_above(self, height: int) -> None:
+        for table in ("indexed_blocks", "tx_locations", "address_postings"):
+            self._db.execute(f"DELETE FROM {table} WHERE height > ?", (height,))
+
+    def _insert_block(self, block: Block, height: int) -> None:
+        self._db.execute("INSERT INTO indexed_blocks VALUES (?, ?)", (height, block.hash))
+        locations = []
+        postings = {}
+        for position, tx in enumerate(block.transactions):
+            locations.append((tx.tx_id, block.hash, height, position))
+            deltas = {}
+            if tx.sender != "network":
+                # Matches Blockchain's debit, so history sums to the balance.
+                deltas[tx.sender] = -tx.amount - tx.fee
+            for receiver, amount in tx.credits():
+                # One net posting per address: a batch may pay its sender or
+                # the same receiver more than once.
+                deltas[receiver] = deltas.get(receiver, 0.0) + amount
+            for address, delta in deltas.items():
+                if address == tx.sender and tx.sender != "network":
+                    direction = "self" if all(r == tx.sender for r, _ in tx.credits()) else "out"
+                else:
+                    direction = "in"
+                postings[(address, position)] = (address, height, position, tx.tx_id, direction, delta)
+        self._db.executemany("INSERT OR REPLACE INTO tx_locations VALUES (?, ?, ?, ?)", locations)
+        self._db.executemany("INSERT INTO address_postings VALUES (?, ?, ?, ?, ?, ?)", postings.values())
+
+    def locate(self, tx_id: str) -> Optional[TxLocation]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT tx_id, block_hash, height, position FROM tx_locations WHERE tx_id = ?", (tx_id,)
+            ).fetchone()
+        return TxLocation(*row) if row else None
+
+    def history(self, address: str, limit: int = 50, before: Optional[Tuple[int, int]] = None) -> List[AddressPosting]:
+        """Most-recent-first postings for `address`; pass the last posting's cursor as `before` for the next page."""
+        query = "SELECT address, height, position, tx_id, direction, amount FROM address_postings WHERE address = ?"
+        params: list = [address]
+        if before is not None:
+            query += " AND (height < ? OR (height = ? AND position < ?))"
+            params += [before[0], before[0], before[1]]
+        query += " ORDER BY height DESC, position DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._db.execute(query, params).fetchall()
+        return [AddressPosting(*row) for row in rows]
+
+    def history_count(self, address: str) -> int:
+        with self._lock:
+            return self._db.execute(
+                "SELECT COUNT(*) FROM address_postings WHERE address = ?", (address,)
+            ).fetchone()[0]
+
+    def blocks_for_address(self, address: str, limit: int = 50) -> List[int]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT DISTINCT height FROM address_postings WHERE address = ? ORDER BY height DESC LIMIT ?",
+                (address, limit)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def close(self) -> None:
+        self.blockchain.remove_listener(self)
+        self._db.close()
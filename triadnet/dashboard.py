@@ -1,7 +1,20 @@
-from flask import Flask, render_template_string
+from flask import Flask, Response, jsonify, render_template_string, request
 import json
+import os
+
+from triadnet.analytics import ChainAnalytics, ROLLUP_METRICS
+from triadnet import profiler
 
 app = Flask(__name__)
+ANALYTICS_DIR = os.environ.get("TRIADNET_ANALYTICS_DIR", "analytics")
+_analytics = None
+
+def get_analytics() -> ChainAnalytics:
+    global _analytics
+    if _analytics is None:
+        _analytics = ChainAnalytics(ANALYTICS_DIR, readonly=True)
+    _analytics.refresh()
+    return _analytics
 
 @app.route('/')
 def dashboard():
@@ -43,5 +56,40 @@ def dashboard():
     '''
     return render_template_string(template, blocks=blocks)
 
+@app.route('/api/analytics/summary')
+def analytics_summary():
+    window = request.args.get('window', 1000, type=int)
+    return jsonify(get_analytics().summary(percentile_window=window))
+
+@app.route('/api/analytics/series/<metric>')
+def analytics_series(metric):
+    if metric not in ROLLUP_METRICS:
+        return jsonify({'error': f'unknown metric {metric}'}), 404
+    points = min(request.args.get('points', 200, type=int), 5000)
+    start = max(0, request.args.get('start', 0, type=int))
+    stop = request.args.get('stop', None, type=int)
+    return jsonify(get_analytics().series(metric, points=points, start=start, stop=stop))
+
+@app.route('/api/analytics/coordinates')
+def analytics_coordinates():
+    bins = min(request.args.get('bins', 32, type=int), 1024)
+    return jsonify(get_analytics().coordinate_histogram(bins=bins))
+
+# Profiles cover the process serving the dashboard, so a node that wants them
+# runs this app in-process (e.g. app.run in a thread) rather than standalone.
+@app.route('/api/profile/cpu')
+def profile_cpu():
+    seconds = request.args.get('seconds', profiler.DEFAULT_DURATION, type=float)
+    interval = max(request.args.get('interval', profiler.DEFAULT_INTERVAL, type=float), 0.001)
+    threads = request.args.getlist('thread') or None
+    result = profiler.profile(seconds, interval, threads)
+    return Response(result.collapsed(), mimetype='text/plain')
+
+@app.route('/api/profile/memory')
+def profile_memory():
+    seconds = request.args.get('seconds', profiler.DEFAULT_DURATION, type=float)
+    top = min(request.args.get('top', 10, type=int), 100)
+    return jsonify(profiler.trace_allocations(seconds, top))
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000)
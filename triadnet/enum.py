@@ -1 +1,9 @@
 from enum import IntEnum
+
+class BlockStatus(IntEnum):
+    INVALID = 0
+    DUPLICATE = 1
+    ORPHAN = 2
+    SIDE_CHAIN = 3
+    CONNECTED = 4
+    REORGANIZED = 5
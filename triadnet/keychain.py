@@ -0,0 +1,206 @@
+"""Deterministic hierarchical keys: many Ed25519 addresses from one seed.
+
+Derivation follows SLIP-0010 for ed25519: the master key and chain code are
+HMAC-SHA512("ed25519 seed", seed), and every child is hardened,
+
+    I = HMAC-SHA512(chain_code, 0x00 || key || ser32(index | 2^31))
+
+with I[:32] the child key and I[32:] its chain code. Addresses live under
+m/44'/COIN_TYPE'/account'/index'. The account node is derived once, so each
+address costs one HMAC and one Ed25519 public-key computation.
+
+A Keystore keeps the seed in a one-line header followed by fixed-width
+(index, address, public key) records, so opening it parses nothing but the
+header and any child is found by seeking straight to its record. Child private
+keys are not written out, but the seed they come from is, in plaintext: the
+file is created readable by its owner only and must be guarded like the keys.
+
+This module derives addresses; it does not make them spendable. Wallet and
+transaction verification sign and check RSA keys only, so coins sent to a
+ChildKey address can be received and tracked (e.g. as per-payment deposit
+addresses) but not yet spent. ChildKey.sign() and verify_signature() are
+plain Ed25519 and are not accepted by the chain.
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import os
+import struct
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey, Ed25519PublicKey
+
+SEED_KEY = b"ed25519 seed"
+HARDENED = 0x80000000
+PURPOSE = 44
+COIN_TYPE = 3333
+KEYSTORE_VERSION = 1
+ADDRESS_LENGTH = 34
+RECORD_FORMAT = "{index:010d} {address} {public_key}\n"
+RECORD_SIZE = 10 + 1 + ADDRESS_LENGTH + 1 + 64 + 1
+
+def master_node(seed: bytes) -> Tuple[bytes, bytes]:
+    digest = hmac.new(SEED_KEY, seed, hashlib.sha512).digest()
+    return digest[:32], digest[32:]
+
+def derive_child(key: bytes, chain_code: bytes, index: int) -> Tuple[bytes, bytes]:
+    """Hardened child `index` (the hardened bit is added here)."""
+    data = b"\x00" + key + struct.pack(">I", (index | HARDENED) & 0xFFFFFFFF)
+    digest = hmac.new(chain_code, data, hashlib.sha512).digest()
+    return digest[:32], digest[32:]
+
+def derive_path(seed: bytes, path: List[int]) -> Tuple[bytes, bytes]:
+    key, chain_code = master_node(seed)
+    for index in path:
+        key, chain_code = derive_child(key, chain_code, index)
+    return key, chain_code
+
+def public_key_bytes(private_key: bytes) -> bytes:
+    return Ed25519PrivateKey.from_private_bytes(private_key).public_key().public_bytes(
+        serialization.Encoding.Raw, serialization.PublicFormat.Raw
+    )
+
+def address_from_public_key(public_key: bytes) -> str:
+    """Same shape as Wallet addresses: "TX" + 32 base32 chars of a double sha256."""
+    digest = hashlib.sha256(hashlib.sha256(public_key).digest()).digest()
+    return "TX" + base64.b32encode(digest).decode()[:32]
+
+@dataclass
+class ChildKey:
+    """A derived address and its Ed25519 key pair; receive-only on chain (see module docstring)."""
+
+    index: int
+    private_key: bytes
+    public_key: bytes
+    address: str
+
+    def sign(self, message: bytes) -> bytes:
+        return Ed25519PrivateKey.from_private_bytes(self.private_key).sign(message)
+
+def verify_signature(public_key: bytes, signature: bytes, message: bytes) -> bool:
+    try:
+        Ed25519PublicKey.from_public_bytes(public_key).verify(signature, message)
+        return True
+    except InvalidSignature:
+        return False
+
+class Keychain:
+    """Derives child keys for one account of a seed."""
+
+    def __init__(self, seed: bytes, account: int = 0):
+        if not 16 <= len(seed) <= 64:
+            raise ValueError("Seed must be between 16 and 64 bytes")
+        self.seed = seed
+        self.account = account
+        self._key, self._chain_code = derive_path(seed, [PURPOSE, COIN_TYPE, account])
+
+    @classmethod
+    def generate(cls, account: int = 0) -> "Keychain":
+        return cls(os.urandom(32), account)
+
+    def derive(self, index: int) -> ChildKey:
+        private_key, _ = derive_child(self._key, self._chain_code, index)
+        public_key = public_key_bytes(private_key)
+        return ChildKey(index, private_key, public_key, address_from_public_key(public_key))
+
+    def derive_batch(self, start: int, count: int) -> List[ChildKey]:
+        return [self.derive(index) for index in range(start, start + count)]
+
+    def iter_addresses(self, start: int = 0) -> Iterator[Tuple[int, str, bytes]]:
+        index = start
+        while True:
+            child = self.derive(index)
+            yield index, child.address, child.public_key
+            index += 1
+
+class Keystore:
+    """One file holding a keychain's seed (plaintext, owner-only) and its issued addresses."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        with open(path, "rb") as f:
+            header_line = f.readline()
+        header = json.loads(header_line)
+        if header.get("version") != KEYSTORE_VERSION:
+            raise ValueError(f"Unsupported keystore version {header.get('version')}")
+        self.keychain = Keychain(bytes.fromhex(header["seed"]), header["account"])
+        self._records_start = len(header_line)
+        self._by_address: Optional[Dict[str, int]] = None
+
+    @classmethod
+    def create(cls, path: str, keychain: Optional[Keychain] = None, count: int = 0) -> "Keystore":
+        keychain = keychain or Keychain.generate()
+        header = json.dumps({"version": KEYSTORE_VERSION, "seed": keychain.seed.hex(), "account": keychain.account})
+        tmp = f"{path}.tmp"
+        # The header holds the seed, so the file is never readable by others.
+        with open(os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w") as f:
+            f.write(header + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        keystore = cls(path)
+        if count:
+            keystore.issue(count)
+        return keystore
+
+    def __len__(self) -> int:
+        return (os.path.getsize(self.path) - self._records_start) // RECORD_SIZE
+
+    def _record(self, index: int) -> Tuple[str, bytes]:
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        with open(self.path, "rb") as f:
+            f.seek(self._records_start + index * RECORD_SIZE)
+            _, address, public_key = f.read(RECORD_SIZE).decode().split()
+        return address, bytes.fromhex(public_key)
+
+    def address(self, index: int) -> str:
+        return self._record(index)[0]
+
+    def public_key(self, index: int) -> bytes:
+        return self._record(index)[1]
+
+    def key(self, index: int) -> ChildKey:
+        """Re-derive the private key for an issued address."""
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return self.keychain.derive(index)
+
+    def index_of(self, address: str) -> Optional[int]:
+        with self._lock:
+            if self._by_address is None:
+                self._by_address = {}
+                with open(self.path, "rb") as f:
+                    f.seek(self._records_start)
+                    for index, line in enumerate(f):
+                        self._by_address[line[11:11 + ADDRESS_LENGTH].decode()] = index
+            return self._by_address.get(address)
+
+    def issue(self, count: int) -> List[str]:
+        """Derive and record the next `count` addresses."""
+        with self._lock:
+            start = len(self)
+            addresses = []
+            lines = []
+            for index, address, public_key in self.keychain.iter_addresses(start):
+                if index >= start + count:
+                    break
+                addresses.append(address)
+                lines.append(RECORD_FORMAT.format(index=index, address=address, public_key=public_key.hex()))
+            with open(self.path, "r+b") as f:
+                # Anything past the last whole record is a torn write; overwrite it.
+                f.seek(self._records_start + start * RECORD_SIZE)
+                f.truncate()
+                f.write("".join(lines).encode())
+                f.flush()
+                os.fsync(f.fileno())
+            if self._by_address is not None:
+                self._by_address.update((address, start + i) for i, address in enumerate(addresses))
+            return addresses
@@ -0,0 +1,178 @@
+"""Process-wide logging setup: queued, structured and rate-limited.
+
+configure_logging() is called once by an entry point: the pool and simulator
+CLIs (each with --log-file), run_demo.py and mining_demo.py (to mining.log),
+or a test. Library code never calls it. It puts a QueueHandler on the "triadnet"
+logger, so a log call on the mining or consensus thread only builds a
+LogRecord and drops it on a bounded queue. A single "triadnet-log-writer"
+thread formats records and writes them. If that thread falls behind, new
+records are dropped and counted rather than blocking the caller.
+
+Records are written one JSON object per line. Anything passed as
+`extra={...}` becomes a field, so hot paths log a short constant message plus
+numbers instead of formatting strings themselves.
+
+RateLimitFilter limits each call site to `burst` INFO-or-lower records per
+`interval` seconds. The first record after a quiet spell carries a
+`suppressed` count. This stops chatty loops (templates, found hashes, peer
+chatter) from filling the disk. Warnings and errors always pass, so a
+failure is never hidden behind a quiet period.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+DEFAULT_QUEUE_SIZE = 10000
+DEFAULT_BURST = 10
+DEFAULT_INTERVAL = 60.0
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+DEFAULT_BACKUPS = 3
+ROOT_LOGGER = "triadnet"
+WRITER_THREAD = "triadnet-log-writer"
+
+# Attributes every LogRecord has; anything else on a record came from `extra`.
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, thread, message and extras."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+class RateLimitFilter(logging.Filter):
+    """Pass at most `burst` records per call site in each `interval` seconds.
+    Records above `max_level` are never limited."""
+
+    def __init__(self, burst: int = DEFAULT_BURST, interval: float = DEFAULT_INTERVAL,
+                 max_level: int = logging.INFO):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self.max_level = max_level
+        # (logger, file, line) -> [window start, passed in window, suppressed since last pass]
+        self._sites: Dict[Tuple[str, str, int], list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > self.max_level:
+            return True
+        key = (record.name, record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            site = self._sites.get(key)
+            if site is None:
+                site = self._sites[key] = [now, 0, 0]
+            if now - site[0] >= self.interval:
+                site[0], site[1] = now, 0
+            if site[1] >= self.burst:
+                site[2] += 1
+                return False
+            site[1] += 1
+            suppressed, site[2] = site[2], 0
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks and never formats on the caller's thread."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The stock prepare() formats the message here, on the hot thread. Only
+        # traceback objects must be rendered now, before their frames change.
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class WriterListener(logging.handlers.QueueListener):
+    """QueueListener whose thread is named WRITER_THREAD, so it can be told
+    apart in thread dumps and the profiler."""
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._monitor, name=WRITER_THREAD, daemon=True)
+        self._thread.start()
+
+_lock = threading.Lock()
+_listener: Optional[WriterListener] = None
+_handler: Optional[DroppingQueueHandler] = None
+
+def configure_logging(level: int = logging.INFO,
+                      path: Optional[str] = None,
+                      burst: int = DEFAULT_BURST,
+                      interval: float = DEFAULT_INTERVAL,
+                      queue_size: int = DEFAULT_QUEUE_SIZE,
+                      max_bytes: int = DEFAULT_MAX_BYTES,
+                      stream=None) -> DroppingQueueHandler:
+    """Route "triadnet.*" logs through a queue to a background writer.
+
+    Writes to `path` (rotated at `max_bytes`) or to `stream` (stderr by
+    default). Only the first call installs the pipeline; later calls just
+    set the level and return the existing handler.
+    """
+    global _listener, _handler
+    with _lock:
+        root = logging.getLogger(ROOT_LOGGER)
+        root.setLevel(level)
+        if _handler is not None:
+            return _handler
+        if path is not None:
+            output: logging.Handler = logging.handlers.RotatingFileHandler(
+                path, maxBytes=max_bytes, backupCount=DEFAULT_BACKUPS
+            )
+        else:
+            output = logging.StreamHandler(stream or sys.stderr)
+        output.setFormatter(JsonFormatter())
+        log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        _handler = DroppingQueueHandler(log_queue)
+        _handler.addFilter(RateLimitFilter(burst, interval))
+        _listener = WriterListener(log_queue, output, respect_handler_level=True)
+        _listener.start()
+        root.addHandler(_handler)
+        root.propagate = False
+        atexit.register(shutdown_logging)
+        return _handler
+
+def shutdown_logging() -> None:
+    """Flush queued records and remove the pipeline; safe to call more than once."""
+    global _listener, _handler
+    with _lock:
+        if _handler is None:
+            return
+        root = logging.getLogger(ROOT_LOGGER)
+        root.removeHandler(_handler)
+        root.propagate = True
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = _handler = None
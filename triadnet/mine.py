@@ -1,6 +1,6 @@
 import time
 import logging
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Tuple
 from dataclasses import dataclass, field
 from queue import Queue
 import threading
@@ -12,8 +12,11 @@ from .core.transaction import Transaction
 from .core.wallet import Wallet
 from .core.fractal_coordinate import FractalCoordinate
 from .consensus.proof_of_work import ProofOfFractalWork, ConsensusManager, BLOCK_REWARD
+from .consensus.fractal_score import MAX_SCORE, MIN_SCORE, get_engine
 from .crypto.hashing import calculate_hash
 
+COORD_SEARCH_RADIUS = 50
+
 @dataclass
 class MiningStats:
     blocks_mined: int = 0
@@ -22,6 +25,7 @@ class MiningStats:
     start_time: float = field(default_factory=time.time)
     last_block_time: float = 0
     hash_rate: float = 0
+    hashes: int = 0
     
     def update_block_mined(self, reward: float):
         self.blocks_mined += 1
@@ -32,6 +36,45 @@ class MiningStats:
         self.last_block_time = current_time
         self.hash_rate = (self.blocks_mined / self.total_time) * 3600 if self.total_time > 0 else 0
 
+def adjusted_coordinates(coord: FractalCoordinate, last_block_time: float) -> Optional[Tuple[FractalCoordinate, float, str]]:
+    """A better mining spot near `coord` after a block took `last_block_time`
+    seconds, with its score and why it was chosen, or None to stay put."""
+    # Low-scoring coordinates pull the retarget down, high-scoring ones push it up.
+    if last_block_time > 120:
+        target, reason = MIN_SCORE, "easier"
+    elif last_block_time < 10:
+        target, reason = MAX_SCORE, "more challenging"
+    else:
+        return None
+    best, score = get_engine().best_near(coord, COORD_SEARCH_RADIUS, target)
+    return best, score, reason
+
+def status_report(miner, active: bool, pending: int) -> Dict[str, any]:
+    """get_status() payload for a Miner or an aio.AsyncMiner."""
+    stats = miner.stats
+    return {
+        "active": active,
+        "address": miner.wallet.address,
+        "fractal_coordinates": {
+            "a": miner.fractal_coord.a,
+            "b": miner.fractal_coord.b,
+            "c": miner.fractal_coord.c
+        },
+        "difficulty": miner.consensus.pofw.difficulty,
+        "pending_transactions": pending,
+        "stats": {
+            "blocks_mined": stats.blocks_mined,
+            "total_time": f"{stats.total_time:.2f}s",
+            "total_reward": f"{stats.total_reward:.2f} TRIAD",
+            "hash_rate": f"{stats.hash_rate:.2f} blocks/hour",
+            "hashes_per_second": f"{stats.hashes / max(time.time() - stats.start_time, 1e-9):.0f}",
+            "mining_start": datetime.fromtimestamp(stats.start_time).strftime("%Y-%m-%d %H:%M:%S"),
+            "last_block": datetime.fromtimestamp(stats.last_block_time).strftime("%Y-%m-%d %H:%M:%S") if stats.last_block_time else "Never"
+        },
+        "chain_height": len(miner.blockchain.chain),
+        "timestamp": datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+    }
+
 class Miner:
     def __init__(self, 
                  wallet: Wallet,
@@ -45,21 +88,19 @@ class Miner:
         self.consensus = ConsensusManager(blockchain)
         self._mining = False
         self._mining_thread: Optional[threading.Thread] = None
+        self._adjust_thread: Optional[threading.Thread] = None
         self._pending_transactions: Queue = Queue()
         self.stats = MiningStats()
+        # Handlers belong to the process: entry points (run_demo.py, the pool and
+        # simulator CLIs) call logs.configure_logging(), not each Miner.
         self.logger = logging.getLogger("triadnet.miner")
-        handler = logging.StreamHandler()
-        formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
-        handler.setFormatter(formatter)
-        self.logger.addHandler(handler)
-        self.logger.setLevel(logging.INFO)
         self.logger.info(f"Miner initialized with address {wallet.address}")
         self.logger.info(f"Initial fractal coordinates: {fractal_coord}")
 
     def start(self):
         if not self._mining:
             self._mining = True
-            self._mining_thread = threading.Thread(target=self._mine_loop)
+            self._mining_thread = threading.Thread(target=self._mine_loop, name="triadnet-miner")
             self._mining_thread.daemon = True
             self._mining_thread.start()
             self.logger.info(f"Mining started at coordinates {self.fractal_coord}")
@@ -83,64 +124,55 @@ class Miner:
                     miner_address=self.wallet.address,
                     fractal_coord=self.fractal_coord
                 )
-                self.logger.info(f"Mining block {block.index} with {len(block.transactions)} transactions...")
-                result = self.consensus.mine_block(block)
+                # Lazy %-arguments: nothing is formatted on this thread unless the level is enabled.
+                self.logger.debug(
+                    "Mining block %d with %d transactions", block.index, len(block.transactions),
+                    extra={"event": "template", "height": block.index, "transactions": len(block.transactions)}
+                )
+                result = self.consensus.mine_block(block, should_stop=lambda: not self._mining)
+                self.stats.hashes += result.hashes
                 if result.success:
                     self.stats.update_block_mined(BLOCK_REWARD)
                     self.logger.info(
-                        f"Block mined! Hash: {result.hash_val[:10]}... "
-                        f"Nonce: {result.nonce} Time: {result.duration:.2f}s "
-                        f"Reward: {BLOCK_REWARD} TRIAD"
+                        "Block %d mined in %.2fs, reward %s TRIAD", block.index, result.duration, BLOCK_REWARD,
+                        extra={"event": "block_mined", "height": block.index, "hash": result.hash_val,
+                               "nonce": result.nonce, "duration": result.duration, "reward": BLOCK_REWARD}
                     )
                     if self.auto_adjust_coords:
                         self._adjust_fractal_coordinates(result.duration)
-                else:
-                    self.logger.warning(
-                        f"Failed to mine block after {result.duration:.2f}s, "
-                        "adjusting parameters and retrying..."
+                elif self._mining:
+                    self.logger.debug(
+                        "Rebuilding block template after %.2fs (new tip or transactions)", result.duration,
+                        extra={"event": "template_stale", "height": block.index, "duration": result.duration}
                     )
-                    time.sleep(1)
             except Exception as e:
-                self.logger.error(f"Mining error: {str(e)}")
+                self.logger.error("Mining error: %s", e, extra={"event": "mining_error"})
                 time.sleep(5)
 
     def _adjust_fractal_coordinates(self, last_block_time: float):
+        """Search for better coordinates on a side thread. A cold search scores
+        about a million points, so the mining thread keeps hashing at the old
+        coordinates and picks up the new ones with its next template."""
         if not self.auto_adjust_coords:
             return
-        if last_block_time > 120:
-            self.fractal_coord = FractalCoordinate(
-                a=self.fractal_coord.a + 50,
-                b=self.fractal_coord.b + 50,
-                c=self.fractal_coord.c + 50
-            )
-            self.logger.info(f"Adjusted coordinates to find easier mining spot: {self.fractal_coord}")
-        elif last_block_time < 10:
-            self.fractal_coord = FractalCoordinate(
-                a=max(0, self.fractal_coord.a - 50),
-                b=max(0, self.fractal_coord.b - 50),
-                c=max(0, self.fractal_coord.c - 50)
-            )
-            self.logger.info(f"Adjusted coordinates to find more challenging spot: {self.fractal_coord}")
+        if self._adjust_thread is not None and self._adjust_thread.is_alive():
+            return
+        self._adjust_thread = threading.Thread(
+            target=self._search_coordinates, args=(self.fractal_coord, last_block_time),
+            name="triadnet-coord-search", daemon=True
+        )
+        self._adjust_thread.start()
+
+    def _search_coordinates(self, start: FractalCoordinate, last_block_time: float):
+        try:
+            adjusted = adjusted_coordinates(start, last_block_time)
+        except Exception as e:
+            self.logger.error("Coordinate search failed: %s", e, extra={"event": "coord_search_error"})
+            return
+        if adjusted is None:
+            return
+        self.fractal_coord, score, reason = adjusted
+        self.logger.info(f"Adjusted coordinates to find {reason} mining spot: {self.fractal_coord} (score {score:.2f})")
 
     def get_status(self) -> Dict[str, any]:
-        return {
-            "active": self._mining,
-            "address": self.wallet.address,
-            "fractal_coordinates": {
-                "a": self.fractal_coord.a,
-                "b": self.fractal_coord.b,
-                "c": self.fractal_coord.c
-            },
-            "difficulty": self.consensus.pofw.difficulty,
-            "pending_transactions": self._pending_transactions.qsize(),
-            "stats": {
-                "blocks_mined": self.stats.blocks_mined,
-                "total_time": f"{self.stats.total_time:.2f}s",
-                "total_reward": f"{self.stats.total_reward:.2f} TRIAD",
-                "hash_rate": f"{self.stats.hash_rate:.2f} blocks/hour",
-                "mining_start": datetime.fromtimestamp(self.stats.start_time).strftime("%Y-%m-%d %H:%M:%S"),
-                "last_block": datetime.fromtimestamp(self.stats.last_block_time).strftime("%Y-%m-%d %H:%M:%S") if self.stats.last_block_time else "Never"
-            },
-            "chain_height": len(self.blockchain.chain),
-            "timestamp": datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
-        }
+        return status_report(self, self._mining, self._pending_transactions.qsize())
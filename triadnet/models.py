@@ -0,0 +1,6 @@
+"""Data models used by the wallet and node; re-exported from triadnet.core."""
+
+from .core.fractal_coordinate import FractalCoordinate
+from .core.transaction import Transaction
+
+__all__ = ["FractalCoordinate", "Transaction"]
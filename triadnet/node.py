@@ -1,38 +1,292 @@
+"""Peer node with inventory-based gossip.
+
+Transactions and blocks are never pushed blindly. A node announces item hashes
+(`inv`), peers ask for the ones they have not seen (`getdata`), and only then is
+the payload sent. Each node keeps a bounded LRU of items it has seen and, per
+peer, a bounded LRU of items that peer is known to have (it announced them, sent
+them, or we sent or announced them to it), so an item crosses each link at most
+once. Announcements are queued and flushed every ANNOUNCE_INTERVAL as one `inv`
+per peer, keeping per-transaction cost flat as peers are added.
+"""
+
 import json
+import logging
 import socket
 import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
 from triadnet.wallet import Wallet
+from triadnet.core.block import Block
+from triadnet.core.blockchain import Blockchain
+from triadnet.core.header_proof import HeaderProofResult, build_header_proof, verify_header_proof
+from triadnet.core.state_tree import verify_balance
+from triadnet.core.transaction import Transaction
+from triadnet.enum import BlockStatus
+
+ANNOUNCE_INTERVAL = 0.1
+MAX_SEEN_ITEMS = 50000
+MAX_KNOWN_PER_PEER = 10000
+MAX_RELAY_ITEMS = 5000
+MAX_INV_PER_MESSAGE = 1000
+GETDATA_TIMEOUT = 5.0
+
+class LRUSet:
+    """Bounded set that forgets its oldest members first."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._items: "OrderedDict[str, None]" = OrderedDict()
+
+    def __contains__(self, item: str) -> bool:
+        return item in self._items
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def add(self, item: str) -> None:
+        self._items[item] = None
+        self._items.move_to_end(item)
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
 
 class Node:
-    def __init__(self, node_id: str, host: str = "127.0.0.1", port: int = 5000):
+    def __init__(self, node_id: str, host: str = "127.0.0.1", port: int = 5000,
+                 blockchain: Optional[Blockchain] = None):
         self.node_id = node_id
         self.wallet = Wallet()
         self.host = host
         self.port = port
         self.peers = {}
         self.running = True
+        self.blockchain = blockchain or Blockchain()
+        self.logger = logging.getLogger("triadnet.node")
+        self.seen = LRUSet(MAX_SEEN_ITEMS)
+        self.known: Dict[str, LRUSet] = {}
+        self.stats: Dict[str, int] = {}
+        # Recently relayed payloads, served to peers that ask for them.
+        self._relay: "OrderedDict[str, Tuple[str, dict]]" = OrderedDict()
+        self._outbox: Dict[str, List[Tuple[str, str]]] = {}
+        self._requested: Dict[str, float] = {}
+        self.header_proofs: Dict[str, HeaderProofResult] = {}
+        # (peer, address) -> balance proven against that peer's proven tip; None if absent.
+        self.balance_proofs: Dict[Tuple[str, str], Optional[float]] = {}
+        self._lock = threading.RLock()
 
     def start_server(self):
-        threading.Thread(target=self._server_loop, daemon=True).start()
+        threading.Thread(target=self._server_loop, name=f"triadnet-node-{self.node_id}-server", daemon=True).start()
+        threading.Thread(target=self._announce_loop, name=f"triadnet-node-{self.node_id}-announce", daemon=True).start()
 
     def _server_loop(self):
         with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
             s.bind((self.host, self.port))
             s.listen()
             while self.running:
                 client, _ = s.accept()
-                threading.Thread(target=self._handle_client, args=(client,), daemon=True).start()
+                threading.Thread(
+                    target=self._handle_client, args=(client,), name=f"triadnet-node-{self.node_id}-peer", daemon=True
+                ).start()
 
     def _handle_client(self, client_socket):
-        with client_socket:
-            data = client_socket.recv(4096)
-            if data: print(f"[{self.node_id}] Received: {data.decode()}")
+        with client_socket, client_socket.makefile("r") as reader:
+            for line in reader:
+                try:
+                    self.handle_message(json.loads(line))
+                except (ValueError, KeyError, TypeError) as e:
+                    self.logger.warning(f"[{self.node_id}] Dropped malformed message: {e}")
+
+    def _count(self, name: str, n: int = 1) -> None:
+        # Called from the server, peer and announce threads.
+        with self._lock:
+            self.stats[name] = self.stats.get(name, 0) + n
+
+    def send(self, peer_id: str, messages: List[dict]) -> None:
+        """Deliver `messages` to one peer over a single connection."""
+        host, port = self.peers[peer_id]
+        payload = "".join(json.dumps(dict(message, sender=self.node_id)) + "\n" for message in messages)
+        try:
+            with socket.create_connection((host, port), timeout=5) as s:
+                s.sendall(payload.encode())
+        except OSError as e:
+            self.logger.warning(f"[{self.node_id}] Could not reach {peer_id}: {e}")
 
     def broadcast(self, message: dict):
-        for peer_id, (host, port) in self.peers.items():
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                s.connect((host, port))
-                s.sendall(json.dumps(message).encode())
+        for peer_id in list(self.peers):
+            self.send(peer_id, [message])
 
     def add_peer(self, peer_id: str, host: str, port: int):
-        self.peers[peer_id] = (host, port)
+        with self._lock:
+            self.peers[peer_id] = (host, port)
+            self.known.setdefault(peer_id, LRUSet(MAX_KNOWN_PER_PEER))
+
+    def announce_transaction(self, tx: Transaction) -> None:
+        self.blockchain.add_pending_transaction(tx)
+        self._relay_item("tx", tx.tx_id, tx.to_dict())
+
+    def announce_block(self, block: Block) -> None:
+        self._relay_item("block", block.hash, block.to_dict())
+
+    def _relay_item(self, kind: str, item_hash: str, payload: dict, source: Optional[str] = None) -> None:
+        with self._lock:
+            self.seen.add(item_hash)
+            self._relay[item_hash] = (kind, payload)
+            while len(self._relay) > MAX_RELAY_ITEMS:
+                self._relay.popitem(last=False)
+            for peer_id, known in self.known.items():
+                if peer_id != source and item_hash not in known:
+                    known.add(item_hash)
+                    self._outbox.setdefault(peer_id, []).append((kind, item_hash))
+
+    def _announce_loop(self) -> None:
+        while self.running:
+            time.sleep(ANNOUNCE_INTERVAL)
+            self.flush_announcements()
+
+    def flush_announcements(self) -> None:
+        with self._lock:
+            outbox, self._outbox = self._outbox, {}
+            expired = time.time() - GETDATA_TIMEOUT
+            self._requested = {h: t for h, t in self._requested.items() if t > expired}
+        for peer_id, items in outbox.items():
+            messages = [
+                {"type": "inv", "items": items[i:i + MAX_INV_PER_MESSAGE]}
+                for i in range(0, len(items), MAX_INV_PER_MESSAGE)
+            ]
+            self._count("inv_sent", len(messages))
+            self.send(peer_id, messages)
+
+    def handle_message(self, message: dict) -> None:
+        kind = message.get("type")
+        peer_id = message.get("sender")
+        if kind == "inv":
+            self._on_inv(peer_id, message["items"])
+        elif kind == "getdata":
+            self._on_getdata(peer_id, message["items"])
+        elif kind == "tx":
+            self._on_tx(peer_id, Transaction.from_dict(message["tx"]))
+        elif kind == "block":
+            self._on_block(peer_id, Block.from_dict(message["block"]))
+        elif kind == "getheaderproof":
+            self._on_getheaderproof(peer_id)
+        elif kind == "headerproof":
+            self._on_headerproof(peer_id, message["proof"])
+        elif kind == "getbalanceproof":
+            self._on_getbalanceproof(peer_id, message["address"])
+        elif kind == "balanceproof":
+            self._on_balanceproof(peer_id, message["address"], message["proof"])
+        else:
+            print(f"[{self.node_id}] Received: {message}")
+
+    def _mark_known(self, peer_id: Optional[str], item_hash: str) -> None:
+        known = self.known.get(peer_id)
+        if known is not None:
+            known.add(item_hash)
+
+    def _on_inv(self, peer_id: str, items: Iterable) -> None:
+        wanted = []
+        now = time.time()
+        with self._lock:
+            for kind, item_hash in items:
+                self._mark_known(peer_id, item_hash)
+                if item_hash in self.seen or self.blockchain.contains(item_hash):
+                    continue
+                # Ask only one announcer at a time; retry elsewhere if it never answers.
+                if now - self._requested.get(item_hash, 0.0) < GETDATA_TIMEOUT:
+                    continue
+                self._requested[item_hash] = now
+                wanted.append([kind, item_hash])
+        if wanted and peer_id in self.peers:
+            self.send(peer_id, [{"type": "getdata", "items": wanted}])
+
+    def _on_getdata(self, peer_id: str, items: Iterable) -> None:
+        replies = []
+        with self._lock:
+            for kind, item_hash in items:
+                entry = self._relay.get(item_hash)
+                if entry is None and kind == "block" and item_hash in self.blockchain.blocks:
+                    entry = ("block", self.blockchain.blocks[item_hash].to_dict())
+                if entry is None:
+                    continue
+                self._mark_known(peer_id, item_hash)
+                replies.append({"type": entry[0], entry[0]: entry[1]})
+        if replies and peer_id in self.peers:
+            self.send(peer_id, replies)
+
+    def _on_tx(self, peer_id: Optional[str], tx: Transaction) -> None:
+        with self._lock:
+            self._requested.pop(tx.tx_id, None)
+            self._mark_known(peer_id, tx.tx_id)
+            if tx.tx_id in self.seen:
+                self._count("duplicate_payloads")
+                return
+            self._count("tx_received")
+            self.blockchain.add_pending_transaction(tx)
+            self._relay_item("tx", tx.tx_id, tx.to_dict(), source=peer_id)
+
+    def _on_block(self, peer_id: Optional[str], block: Block) -> None:
+        missing = None
+        with self._lock:
+            self._requested.pop(block.hash, None)
+            self._mark_known(peer_id, block.hash)
+            if block.hash in self.seen:
+                self._count("duplicate_payloads")
+                return
+            status = self.blockchain.process_block(block)
+            if status in (BlockStatus.INVALID, BlockStatus.DUPLICATE):
+                # Remember it so further announcements are not fetched again, but never relay it.
+                self.seen.add(block.hash)
+                return
+            if status == BlockStatus.ORPHAN:
+                # The sender has the parent; fetch it (and, in turn, its parents) so the orphan can connect.
+                now = time.time()
+                parent = block.previous_hash
+                if now - self._requested.get(parent, 0.0) >= GETDATA_TIMEOUT:
+                    self._requested[parent] = now
+                    missing = parent
+                    self._count("parents_requested")
+            self._count("blocks_received")
+            self._relay_item("block", block.hash, block.to_dict(), source=peer_id)
+        if missing is not None and peer_id in self.peers:
+            self.send(peer_id, [{"type": "getdata", "items": [["block", missing]]}])
+
+    def request_header_proof(self, peer_id: str) -> None:
+        """Ask `peer_id` to prove its tip; the verdict lands in header_proofs[peer_id]."""
+        self.send(peer_id, [{"type": "getheaderproof"}])
+
+    def _on_getheaderproof(self, peer_id: str) -> None:
+        if peer_id not in self.peers or not self.blockchain.last_block.mmr_root:
+            return
+        with self._lock:
+            proof = build_header_proof(self.blockchain)
+        self.send(peer_id, [{"type": "headerproof", "proof": proof}])
+
+    def _on_headerproof(self, peer_id: str, proof: dict) -> None:
+        result = verify_header_proof(proof, self.blockchain.chain[0].hash, self.blockchain.difficulty)
+        if not result.valid:
+            self.logger.warning(f"[{self.node_id}] Rejected header proof from {peer_id}: {result.reason}")
+        self.header_proofs[peer_id] = result
+
+    def request_balance_proof(self, peer_id: str, address: str) -> None:
+        """Ask `peer_id` for `address`'s balance at its tip; checked against the
+        state root from that peer's header proof, so request_header_proof first."""
+        self.send(peer_id, [{"type": "getbalanceproof", "address": address}])
+
+    def _on_getbalanceproof(self, peer_id: str, address: str) -> None:
+        if peer_id not in self.peers or not self.blockchain.last_block.state_root:
+            return
+        with self._lock:
+            proof = self.blockchain.prove_balance(address)
+        self.send(peer_id, [{"type": "balanceproof", "address": address, "proof": proof}])
+
+    def _on_balanceproof(self, peer_id: str, address: str, proof: dict) -> None:
+        tip = self.header_proofs.get(peer_id)
+        if tip is None or not tip.valid or not tip.state_root:
+            self.logger.warning(f"[{self.node_id}] Ignoring balance proof from {peer_id}: no proven tip")
+            return
+        if (proof.get("block_hash") != tip.tip_hash
+                or not verify_balance(tip.state_root, address, proof.get("balance"), proof.get("proof", {}))):
+            self.logger.warning(f"[{self.node_id}] Rejected balance proof for {address} from {peer_id}")
+            return
+        self.balance_proofs[(peer_id, address)] = proof["balance"]
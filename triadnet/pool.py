@@ -0,0 +1,348 @@
+"""Pooled mining: a coordinator that hands block templates to remote workers.
+
+Protocol: JSON lines over TCP.
+
+    worker -> pool  {"type": "subscribe", "worker": name}
+    pool -> worker  {"type": "subscribed", "share_difficulty": s}
+    pool -> worker  {"type": "job", "job_id": j, "clean": bool, "extranonce": e, "block": {...}}
+    worker -> pool  {"type": "submit", "job_id": j, "extranonce": e, "nonce": n}
+    pool -> worker  {"type": "result", "accepted": bool, "block": bool, "reason": str}
+    worker -> pool  {"type": "getwork"}      (nonce range exhausted; asks for a fresh extranonce)
+
+Every job is personalized with an extranonce unique to the worker, so workers
+never search the same space. The pool keeps the pre-nonce sha256 state of each
+job it sent, so checking a share costs a single hash. A new job with
+clean=True is pushed to every worker as soon as the chain tip changes.
+
+    python -m triadnet.pool serve --port 3333 --difficulty 4 --share-difficulty 2
+    python -m triadnet.pool worker --port 3333 --name rig-1
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import socket
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Set, Tuple
+
+from .core.block import Block
+from .core.blockchain import Blockchain
+from .core.fractal_coordinate import FractalCoordinate
+from .consensus.proof_of_work import ConsensusManager, TEMPLATE_REFRESH_INTERVAL, STOP_CHECK_INTERVAL
+from .logs import configure_logging
+
+DEFAULT_SHARE_DIFFICULTY = 2
+WORKER_NONCE_RANGE = 1_000_000
+MAX_JOBS_PER_WORKER = 16
+
+@dataclass
+class Job:
+    job_id: int
+    block: Block
+    revision: int
+
+@dataclass
+class WorkerSession:
+    conn: socket.socket
+    name: str = ""
+    extranonce: int = 0
+    shares: int = 0
+    # (job_id, extranonce) -> (block, sha256 prefix state, suffix)
+    templates: Dict[Tuple[int, int], Tuple[Block, Any, bytes]] = field(default_factory=dict)
+    seen: Set[Tuple[int, int, int]] = field(default_factory=set)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def send(self, message: dict) -> None:
+        with self.lock:
+            self.conn.sendall((json.dumps(message) + "\n").encode())
+
+class PoolServer:
+    def __init__(self,
+                 blockchain: Blockchain,
+                 address: str,
+                 fractal_coord: Optional[FractalCoordinate] = None,
+                 share_difficulty: int = DEFAULT_SHARE_DIFFICULTY,
+                 host: str = "127.0.0.1",
+                 port: int = 0):
+        if share_difficulty > blockchain.difficulty:
+            raise ValueError("Share difficulty must not exceed the block difficulty")
+        self.blockchain = blockchain
+        self.consensus = ConsensusManager(blockchain, retarget=False)
+        self.address = address
+        self.fractal_coord = fractal_coord or FractalCoordinate(1, 1, 1)
+        self.share_difficulty = share_difficulty
+        self.share_target = "0" * share_difficulty
+        self.host = host
+        self.port = port
+        self.credits: Dict[str, int] = {}
+        self.blocks_found = 0
+        self.job: Optional[Job] = None
+        self.logger = logging.getLogger("triadnet.pool")
+        self._sessions: Dict[int, WorkerSession] = {}
+        self._job_ids = itertools.count(1)
+        self._extranonces = itertools.count(1)
+        self._lock = threading.RLock()
+        self._running = False
+        self._server: Optional[socket.socket] = None
+
+    def start(self) -> int:
+        self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._server.bind((self.host, self.port))
+        self._server.listen()
+        self.port = self._server.getsockname()[1]
+        self._running = True
+        self._new_job(clean=True)
+        self.blockchain.add_listener(self)
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        threading.Thread(target=self._refresh_loop, daemon=True).start()
+        self.logger.info(f"Pool listening on {self.host}:{self.port}, share difficulty {self.share_difficulty}")
+        return self.port
+
+    def stop(self) -> None:
+        self._running = False
+        self.blockchain.remove_listener(self)
+        if self._server:
+            self._server.close()
+        with self._lock:
+            for session in self._sessions.values():
+                session.conn.close()
+
+    def block_connected(self, block: Block, height: int) -> None:
+        self._new_job(clean=True)
+
+    def block_disconnected(self, block: Block, height: int) -> None:
+        pass
+
+    def _new_job(self, clean: bool) -> None:
+        with self._lock:
+            block = self.consensus.create_block(self.address, self.fractal_coord)
+            self.job = Job(next(self._job_ids), block, self.blockchain.pending_revision)
+            for session in list(self._sessions.values()):
+                if clean:
+                    session.templates.clear()
+                    session.seen.clear()
+                self._send_job(session, clean)
+
+    def _refresh_loop(self) -> None:
+        # Fold new transactions into the template without invalidating workers' shares.
+        while self._running:
+            time.sleep(TEMPLATE_REFRESH_INTERVAL)
+            if self.job and self.blockchain.pending_revision != self.job.revision:
+                self._new_job(clean=False)
+
+    def _send_job(self, session: WorkerSession, clean: bool) -> None:
+        job = self.job
+        block = Block.from_dict(job.block.to_dict())
+        block.transactions[-1].extranonce = session.extranonce
+        prefix, suffix = block.hash_template()
+        session.templates[(job.job_id, session.extranonce)] = (block, prefix, suffix)
+        while len(session.templates) > MAX_JOBS_PER_WORKER:
+            session.templates.pop(next(iter(session.templates)))
+        try:
+            session.send({
+                "type": "job",
+                "job_id": job.job_id,
+                "clean": clean,
+                "extranonce": session.extranonce,
+                "block": block.to_dict()
+            })
+        except OSError:
+            pass
+
+    def _accept_loop(self) -> None:
+        while self._running:
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn: socket.socket) -> None:
+        session = WorkerSession(conn)
+        key = id(session)
+        try:
+            with conn, conn.makefile("r") as reader:
+                for line in reader:
+                    reply = self.handle(session, key, json.loads(line))
+                    if reply:
+                        session.send(reply)
+        except (OSError, ValueError) as e:
+            self.logger.debug(f"Worker {session.name or key} dropped: {e}")
+        finally:
+            with self._lock:
+                self._sessions.pop(key, None)
+
+    def handle(self, session: WorkerSession, key: int, message: dict) -> Optional[dict]:
+        kind = message.get("type")
+        with self._lock:
+            if kind == "subscribe":
+                session.name = str(message.get("worker") or f"worker-{key}")
+                session.extranonce = next(self._extranonces)
+                self._sessions[key] = session
+                session.send({"type": "subscribed", "share_difficulty": self.share_difficulty})
+                self._send_job(session, clean=True)
+                return None
+            if key not in self._sessions:
+                return {"type": "error", "reason": "not subscribed"}
+            if kind == "getwork":
+                session.extranonce = next(self._extranonces)
+                self._send_job(session, clean=False)
+                return None
+            if kind == "submit":
+                return self.submit(session, int(message["job_id"]), int(message["extranonce"]), int(message["nonce"]))
+        return {"type": "error", "reason": f"unknown message {kind}"}
+
+    def submit(self, session: WorkerSession, job_id: int, extranonce: int, nonce: int) -> dict:
+        template = session.templates.get((job_id, extranonce))
+        if template is None:
+            return {"type": "result", "accepted": False, "block": False, "reason": "stale"}
+        if (job_id, extranonce, nonce) in session.seen:
+            return {"type": "result", "accepted": False, "block": False, "reason": "duplicate"}
+        block, prefix, suffix = template
+        h = prefix.copy()
+        h.update(b"%d" % nonce + suffix)
+        block_hash = h.hexdigest()
+        if not block_hash.startswith(self.share_target):
+            return {"type": "result", "accepted": False, "block": False, "reason": "low difficulty"}
+        session.seen.add((job_id, extranonce, nonce))
+        session.shares += 1
+        self.credits[session.name] = self.credits.get(session.name, 0) + 1
+        found = False
+        if block_hash.startswith("0" * self.blockchain.difficulty):
+            solved = Block.from_dict(block.to_dict())
+            solved.nonce = nonce
+            solved.hash = block_hash
+            found = self.blockchain.add_block(solved)
+            if found:
+                self.blocks_found += 1
+                self.logger.info(f"Worker {session.name} found block {solved.index}: {block_hash[:12]}")
+        return {"type": "result", "accepted": True, "block": found, "reason": ""}
+
+class PoolWorker:
+    """Standalone mining worker: takes jobs from a PoolServer and submits shares."""
+
+    def __init__(self, host: str, port: int, name: str, nonce_range: int = WORKER_NONCE_RANGE):
+        self.host = host
+        self.port = port
+        self.name = name
+        self.nonce_range = nonce_range
+        self.accepted = 0
+        self.rejected = 0
+        self.hashes = 0
+        self.logger = logging.getLogger("triadnet.pool")
+        self._job: Optional[dict] = None
+        self._share_target = "0" * DEFAULT_SHARE_DIFFICULTY
+        self._changed = threading.Event()
+        self._running = False
+        self._conn: Optional[socket.socket] = None
+        self._send_lock = threading.Lock()
+
+    def _send(self, message: dict) -> None:
+        with self._send_lock:
+            self._conn.sendall((json.dumps(message) + "\n").encode())
+
+    def _read_loop(self) -> None:
+        try:
+            with self._conn.makefile("r") as reader:
+                for line in reader:
+                    message = json.loads(line)
+                    kind = message.get("type")
+                    if kind == "subscribed":
+                        self._share_target = "0" * message["share_difficulty"]
+                    elif kind == "job":
+                        self._job = message
+                        self._changed.set()
+                    elif kind == "result":
+                        if message["accepted"]:
+                            self.accepted += 1
+                        else:
+                            self.rejected += 1
+        except (OSError, ValueError):
+            pass
+        self._running = False
+        self._changed.set()
+
+    def run(self, duration: Optional[float] = None) -> None:
+        self._conn = socket.create_connection((self.host, self.port))
+        self._running = True
+        threading.Thread(target=self._read_loop, daemon=True).start()
+        self._send({"type": "subscribe", "worker": self.name})
+        deadline = time.time() + duration if duration else None
+        try:
+            while self._running and (deadline is None or time.time() < deadline):
+                self._changed.wait(timeout=1)
+                self._changed.clear()
+                job = self._job
+                if job is None:
+                    continue
+                if self._mine(job, deadline):
+                    self._send({"type": "getwork"})
+        finally:
+            self._running = False
+            self._conn.close()
+
+    def _mine(self, job: dict, deadline: Optional[float]) -> bool:
+        """Search the job's nonce range; True if it was exhausted."""
+        prefix, suffix = Block.from_dict(job["block"]).hash_template()
+        target = self._share_target
+        for base in range(0, self.nonce_range, STOP_CHECK_INTERVAL):
+            if self._job is not job or not self._running or (deadline and time.time() >= deadline):
+                return False
+            stop = min(base + STOP_CHECK_INTERVAL, self.nonce_range)
+            for nonce in range(base, stop):
+                h = prefix.copy()
+                h.update(b"%d" % nonce + suffix)
+                if h.hexdigest().startswith(target):
+                    self._send({"type": "submit", "job_id": job["job_id"],
+                                "extranonce": job["extranonce"], "nonce": nonce})
+            self.hashes += stop - base
+        return True
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="TriadNet mining pool")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve = sub.add_parser("serve")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=3333)
+    serve.add_argument("--difficulty", type=int, default=4)
+    serve.add_argument("--share-difficulty", type=int, default=DEFAULT_SHARE_DIFFICULTY)
+    serve.add_argument("--address", default="pool")
+    serve.add_argument("--blocks", help="BlockStore file to bootstrap from and append to")
+    worker = sub.add_parser("worker")
+    worker.add_argument("--host", default="127.0.0.1")
+    worker.add_argument("--port", type=int, default=3333)
+    worker.add_argument("--name", default=socket.gethostname())
+    worker.add_argument("--duration", type=float, default=None)
+    parser.add_argument("--log-file", help="write JSON-lines logs here instead of stderr")
+    args = parser.parse_args(argv)
+    configure_logging(path=args.log_file)
+
+    if args.command == "worker":
+        worker = PoolWorker(args.host, args.port, args.name)
+        worker.run(args.duration)
+        print(json.dumps({"accepted": worker.accepted, "rejected": worker.rejected, "hashes": worker.hashes}))
+        return
+    if args.blocks:
+        from .core.storage import BlockStore
+        from .core.snapshot import bootstrap
+        blockchain = bootstrap(BlockStore(args.blocks), difficulty=args.difficulty)
+    else:
+        blockchain = Blockchain(difficulty=args.difficulty)
+    pool = PoolServer(blockchain, args.address, share_difficulty=args.share_difficulty,
+                      host=args.host, port=args.port)
+    pool.start()
+    try:
+        while True:
+            time.sleep(10)
+            logging.getLogger("triadnet.pool").info(
+                f"Height {len(blockchain.chain) - 1}, blocks found {pool.blocks_found}, credits {pool.credits}"
+            )
+    except KeyboardInterrupt:
+        pool.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""In-process sampling profiler and allocation tracing for running nodes.
+
+SamplingProfiler wakes every `interval` seconds, reads every thread's current
+frame through sys._current_frames() and counts the stacks it sees. It never
+instruments the code being profiled, so the cost is one stack walk per thread
+per sample, and it stops by itself after at most MAX_DURATION seconds. Output
+uses the collapsed-stack format ("thread;outer;...;inner count") read by
+flamegraph.pl, speedscope and similar tools.
+
+Threads are selected by name prefix. Node threads are named "triadnet-miner",
+"triadnet-node-<id>-...", "triadnet-import-<stage>" and so on, so
+thread_prefixes=["triadnet-miner"] profiles just the mining loop.
+
+AllocationTracer wraps tracemalloc and attributes live allocations to
+SUBSYSTEMS by the innermost frame that belongs to one of them.
+
+A capture can be started over HTTP (see dashboard.py) or with a signal once
+install_signal_handler() has run; the signal variant writes its result to a
+file because there is nobody to return it to.
+"""
+
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_INTERVAL = 0.005
+DEFAULT_DURATION = 10.0
+MAX_DURATION = 120.0
+MAX_STACK_DEPTH = 128
+TRACE_FRAMES = 16
+
+SUBSYSTEMS: Dict[str, Tuple[str, ...]] = {
+    "mining": ("mine.py", "pool.py", "proof_of_work.py", "fractal_score.py"),
+    "network": ("node.py", "simulator.py"),
+    "validation": ("blockchain.py", "pipeline.py", "block.py", "transaction.py", "mempool.py"),
+    "storage": ("storage.py", "snapshot.py", "archive.py", "txindex.py", "wallet.py"),
+    "analytics": ("analytics.py", "filters.py"),
+}
+
+logger = logging.getLogger("triadnet.profiler")
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class SamplingProfiler:
+    def __init__(self, interval: float = DEFAULT_INTERVAL,
+                 thread_prefixes: Optional[Sequence[str]] = None,
+                 on_complete: Optional[Callable[["SamplingProfiler"], None]] = None):
+        self.interval = interval
+        self.thread_prefixes = tuple(thread_prefixes) if thread_prefixes else None
+        self.on_complete = on_complete
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.sampling_time = 0.0
+        self.started_at = 0.0
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, duration: float = DEFAULT_DURATION) -> None:
+        if self.running:
+            raise RuntimeError("Profiler is already running")
+        self.duration = min(max(duration, 0.0), MAX_DURATION)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="triadnet-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self.wait()
+
+    def wait(self) -> None:
+        if self._thread is not None:
+            self._thread.join()
+
+    def _wanted(self, name: str) -> bool:
+        return self.thread_prefixes is None or name.startswith(self.thread_prefixes)
+
+    def _run(self) -> None:
+        self.started_at = time.time()
+        deadline = time.monotonic() + self.duration
+        logger.info(f"Sampling every {self.interval * 1000:.1f}ms for up to {self.duration:.1f}s")
+        while not self._stop.wait(self.interval) and time.monotonic() < deadline:
+            self.sample()
+        logger.info(f"Captured {self.samples} samples ({self.overhead:.2%} of wall time spent sampling)")
+        if self.on_complete is not None:
+            try:
+                self.on_complete(self)
+            except Exception as e:
+                logger.error(f"Profile completion handler failed: {e}")
+
+    def sample(self) -> None:
+        """Record the current stack of every selected thread except our own."""
+        began = time.perf_counter()
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            name = names.get(ident, f"thread-{ident}")
+            if ident == own or not self._wanted(name):
+                continue
+            stack: List[str] = []
+            while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            stack.append(name)
+            self.stacks[";".join(reversed(stack))] += 1
+        self.samples += 1
+        self.sampling_time += time.perf_counter() - began
+
+    @property
+    def overhead(self) -> float:
+        elapsed = self.samples * self.interval
+        return self.sampling_time / elapsed if elapsed else 0.0
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def write(self, path: str) -> None:
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            f.write(self.collapsed())
+        os.replace(tmp, path)
+
+def profile(duration: float = DEFAULT_DURATION, interval: float = DEFAULT_INTERVAL,
+            thread_prefixes: Optional[Sequence[str]] = None) -> SamplingProfiler:
+    """Sample for `duration` seconds (capped at MAX_DURATION) and return the result."""
+    profiler = SamplingProfiler(interval, thread_prefixes)
+    profiler.start(duration)
+    profiler.wait()
+    return profiler
+
+class AllocationTracer:
+    """tracemalloc snapshots grouped by subsystem."""
+
+    def __init__(self, subsystems: Optional[Dict[str, Tuple[str, ...]]] = None, frames: int = TRACE_FRAMES):
+        self.subsystems = subsystems or SUBSYSTEMS
+        self.frames = frames
+        self._owns_tracing = False
+
+    def start(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._owns_tracing = True
+
+    def stop(self) -> None:
+        # Leave tracing alone if someone else (e.g. PYTHONTRACEMALLOC) turned it on.
+        if self._owns_tracing:
+            tracemalloc.stop()
+            self._owns_tracing = False
+
+    def _subsystem(self, traceback) -> str:
+        for frame in reversed(traceback):
+            filename = os.path.basename(frame.filename)
+            for name, files in self.subsystems.items():
+                if filename in files:
+                    return name
+        return "other"
+
+    def snapshot(self, top: int = 10) -> Dict[str, dict]:
+        """Live traced memory per subsystem, with its `top` largest allocation sites."""
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("Allocation tracing is not running")
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ])
+        report: Dict[str, dict] = {}
+        sites: Dict[str, Counter] = {}
+        for trace in snapshot.traces:
+            name = self._subsystem(trace.traceback)
+            entry = report.setdefault(name, {"size": 0, "count": 0})
+            entry["size"] += trace.size
+            entry["count"] += 1
+            origin = trace.traceback[-1]
+            sites.setdefault(name, Counter())[f"{origin.filename}:{origin.lineno}"] += trace.size
+        for name, entry in report.items():
+            entry["top"] = [{"site": site, "size": size} for site, size in sites[name].most_common(top)]
+        return report
+
+def trace_allocations(duration: float = DEFAULT_DURATION, top: int = 10,
+                      subsystems: Optional[Dict[str, Tuple[str, ...]]] = None) -> Dict[str, dict]:
+    """Trace for `duration` seconds (capped at MAX_DURATION) and report what is still live."""
+    tracer = AllocationTracer(subsystems)
+    tracer.start()
+    try:
+        time.sleep(min(max(duration, 0.0), MAX_DURATION))
+        return tracer.snapshot(top)
+    finally:
+        tracer.stop()
+
+_signal_profiler: Optional[SamplingProfiler] = None
+
+def install_signal_handler(signum: int = signal.SIGUSR2,
+                           directory: str = ".", duration: float = DEFAULT_DURATION,
+                           interval: float = DEFAULT_INTERVAL,
+                           thread_prefixes: Optional[Sequence[str]] = None) -> None:
+    """Start a capture whenever `signum` arrives (`kill -USR2 <pid>`); the collapsed
+    stacks are written to <directory>/profile-<pid>-<time>.collapsed."""
+
+    def write_result(profiler: SamplingProfiler) -> None:
+        path = os.path.join(directory, f"profile-{os.getpid()}-{int(profiler.started_at)}.collapsed")
+        profiler.write(path)
+        logger.info(f"Wrote profile to {path}")
+
+    def handle(signum, frame) -> None:
+        global _signal_profiler
+        if _signal_profiler is not None and _signal_profiler.running:
+            logger.warning("Profile already in progress; ignoring signal")
+            return
+        _signal_profiler = SamplingProfiler(interval, thread_prefixes, on_complete=write_result)
+        _signal_profiler.start(duration)
+
+    signal.signal(signum, handle)
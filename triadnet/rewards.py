@@ -1,4 +1,4 @@
-from triadnet.typing import List
+from typing import List
 
 def calculate_reward(transactions: List, depth: int) -> float:
     base_reward = 10.0
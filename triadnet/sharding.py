@@ -0,0 +1,244 @@
+"""Sharded triad mode: three sub-chains committed by a coordinating chain.
+
+Addresses are partitioned across SHARD_COUNT shard chains by hash. Each shard
+has its own mempool and is mined independently, at coordinates on its own
+FractalCoordinate axis (shard 0 on a, 1 on b, 2 on c), so block space grows
+with the number of shards. Every `crosslink_interval` rounds the coordinator
+mines a block whose transactions are cross-links: one per shard, committing to
+that shard's tip height and hash.
+
+A transfer whose receiver lives on another shard settles in two steps. The
+source shard debits the sender and, because it does not own the receiver,
+credits nobody. Once a coordinator block commits the source block, a Receipt
+is issued and its transaction, sent from the source shard's escrow address,
+credits the receiver on the destination shard. Receipt transactions are
+deterministic in the source transaction, so each transfer is credited once.
+
+Block rewards come from rewards.calculate_reward with depth 1 for shard blocks
+and depth 0 for coordinator blocks.
+"""
+
+import hashlib
+import json
+import logging
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set
+
+from .core.block import Block
+from .core.blockchain import Blockchain
+from .core.fractal_coordinate import FractalCoordinate
+from .core.transaction import Transaction
+from .consensus.proof_of_work import ConsensusManager, ProofOfFractalWork
+from .rewards import calculate_reward
+
+SHARD_COUNT = 3
+AXES = ("a", "b", "c")
+ESCROW_PREFIX = "shard-"
+COORDINATOR_DEPTH = 0
+SHARD_DEPTH = 1
+SHARD_COORD_OFFSET = 256
+
+logger = logging.getLogger("triadnet.sharding")
+
+def shard_of(address: str, shard_count: int = SHARD_COUNT) -> int:
+    return int.from_bytes(hashlib.sha256(address.encode()).digest()[:8], "big") % shard_count
+
+def escrow_address(shard: int) -> str:
+    return f"{ESCROW_PREFIX}{shard}"
+
+def shard_coordinate(shard: int, offset: int = SHARD_COORD_OFFSET) -> FractalCoordinate:
+    """Mining coordinate for `shard`, placed on its own axis."""
+    values = [0, 0, 0]
+    values[shard % len(AXES)] = offset
+    return FractalCoordinate(*values)
+
+@dataclass
+class CrossLink:
+    shard: int
+    height: int
+    block_hash: str
+
+    def to_transaction(self, timestamp: float) -> Transaction:
+        return Transaction(
+            sender="network",
+            receiver=escrow_address(self.shard),
+            amount=0,
+            data=json.dumps({"height": self.height, "hash": self.block_hash}, sort_keys=True),
+            timestamp=timestamp,
+        )
+
+    @classmethod
+    def from_transaction(cls, tx: Transaction) -> "CrossLink":
+        data = json.loads(tx.data)
+        return cls(int(tx.receiver[len(ESCROW_PREFIX):]), data["height"], data["hash"])
+
+@dataclass
+class Receipt:
+    source_tx_id: str
+    source: int
+    destination: int
+    receiver: str
+    amount: float
+    height: int
+    block_hash: str
+
+    def to_transaction(self) -> Transaction:
+        # Fixed timestamp and a payload naming the source transaction make the id
+        # deterministic, so re-issuing a receipt can never credit twice.
+        return Transaction(
+            sender=escrow_address(self.source),
+            receiver=self.receiver,
+            amount=self.amount,
+            data=json.dumps({
+                "source_tx": self.source_tx_id, "shard": self.source,
+                "height": self.height, "block": self.block_hash,
+            }, sort_keys=True),
+            timestamp=0.0,
+        )
+
+class ShardChain(Blockchain):
+    """A Blockchain that keeps balances only for its own address partition."""
+
+    def __init__(self, shard_id: int, shard_count: int = SHARD_COUNT, difficulty: int = 4,
+                 genesis_timestamp: Optional[float] = None):
+        self.shard_id = shard_id
+        self.shard_count = shard_count
+        super().__init__(difficulty=difficulty, genesis_timestamp=genesis_timestamp)
+
+    def owns_address(self, address: str) -> bool:
+        if address.startswith(ESCROW_PREFIX):
+            return False
+        return shard_of(address, self.shard_count) == self.shard_id
+
+def _mine(block: Block, difficulty: int) -> Block:
+    """Executor entry point; must stay a picklable module-level function."""
+    result = ProofOfFractalWork(difficulty=difficulty, retarget=False).mine_block(block)
+    return result.block
+
+class ShardCoordinator:
+    def __init__(self, miner_address: str, shard_count: int = SHARD_COUNT, difficulty: int = 4,
+                 crosslink_interval: int = 1, executor: Optional[Executor] = None,
+                 genesis_timestamp: float = 0.0):
+        self.miner_address = miner_address
+        self.shard_count = shard_count
+        self.difficulty = difficulty
+        self.crosslink_interval = crosslink_interval
+        self.shards = [
+            ShardChain(i, shard_count, difficulty, genesis_timestamp) for i in range(shard_count)
+        ]
+        self.coordinator = Blockchain(difficulty=difficulty, genesis_timestamp=genesis_timestamp)
+        self._shard_consensus = [
+            ConsensusManager(chain, retarget=False, block_reward=lambda txs: calculate_reward(txs, SHARD_DEPTH))
+            for chain in self.shards
+        ]
+        self._coordinator_consensus = ConsensusManager(
+            self.coordinator, retarget=False, block_reward=lambda txs: calculate_reward(txs, COORDINATOR_DEPTH)
+        )
+        self.committed: List[int] = [0] * shard_count
+        self.receipts: List[Receipt] = []
+        self._issued: Set[str] = set()
+        self._executor = executor
+        self.rounds = 0
+        self.confirmed_transactions = 0
+
+    def shard_for(self, address: str) -> ShardChain:
+        return self.shards[shard_of(address, self.shard_count)]
+
+    def get_balance(self, address: str) -> float:
+        return self.shard_for(address).get_balance(address)
+
+    def submit(self, tx: Transaction) -> int:
+        """Queue `tx` on its sender's shard and return that shard's id."""
+        chain = self.shard_for(tx.sender)
+        chain.add_pending_transaction(tx)
+        return chain.shard_id
+
+    def _executor_or_default(self) -> Executor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.shard_count)
+        return self._executor
+
+    def mine_round(self) -> List[Block]:
+        """Mine one block on every shard in parallel, then cross-link if due."""
+        templates = [
+            consensus.create_block(self.miner_address, shard_coordinate(i))
+            for i, consensus in enumerate(self._shard_consensus)
+        ]
+        executor = self._executor_or_default()
+        futures = [executor.submit(_mine, block, self.difficulty) for block in templates]
+        mined = [future.result() for future in futures]
+        for chain, block in zip(self.shards, mined):
+            if not chain.add_block(block):
+                raise RuntimeError(f"Shard {chain.shard_id} rejected its own block {block.hash[:16]}")
+            # The reward transaction is not user throughput.
+            self.confirmed_transactions += len(block.transactions) - 1
+        self.rounds += 1
+        if self.rounds % self.crosslink_interval == 0:
+            self.commit()
+        return mined
+
+    def commit(self) -> Block:
+        """Mine a coordinator block linking every shard tip and release the receipts it finalizes."""
+        timestamp = time.time()
+        links = [
+            CrossLink(chain.shard_id, len(chain.chain) - 1, chain.last_block.hash) for chain in self.shards
+        ]
+        for link in links:
+            self.coordinator.add_pending_transaction(link.to_transaction(timestamp))
+        block = self._coordinator_consensus.create_block(self.miner_address, FractalCoordinate(
+            SHARD_COORD_OFFSET, SHARD_COORD_OFFSET, SHARD_COORD_OFFSET
+        ))
+        block = _mine(block, self.difficulty)
+        if not self.coordinator.add_block(block):
+            raise RuntimeError(f"Coordinator rejected its own block {block.hash[:16]}")
+        issued = len(self.receipts)
+        for link in links:
+            self._release_receipts(link)
+        logger.info(
+            f"Cross-linked shard tips at heights {[link.height for link in links]}, "
+            f"issued {len(self.receipts) - issued} receipts"
+        )
+        return block
+
+    def _release_receipts(self, link: CrossLink) -> None:
+        chain = self.shards[link.shard]
+        for height in range(self.committed[link.shard] + 1, link.height + 1):
+            block = chain.chain[height]
+            for tx in block.transactions:
+                if tx.sender == "network":
+                    continue
+                for output, (receiver, amount) in enumerate(tx.credits()):
+                    if receiver.startswith(ESCROW_PREFIX) or chain.owns_address(receiver):
+                        continue
+                    receipt = Receipt(
+                        # Each output of a batch settles on its own.
+                        source_tx_id=f"{tx.tx_id}:{output}" if tx.is_batch else tx.tx_id,
+                        source=link.shard,
+                        destination=shard_of(receiver, self.shard_count),
+                        receiver=receiver,
+                        amount=amount,
+                        height=height,
+                        block_hash=block.hash,
+                    )
+                    if receipt.source_tx_id in self._issued:
+                        continue
+                    self._issued.add(receipt.source_tx_id)
+                    self.receipts.append(receipt)
+                    self.shards[receipt.destination].add_pending_transaction(receipt.to_transaction())
+        self.committed[link.shard] = max(self.committed[link.shard], link.height)
+
+    def committed_links(self) -> Dict[int, CrossLink]:
+        """Latest cross-link per shard on the coordinator's active chain."""
+        links: Dict[int, CrossLink] = {}
+        for block in self.coordinator.chain:
+            for tx in block.transactions:
+                if tx.sender == "network" and tx.receiver.startswith(ESCROW_PREFIX):
+                    link = CrossLink.from_transaction(tx)
+                    links[link.shard] = link
+        return links
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
@@ -0,0 +1,591 @@
+"""Local multi-node network simulator for propagation and orphan-rate measurement.
+
+Starts K mining nodes, each with its own Blockchain and ConsensusManager, wires them
+into a topology with injected link latency, and reports block propagation times,
+stale/orphan rates and throughput. Nodes run in-process (threads) or as
+subprocesses talking JSON lines over loopback TCP.
+
+    python -m triadnet.simulator --nodes 5 --topology ring --latency 0.1 --duration 30
+"""
+
+import argparse
+import heapq
+import itertools
+import json
+import logging
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from .core.block import Block
+from .core.blockchain import Blockchain
+from .core.filters import BlockFilterIndex
+from .core.fractal_coordinate import FractalCoordinate
+from .core.transaction import Transaction
+from .core.wallet import Wallet
+from .consensus.proof_of_work import ConsensusManager
+from .enum import BlockStatus
+from .logs import configure_logging
+
+TOPOLOGIES = ("full", "ring", "line", "star", "random")
+
+def build_topology(name: str, k: int, degree: int = 3, seed: Optional[int] = None) -> Dict[int, Set[int]]:
+    """Return an undirected adjacency map for k nodes."""
+    links: Dict[int, Set[int]] = {i: set() for i in range(k)}
+
+    def connect(i: int, j: int) -> None:
+        if i != j:
+            links[i].add(j)
+            links[j].add(i)
+
+    if name == "full":
+        for i, j in itertools.combinations(range(k), 2):
+            connect(i, j)
+    elif name == "ring":
+        for i in range(k):
+            connect(i, (i + 1) % k)
+    elif name == "line":
+        for i in range(k - 1):
+            connect(i, i + 1)
+    elif name == "star":
+        for i in range(1, k):
+            connect(0, i)
+    elif name == "random":
+        rng = random.Random(seed)
+        # A random spanning tree keeps the graph connected, extra edges bring
+        # every node up to roughly `degree` neighbours.
+        order = list(range(k))
+        rng.shuffle(order)
+        for pos in range(1, k):
+            connect(order[pos], order[rng.randrange(pos)])
+        for i in range(k):
+            candidates = [j for j in range(k) if j != i and j not in links[i]]
+            rng.shuffle(candidates)
+            while len(links[i]) < degree and candidates:
+                connect(i, candidates.pop())
+    else:
+        raise ValueError(f"Unknown topology: {name}")
+    return links
+
+@dataclass
+class LinkModel:
+    latency: float = 0.05
+    jitter: float = 0.0
+    overrides: Dict[Tuple[int, int], float] = field(default_factory=dict)
+
+    def delay(self, src: int, dst: int, rng: random.Random) -> float:
+        base = self.overrides.get((src, dst), self.overrides.get((dst, src), self.latency))
+        if self.jitter:
+            base += rng.uniform(-self.jitter, self.jitter)
+        return max(0.0, base)
+
+class LatencyRouter:
+    """Holds outgoing messages until their link delay has elapsed, then delivers them."""
+
+    def __init__(self, link_model: LinkModel, deliver: Callable[[int, int, dict], None], seed: Optional[int] = None):
+        self.link_model = link_model
+        self._deliver = deliver
+        self._rng = random.Random(seed)
+        self._queue: List[Tuple[float, int, int, int, dict]] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="triadnet-sim-router", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread:
+            self._thread.join()
+
+    def send(self, src: int, dst: int, message: dict) -> None:
+        with self._cond:
+            due = time.time() + self.link_model.delay(src, dst, self._rng)
+            heapq.heappush(self._queue, (due, next(self._seq), src, dst, message))
+            self._cond.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while self._running and (not self._queue or self._queue[0][0] > time.time()):
+                    timeout = self._queue[0][0] - time.time() if self._queue else None
+                    self._cond.wait(timeout)
+                if not self._running:
+                    return
+                _, _, src, dst, message = heapq.heappop(self._queue)
+            try:
+                self._deliver(src, dst, message)
+            except OSError:
+                pass
+
+class SimNode:
+    """A mining node with its own chain; `send` hands messages to the transport."""
+
+    def __init__(self,
+                 node_id: int,
+                 neighbours: Set[int],
+                 send: Callable[[int, int, dict], None],
+                 difficulty: int = 4,
+                 genesis_timestamp: float = 0.0,
+                 seed: Optional[int] = None):
+        self.node_id = node_id
+        self.neighbours = set(neighbours)
+        self._send = send
+        self.blockchain = Blockchain(difficulty=difficulty, genesis_timestamp=genesis_timestamp)
+        self.consensus = ConsensusManager(self.blockchain, retarget=False)
+        self.filters = BlockFilterIndex(self.blockchain)
+        self.address = Wallet(private_key=f"sim-node-{node_id}").address
+        rng = random.Random(seed if seed is None else seed + node_id)
+        self.fractal_coord = FractalCoordinate(
+            a=rng.randint(0, 1000), b=rng.randint(0, 1000), c=rng.randint(0, 1000)
+        )
+        self.events: List[dict] = []
+        self._seen_txs: Set[str] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._mine_loop, name=f"triadnet-sim-miner-{self.node_id}", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def submit_transaction(self, tx: Transaction) -> None:
+        self._accept_transaction(tx, source=None)
+
+    def handle_message(self, src: int, message: dict) -> None:
+        if message["type"] == "block":
+            self._receive_block(src, Block.from_dict(message["block"]), message["mined_at"])
+        elif message["type"] == "tx":
+            self._accept_transaction(Transaction.from_dict(message["tx"]), source=src)
+        else:
+            with self._lock:
+                reply = self.filters.handle_request(message)
+            if reply is not None:
+                self._send(self.node_id, src, reply)
+
+    def chain_hashes(self) -> List[str]:
+        with self._lock:
+            return [block.hash for block in self.blockchain.chain]
+
+    def _mine_loop(self) -> None:
+        while not self._stop.is_set():
+            with self._lock:
+                block = self.consensus.create_block(self.address, self.fractal_coord)
+            result = self.consensus.pofw.mine_block(
+                block,
+                should_stop=lambda: self._stop.is_set() or self.blockchain.last_block.hash != block.previous_hash
+            )
+            if not result.success:
+                continue
+            with self._lock:
+                accepted = self.blockchain.add_block(block)
+            if accepted:
+                mined_at = time.time()
+                self.events.append({
+                    "event": "mined", "node": self.node_id, "hash": block.hash,
+                    "parent": block.previous_hash, "height": block.index, "t": mined_at
+                })
+                self._relay({"type": "block", "block": block.to_dict(), "mined_at": mined_at}, exclude=None)
+
+    def _receive_block(self, src: int, block: Block, mined_at: float) -> None:
+        now = time.time()
+        with self._lock:
+            status = self.blockchain.process_block(block)
+        if status in (BlockStatus.DUPLICATE, BlockStatus.INVALID):
+            return
+        self.events.append({
+            "event": "received", "node": self.node_id, "hash": block.hash, "from": src,
+            "t": now, "mined_at": mined_at, "status": status.name,
+            "orphan": status == BlockStatus.ORPHAN, "reorg": status == BlockStatus.REORGANIZED
+        })
+        self._relay({"type": "block", "block": block.to_dict(), "mined_at": mined_at}, exclude=src)
+
+    def _accept_transaction(self, tx: Transaction, source: Optional[int]) -> None:
+        with self._lock:
+            if tx.tx_id in self._seen_txs:
+                return
+            self._seen_txs.add(tx.tx_id)
+            self.blockchain.add_pending_transaction(tx)
+        self._relay({"type": "tx", "tx": tx.to_dict()}, exclude=source)
+
+    def _relay(self, message: dict, exclude: Optional[int]) -> None:
+        for peer in self.neighbours:
+            if peer != exclude:
+                self._send(self.node_id, peer, message)
+
+@dataclass
+class SimulationReport:
+    nodes: int
+    duration: float
+    blocks_mined: int
+    best_chain_height: int
+    stale_blocks: int
+    stale_rate: float
+    orphan_receipts: int
+    orphan_rate: float
+    reorgs: int
+    propagation: Dict[str, float]
+    full_propagation: Dict[str, float]
+    confirmed_transactions: int
+    tx_throughput: float
+    block_rate: float
+    converged: bool
+
+    def to_dict(self) -> dict:
+        return dict(self.__dict__)
+
+def _distribution(samples: List[float]) -> Dict[str, float]:
+    if not samples:
+        return {"count": 0, "mean": 0.0, "p50": 0.0, "p90": 0.0, "max": 0.0}
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "mean": statistics.fmean(ordered),
+        "p50": ordered[int(0.5 * (len(ordered) - 1))],
+        "p90": ordered[int(0.9 * (len(ordered) - 1))],
+        "max": ordered[-1]
+    }
+
+def summarize(events: List[dict], chains: Dict[int, List[str]], confirmed_txs: int, duration: float) -> SimulationReport:
+    """Reduce raw node events and final chains into a SimulationReport."""
+    tips = Counter(chain[-1] for chain in chains.values())
+    longest = max(len(chain) for chain in chains.values())
+    best_tip = max(
+        (chain[-1] for chain in chains.values() if len(chain) == longest), key=lambda tip: tips[tip]
+    )
+    best_chain = next(chain for chain in chains.values() if chain[-1] == best_tip)
+    best = set(best_chain)
+
+    mined = {e["hash"]: e for e in events if e["event"] == "mined"}
+    received = [e for e in events if e["event"] == "received"]
+    stale = [h for h in mined if h not in best]
+    orphans = [e for e in received if e["orphan"]]
+
+    first_seen: Dict[Tuple[str, int], float] = {}
+    for e in received:
+        key = (e["hash"], e["node"])
+        first_seen[key] = min(first_seen.get(key, e["t"]), e["t"])
+    per_node = []
+    per_block: Dict[str, float] = {}
+    for (block_hash, _), seen_at in first_seen.items():
+        if block_hash not in mined:
+            continue
+        delay = seen_at - mined[block_hash]["t"]
+        per_node.append(delay)
+        per_block[block_hash] = max(per_block.get(block_hash, 0.0), delay)
+
+    return SimulationReport(
+        nodes=len(chains),
+        duration=duration,
+        blocks_mined=len(mined),
+        best_chain_height=len(best_chain) - 1,
+        stale_blocks=len(stale),
+        stale_rate=len(stale) / len(mined) if mined else 0.0,
+        orphan_receipts=len(orphans),
+        orphan_rate=len(orphans) / len(received) if received else 0.0,
+        reorgs=sum(1 for e in received if e["reorg"]),
+        propagation=_distribution(per_node),
+        full_propagation=_distribution(list(per_block.values())),
+        confirmed_transactions=confirmed_txs,
+        tx_throughput=confirmed_txs / duration if duration else 0.0,
+        block_rate=(len(best_chain) - 1) / duration if duration else 0.0,
+        converged=len(tips) == 1
+    )
+
+def _random_transaction(rng: random.Random, origin: int) -> Transaction:
+    return Transaction(
+        sender=f"sim_{origin}_{rng.randint(1000, 9999)}",
+        receiver=f"sim_{rng.randint(1000, 9999)}",
+        amount=round(rng.uniform(1, 10), 4),
+        data=f"sim tx {rng.getrandbits(32):08x}",
+        timestamp=time.time()
+    )
+
+def _run_tx_injector(nodes: List[SimNode], tx_rate: float, stop: threading.Event, seed: Optional[int]) -> None:
+    rng = random.Random(seed)
+    while tx_rate > 0 and not stop.wait(rng.expovariate(tx_rate)):
+        node = rng.choice(nodes)
+        node.submit_transaction(_random_transaction(rng, node.node_id))
+
+def _confirmed_count(blocks: List[Block]) -> int:
+    return sum(1 for block in blocks for tx in block.transactions if tx.sender != "network")
+
+class Simulation:
+    """Runs K nodes for a fixed duration and summarizes what happened on the wire."""
+
+    def __init__(self,
+                 nodes: int = 4,
+                 topology: str = "full",
+                 link_model: Optional[LinkModel] = None,
+                 difficulty: int = 4,
+                 tx_rate: float = 0.0,
+                 mode: str = "thread",
+                 degree: int = 3,
+                 base_port: int = 0,
+                 seed: Optional[int] = None):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown mode: {mode}")
+        self.k = nodes
+        self.topology = build_topology(topology, nodes, degree=degree, seed=seed)
+        self.link_model = link_model or LinkModel()
+        self.difficulty = difficulty
+        self.tx_rate = tx_rate
+        self.mode = mode
+        self.base_port = base_port
+        self.seed = seed
+        self.logger = logging.getLogger("triadnet.simulator")
+
+    def run(self, duration: float) -> SimulationReport:
+        if self.mode == "thread":
+            return self._run_threads(duration)
+        return self._run_processes(duration)
+
+    def _run_threads(self, duration: float) -> SimulationReport:
+        nodes: List[SimNode] = []
+        router = LatencyRouter(
+            self.link_model, lambda src, dst, msg: nodes[dst].handle_message(src, msg), seed=self.seed
+        )
+        genesis_timestamp = time.time()
+        nodes.extend(
+            SimNode(i, self.topology[i], router.send, difficulty=self.difficulty,
+                    genesis_timestamp=genesis_timestamp, seed=self.seed)
+            for i in range(self.k)
+        )
+        stop = threading.Event()
+        injector = threading.Thread(
+            target=_run_tx_injector, args=(nodes, self.tx_rate, stop, self.seed), daemon=True
+        )
+        router.start()
+        started = time.time()
+        for node in nodes:
+            node.start()
+        injector.start()
+        stop.wait(duration)
+        stop.set()
+        for node in nodes:
+            node.stop()
+        elapsed = time.time() - started
+        # Let in-flight blocks land before reading final chains.
+        time.sleep(self._drain_time())
+        router.stop()
+        injector.join()
+
+        events = [e for node in nodes for e in node.events]
+        chains = {node.node_id: node.chain_hashes() for node in nodes}
+        reference = max(nodes, key=lambda node: len(node.blockchain.chain))
+        return summarize(events, chains, _confirmed_count(reference.blockchain.chain), elapsed)
+
+    def _run_processes(self, duration: float) -> SimulationReport:
+        ports = _free_ports(self.k) if not self.base_port else [self.base_port + i for i in range(self.k)]
+        genesis_timestamp = time.time()
+        procs = []
+        for i in range(self.k):
+            config = {
+                "node_id": i,
+                "port": ports[i],
+                "peers": {str(j): ports[j] for j in self.topology[i]},
+                "difficulty": self.difficulty,
+                "genesis_timestamp": genesis_timestamp,
+                "duration": duration,
+                "drain": self._drain_time(),
+                "tx_rate": self.tx_rate / self.k,
+                "latency": self.link_model.latency,
+                "jitter": self.link_model.jitter,
+                "overrides": [[a, b, v] for (a, b), v in self.link_model.overrides.items()],
+                "seed": self.seed
+            }
+            procs.append(subprocess.Popen(
+                [sys.executable, "-m", "triadnet.simulator", "node", json.dumps(config)],
+                stdout=subprocess.PIPE, text=True
+            ))
+        events: List[dict] = []
+        chains: Dict[int, List[str]] = {}
+        confirmed: Dict[int, int] = {}
+        elapsed = duration
+        for i, proc in enumerate(procs):
+            out, _ = proc.communicate()
+            for line in out.splitlines():
+                record = json.loads(line)
+                if record["event"] == "final":
+                    chains[i] = record["chain"]
+                    confirmed[i] = record["confirmed_transactions"]
+                    elapsed = record["elapsed"]
+                else:
+                    events.append(record)
+            if i not in chains:
+                raise RuntimeError(f"Simulator node {i} exited with code {proc.returncode}")
+        reference = max(chains, key=lambda i: len(chains[i]))
+        return summarize(events, chains, confirmed[reference], elapsed)
+
+    def _drain_time(self) -> float:
+        worst = max([self.link_model.latency] + list(self.link_model.overrides.values()))
+        return (worst + self.link_model.jitter) * max(1, self.k - 1) + 0.1
+
+def _free_ports(k: int) -> List[int]:
+    sockets = []
+    try:
+        for _ in range(k):
+            s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            s.bind(("127.0.0.1", 0))
+            sockets.append(s)
+        return [s.getsockname()[1] for s in sockets]
+    finally:
+        for s in sockets:
+            s.close()
+
+class SocketTransport:
+    """JSON-lines over loopback TCP, one persistent outgoing connection per peer."""
+
+    def __init__(self, node_id: int, port: int, peers: Dict[int, int], host: str = "127.0.0.1"):
+        self.node_id = node_id
+        self.host = host
+        self.port = port
+        self.peers = peers
+        self.handler: Optional[Callable[[int, dict], None]] = None
+        self._conns: Dict[int, socket.socket] = {}
+        self._running = False
+        self._server: Optional[socket.socket] = None
+
+    def start(self) -> None:
+        self._running = True
+        self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._server.bind((self.host, self.port))
+        self._server.listen()
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+
+    def stop(self) -> None:
+        self._running = False
+        for conn in self._conns.values():
+            conn.close()
+        if self._server:
+            self._server.close()
+
+    def deliver(self, src: int, dst: int, message: dict) -> None:
+        conn = self._conns.get(dst)
+        if conn is None:
+            conn = self._connect(self.peers[dst])
+            conn.sendall((json.dumps({"hello": src}) + "\n").encode())
+            self._conns[dst] = conn
+        conn.sendall((json.dumps(message) + "\n").encode())
+
+    def _connect(self, port: int, attempts: int = 50) -> socket.socket:
+        for _ in range(attempts):
+            try:
+                return socket.create_connection((self.host, port), timeout=5)
+            except ConnectionRefusedError:
+                time.sleep(0.1)
+        raise ConnectionRefusedError(f"Peer on port {port} never came up")
+
+    def _accept_loop(self) -> None:
+        while self._running:
+            try:
+                client, _ = self._server.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._read_loop, args=(client,), daemon=True).start()
+
+    def _read_loop(self, client: socket.socket) -> None:
+        with client, client.makefile("r") as reader:
+            src = json.loads(reader.readline())["hello"]
+            for line in reader:
+                if self.handler:
+                    self.handler(src, json.loads(line))
+
+def _run_node_process(config: dict) -> None:
+    node_id = config["node_id"]
+    peers = {int(j): port for j, port in config["peers"].items()}
+    transport = SocketTransport(node_id, config["port"], peers)
+    link_model = LinkModel(
+        latency=config["latency"],
+        jitter=config["jitter"],
+        overrides={(a, b): v for a, b, v in config["overrides"]}
+    )
+    # Each process draws its own transaction stream, like SimNode does for coordinates.
+    tx_seed = None if config["seed"] is None else config["seed"] + node_id
+    router = LatencyRouter(link_model, transport.deliver, seed=config["seed"])
+    node = SimNode(node_id, set(peers), router.send, difficulty=config["difficulty"],
+                   genesis_timestamp=config["genesis_timestamp"], seed=config["seed"])
+    transport.handler = node.handle_message
+    transport.start()
+    router.start()
+    stop = threading.Event()
+    injector = threading.Thread(
+        target=_run_tx_injector, args=([node], config["tx_rate"], stop, tx_seed), daemon=True
+    )
+    started = time.time()
+    node.start()
+    injector.start()
+    stop.wait(config["duration"])
+    stop.set()
+    node.stop()
+    elapsed = time.time() - started
+    time.sleep(config["drain"])
+    router.stop()
+    transport.stop()
+
+    for event in node.events:
+        print(json.dumps(event))
+    print(json.dumps({
+        "event": "final",
+        "chain": node.chain_hashes(),
+        "confirmed_transactions": _confirmed_count(node.blockchain.chain),
+        "elapsed": elapsed
+    }))
+
+def main(argv: Optional[List[str]] = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == "node":
+        # Node processes inherit the parent's stderr; stdout carries their events.
+        configure_logging()
+        _run_node_process(json.loads(argv[1]))
+        return
+    parser = argparse.ArgumentParser(description="Run a local TriadNet multi-node simulation")
+    parser.add_argument("--nodes", type=int, default=4)
+    parser.add_argument("--topology", choices=TOPOLOGIES, default="full")
+    parser.add_argument("--degree", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.05, help="one-way link latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--difficulty", type=int, default=4)
+    parser.add_argument("--tx-rate", type=float, default=0.0, help="transactions per second, network-wide")
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--mode", choices=("thread", "process"), default="thread")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--log-file", help="write JSON-lines logs here instead of stderr")
+    args = parser.parse_args(argv)
+    configure_logging(path=args.log_file)
+    simulation = Simulation(
+        nodes=args.nodes,
+        topology=args.topology,
+        link_model=LinkModel(latency=args.latency, jitter=args.jitter),
+        difficulty=args.difficulty,
+        tx_rate=args.tx_rate,
+        mode=args.mode,
+        degree=args.degree,
+        seed=args.seed
+    )
+    print(json.dumps(simulation.run(args.duration).to_dict(), indent=2))
+
+if __name__ == "__main__":
+    main()
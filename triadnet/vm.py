@@ -1,4 +1,447 @@
-from triadnet.types import List, Dict, Any
+"""Triad Virtual Machine: a stack-based bytecode interpreter for contracts.
 
-class TVM:
+Words are unsigned 256-bit integers. Binary operators take their operands in
+push order, so `PUSH 7 PUSH 2 SUB` leaves 5. Every opcode has a fixed gas
+cost; memory is charged per 32-byte word as it grows and is capped at
+MAX_MEMORY. Contract code is decoded and its jump destinations validated once,
+then cached by code hash so repeated calls go straight to execution.
+"""
+
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+WORD_BITS = 256
+MASK = (1 << WORD_BITS) - 1
+MAX_STACK = 1024
+MAX_MEMORY = 64 * 1024
+MEMORY_WORD_GAS = 3
+DEFAULT_GAS_LIMIT = 1_000_000
+DEFAULT_CACHE_SIZE = 256
+HALT = -1
+
+class Opcode(IntEnum):
+    STOP = 0x00
+    ADD = 0x01
+    MUL = 0x02
+    SUB = 0x03
+    DIV = 0x04
+    MOD = 0x06
+    LT = 0x10
+    GT = 0x11
+    EQ = 0x14
+    ISZERO = 0x15
+    AND = 0x16
+    OR = 0x17
+    XOR = 0x18
+    NOT = 0x19
+    SHA256 = 0x20
+    CALLER = 0x33
+    CALLVALUE = 0x34
+    CALLDATALOAD = 0x35
+    CALLDATASIZE = 0x36
+    POP = 0x50
+    MLOAD = 0x51
+    MSTORE = 0x52
+    SLOAD = 0x54
+    SSTORE = 0x55
+    JUMP = 0x56
+    JUMPI = 0x57
+    JUMPDEST = 0x5B
+    PUSH = 0x60
+    DUP = 0x80
+    SWAP = 0x90
+    LOG = 0xA0
+    RETURN = 0xF3
+    REVERT = 0xFD
+
+class VMError(Exception):
+    pass
+
+class InvalidCode(VMError):
+    pass
+
+class OutOfGas(VMError):
+    pass
+
+class StackError(VMError):
+    pass
+
+class InvalidJump(VMError):
     pass
+
+@dataclass
+class Program:
+    """Decoded contract code: (gas, handler, immediate) per instruction."""
+    code_hash: str
+    instructions: List[Tuple[int, Callable, Any]]
+    jumpdests: Dict[int, int]
+
+@dataclass
+class ExecutionResult:
+    success: bool
+    gas_used: int
+    steps: int
+    output: bytes = b""
+    logs: List[bytes] = field(default_factory=list)
+    storage_writes: Dict[int, int] = field(default_factory=dict)
+    error: Optional[str] = None
+
+class Frame:
+    __slots__ = ("program", "stack", "memory", "storage", "writes", "logs",
+                 "caller", "value", "calldata", "gas", "output", "reverted")
+
+    def __init__(self, program: Program, storage: Dict[int, int], caller: int, value: int,
+                 calldata: bytes, gas: int):
+        self.program = program
+        self.stack: List[int] = []
+        self.memory = bytearray()
+        self.storage = storage
+        self.writes: Dict[int, int] = {}
+        self.logs: List[bytes] = []
+        self.caller = caller
+        self.value = value
+        self.calldata = calldata
+        self.gas = gas
+        self.output = b""
+        self.reverted = False
+
+    def expand(self, end: int) -> None:
+        if end <= len(self.memory):
+            return
+        if end > MAX_MEMORY:
+            raise VMError(f"Memory access at {end} exceeds {MAX_MEMORY} bytes")
+        words = (end + 31) // 32
+        self.gas -= (words - len(self.memory) // 32) * MEMORY_WORD_GAS
+        if self.gas < 0:
+            raise OutOfGas("Out of gas expanding memory")
+        self.memory.extend(bytes(words * 32 - len(self.memory)))
+
+def address_word(address: str) -> int:
+    return int.from_bytes(hashlib.sha256(address.encode()).digest(), "big")
+
+def _binary(fn: Callable[[int, int], int]) -> Callable:
+    def handler(frame: Frame, arg: Any) -> None:
+        stack = frame.stack
+        b = stack.pop()
+        a = stack.pop()
+        stack.append(fn(a, b) & MASK)
+    return handler
+
+def _stop(frame: Frame, arg: Any) -> int:
+    return HALT
+
+def _iszero(frame: Frame, arg: Any) -> None:
+    frame.stack.append(int(frame.stack.pop() == 0))
+
+def _not(frame: Frame, arg: Any) -> None:
+    frame.stack.append(~frame.stack.pop() & MASK)
+
+def _sha256(frame: Frame, arg: Any) -> None:
+    length = frame.stack.pop()
+    offset = frame.stack.pop()
+    frame.expand(offset + length)
+    digest = hashlib.sha256(frame.memory[offset:offset + length]).digest()
+    frame.stack.append(int.from_bytes(digest, "big"))
+
+def _caller(frame: Frame, arg: Any) -> None:
+    frame.stack.append(frame.caller)
+
+def _callvalue(frame: Frame, arg: Any) -> None:
+    frame.stack.append(frame.value)
+
+def _calldataload(frame: Frame, arg: Any) -> None:
+    offset = frame.stack.pop()
+    chunk = frame.calldata[offset:offset + 32] if offset < len(frame.calldata) else b""
+    frame.stack.append(int.from_bytes(chunk.ljust(32, b"\0"), "big"))
+
+def _calldatasize(frame: Frame, arg: Any) -> None:
+    frame.stack.append(len(frame.calldata))
+
+def _pop(frame: Frame, arg: Any) -> None:
+    frame.stack.pop()
+
+def _mload(frame: Frame, arg: Any) -> None:
+    offset = frame.stack.pop()
+    frame.expand(offset + 32)
+    frame.stack.append(int.from_bytes(frame.memory[offset:offset + 32], "big"))
+
+def _mstore(frame: Frame, arg: Any) -> None:
+    offset = frame.stack.pop()
+    value = frame.stack.pop()
+    frame.expand(offset + 32)
+    frame.memory[offset:offset + 32] = value.to_bytes(32, "big")
+
+def _sload(frame: Frame, arg: Any) -> None:
+    key = frame.stack.pop()
+    value = frame.writes.get(key)
+    frame.stack.append(frame.storage.get(key, 0) if value is None else value)
+
+def _sstore(frame: Frame, arg: Any) -> None:
+    key = frame.stack.pop()
+    frame.writes[key] = frame.stack.pop()
+
+def _jump_target(frame: Frame, destination: int) -> int:
+    target = frame.program.jumpdests.get(destination)
+    if target is None:
+        raise InvalidJump(f"No JUMPDEST at byte {destination}")
+    return target
+
+def _jump(frame: Frame, arg: Any) -> int:
+    return _jump_target(frame, frame.stack.pop())
+
+def _jumpi(frame: Frame, arg: Any) -> Optional[int]:
+    destination = frame.stack.pop()
+    if frame.stack.pop():
+        return _jump_target(frame, destination)
+    return None
+
+def _jumpdest(frame: Frame, arg: Any) -> None:
+    pass
+
+def _push(frame: Frame, arg: int) -> None:
+    frame.stack.append(arg)
+
+def _dup(frame: Frame, arg: int) -> None:
+    frame.stack.append(frame.stack[-arg])
+
+def _swap(frame: Frame, arg: int) -> None:
+    stack = frame.stack
+    stack[-1], stack[-1 - arg] = stack[-1 - arg], stack[-1]
+
+def _memory_slice(frame: Frame) -> bytes:
+    length = frame.stack.pop()
+    offset = frame.stack.pop()
+    frame.expand(offset + length)
+    return bytes(frame.memory[offset:offset + length])
+
+def _log(frame: Frame, arg: Any) -> None:
+    frame.logs.append(_memory_slice(frame))
+
+def _return(frame: Frame, arg: Any) -> int:
+    frame.output = _memory_slice(frame)
+    return HALT
+
+def _revert(frame: Frame, arg: Any) -> int:
+    frame.output = _memory_slice(frame)
+    frame.reverted = True
+    return HALT
+
+# opcode -> (gas, handler, immediate bytes)
+OPCODES: Dict[int, Tuple[int, Callable, int]] = {
+    Opcode.STOP: (0, _stop, 0),
+    Opcode.ADD: (3, _binary(lambda a, b: a + b), 0),
+    Opcode.MUL: (5, _binary(lambda a, b: a * b), 0),
+    Opcode.SUB: (3, _binary(lambda a, b: a - b), 0),
+    Opcode.DIV: (5, _binary(lambda a, b: a // b if b else 0), 0),
+    Opcode.MOD: (5, _binary(lambda a, b: a % b if b else 0), 0),
+    Opcode.LT: (3, _binary(lambda a, b: int(a < b)), 0),
+    Opcode.GT: (3, _binary(lambda a, b: int(a > b)), 0),
+    Opcode.EQ: (3, _binary(lambda a, b: int(a == b)), 0),
+    Opcode.ISZERO: (3, _iszero, 0),
+    Opcode.AND: (3, _binary(lambda a, b: a & b), 0),
+    Opcode.OR: (3, _binary(lambda a, b: a | b), 0),
+    Opcode.XOR: (3, _binary(lambda a, b: a ^ b), 0),
+    Opcode.NOT: (3, _not, 0),
+    Opcode.SHA256: (30, _sha256, 0),
+    Opcode.CALLER: (2, _caller, 0),
+    Opcode.CALLVALUE: (2, _callvalue, 0),
+    Opcode.CALLDATALOAD: (3, _calldataload, 0),
+    Opcode.CALLDATASIZE: (2, _calldatasize, 0),
+    Opcode.POP: (2, _pop, 0),
+    Opcode.MLOAD: (3, _mload, 0),
+    Opcode.MSTORE: (3, _mstore, 0),
+    Opcode.SLOAD: (50, _sload, 0),
+    Opcode.SSTORE: (100, _sstore, 0),
+    Opcode.JUMP: (8, _jump, 0),
+    Opcode.JUMPI: (10, _jumpi, 0),
+    Opcode.JUMPDEST: (1, _jumpdest, 0),
+    Opcode.PUSH: (3, _push, 1),
+    Opcode.DUP: (3, _dup, 1),
+    Opcode.SWAP: (3, _swap, 1),
+    Opcode.LOG: (375, _log, 0),
+    Opcode.RETURN: (0, _return, 0),
+    Opcode.REVERT: (0, _revert, 0),
+}
+
+DISPATCH: List[Optional[Tuple[int, Callable, int]]] = [OPCODES.get(op) for op in range(256)]
+
+def code_hash(code: bytes) -> str:
+    return hashlib.sha256(code).hexdigest()
+
+def decode(code: bytes) -> Program:
+    """Validate `code` and turn it into a Program; raises InvalidCode."""
+    instructions: List[Tuple[int, Callable, Any]] = []
+    jumpdests: Dict[int, int] = {}
+    pos = 0
+    while pos < len(code):
+        op = code[pos]
+        entry = DISPATCH[op]
+        if entry is None:
+            raise InvalidCode(f"Unknown opcode 0x{op:02x} at byte {pos}")
+        gas, handler, immediate = entry
+        arg: Any = None
+        if op == Opcode.JUMPDEST:
+            jumpdests[pos] = len(instructions)
+        if immediate:
+            if pos + 1 >= len(code):
+                raise InvalidCode(f"Truncated {Opcode(op).name} at byte {pos}")
+            size = code[pos + 1]
+            if op == Opcode.PUSH:
+                if not 1 <= size <= 32 or pos + 2 + size > len(code):
+                    raise InvalidCode(f"Bad PUSH width {size} at byte {pos}")
+                arg = int.from_bytes(code[pos + 2:pos + 2 + size], "big")
+                pos += 1 + size
+            else:
+                if not 1 <= size <= 16:
+                    raise InvalidCode(f"Bad {Opcode(op).name} depth {size} at byte {pos}")
+                arg = size
+                pos += 1
+        instructions.append((gas, handler, arg))
+        pos += 1
+    return Program(code_hash(code), instructions, jumpdests)
+
+def assemble(source: str) -> bytes:
+    """Assemble whitespace-separated mnemonics into bytecode.
+
+    `name:` marks a JUMPDEST label and `PUSH @name` pushes its byte offset.
+    """
+    tokens = source.split()
+    labels: Dict[str, int] = {}
+    # Label pushes are fixed-width, so the second pass sees final offsets.
+    for _ in range(2):
+        code = bytearray()
+        i = 0
+        while i < len(tokens):
+            token = tokens[i]
+            if token.endswith(":"):
+                labels[token[:-1]] = len(code)
+                code.append(Opcode.JUMPDEST)
+            elif token.upper() == "PUSH":
+                i += 1
+                operand = tokens[i]
+                if operand.startswith("@"):
+                    value, width = labels.get(operand[1:], 0), 4
+                else:
+                    value = int(operand, 0)
+                    width = max(1, (value.bit_length() + 7) // 8)
+                code += bytes([Opcode.PUSH, width]) + value.to_bytes(width, "big")
+            elif token.upper() in ("DUP", "SWAP"):
+                i += 1
+                code += bytes([Opcode[token.upper()], int(tokens[i])])
+            else:
+                code.append(Opcode[token.upper()])
+            i += 1
+    return bytes(code)
+
+class ProgramCache:
+    """LRU of decoded programs keyed by code hash."""
+
+    def __init__(self, maxsize: int = DEFAULT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._programs: "OrderedDict[str, Program]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._programs)
+
+    def load(self, code: bytes) -> Program:
+        key = code_hash(code)
+        program = self._programs.get(key)
+        if program is not None:
+            self.hits += 1
+            self._programs.move_to_end(key)
+            return program
+        self.misses += 1
+        program = decode(code)
+        self._programs[key] = program
+        while len(self._programs) > self.maxsize:
+            self._programs.popitem(last=False)
+        return program
+
+class TVM:
+    def __init__(self, cache_size: int = DEFAULT_CACHE_SIZE):
+        self.cache = ProgramCache(cache_size)
+        self.logger = logging.getLogger("triadnet.vm")
+
+    def execute(self, code: bytes, storage: Optional[Dict[int, int]] = None, caller: str = "",
+                value: int = 0, calldata: bytes = b"", gas_limit: int = DEFAULT_GAS_LIMIT) -> ExecutionResult:
+        """Run `code`; storage writes are applied to `storage` only if execution succeeds."""
+        storage = {} if storage is None else storage
+        try:
+            program = self.cache.load(code)
+        except InvalidCode as e:
+            return ExecutionResult(False, 0, 0, error=str(e))
+        frame = Frame(program, storage, address_word(caller) if caller else 0, value, calldata, gas_limit)
+        instructions = program.instructions
+        end = len(instructions)
+        pc = 0
+        steps = 0
+        try:
+            while pc < end:
+                gas, handler, arg = instructions[pc]
+                frame.gas -= gas
+                if frame.gas < 0:
+                    raise OutOfGas(f"Out of gas at instruction {pc}")
+                steps += 1
+                target = handler(frame, arg)
+                if target is None:
+                    pc += 1
+                elif target == HALT:
+                    break
+                else:
+                    pc = target
+                if len(frame.stack) > MAX_STACK:
+                    raise StackError(f"Stack overflow at instruction {pc}")
+        except IndexError:
+            return ExecutionResult(False, gas_limit, steps, error=f"Stack underflow at instruction {pc}")
+        except VMError as e:
+            return ExecutionResult(False, gas_limit, steps, error=str(e))
+        gas_used = gas_limit - frame.gas
+        if frame.reverted:
+            return ExecutionResult(False, gas_used, steps, output=frame.output, error="Reverted")
+        storage.update(frame.writes)
+        return ExecutionResult(True, gas_used, steps, frame.output, frame.logs, frame.writes)
+
+COUNTDOWN = """
+    PUSH 0 CALLDATALOAD
+    loop:
+    DUP 1 ISZERO PUSH @done JUMPI
+    PUSH 1 SUB
+    DUP 1 PUSH 0 SSTORE
+    PUSH @loop JUMP
+    done:
+    STOP
+"""
+
+def benchmark(iterations: int = 100_000, calls: int = 1000) -> Dict[str, float]:
+    """Instructions per second for one long loop, and call rate with and without the code cache."""
+    vm = TVM()
+    code = assemble(COUNTDOWN)
+    start = time.perf_counter()
+    result = vm.execute(code, calldata=iterations.to_bytes(32, "big"), gas_limit=10 ** 9)
+    elapsed = time.perf_counter() - start
+    short = (10).to_bytes(32, "big")
+    start = time.perf_counter()
+    for _ in range(calls):
+        vm.execute(code, calldata=short)
+    cached = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(calls):
+        TVM(cache_size=0).execute(code, calldata=short)
+    uncached = time.perf_counter() - start
+    return {
+        "instructions": result.steps,
+        "instructions_per_second": result.steps / elapsed,
+        "cached_calls_per_second": calls / cached,
+        "uncached_calls_per_second": calls / uncached,
+    }
+
+if __name__ == "__main__":
+    for name, value in benchmark().items():
+        print(f"{name}: {value:,.0f}")
@@ -3,12 +3,175 @@ import hashlib
 import time
 import json
 import base64
-from typing import Dict, Tuple, Optional
+import bisect
+from array import array
+from typing import Dict, Iterator, List, Tuple, Optional
 from cryptography.hazmat.primitives.asymmetric import rsa, padding
 from cryptography.hazmat.primitives import hashes, serialization
 from cryptography.exceptions import InvalidSignature
 from triadnet.models import FractalCoordinate, Transaction
 
+WALLET_FORMAT = 2
+JOURNAL_SUFFIX = ".journal"
+INDEX_SUFFIX = ".idx"
+JOURNAL_SYNC_BATCH = 256
+COMPACT_TAIL_RECORDS = 10000
+
+class TransactionJournal:
+    """Append-only JSON-lines transaction history with a lazily loaded offset index.
+
+    Records up to `compacted_bytes` are indexed by the `.idx` file written at the
+    last compaction. Opening a wallet reads neither the history nor its index;
+    when history is first used, the index is loaded and only records appended
+    since the last compaction are scanned.
+    """
+
+    def __init__(self, path: str, compacted_bytes: int = 0):
+        self.path = path
+        self.compacted_bytes = compacted_bytes
+        self._offsets: Optional[array] = None
+        self._end = 0
+        self._pending: List[str] = []
+        self._unsynced = 0
+
+    def _load_index(self) -> array:
+        if self._offsets is not None:
+            return self._offsets
+        offsets = array("Q")
+        position = 0
+        if self.compacted_bytes and os.path.exists(self.path + INDEX_SUFFIX):
+            with open(self.path + INDEX_SUFFIX, "rb") as f:
+                indexed = array("Q")
+                indexed.frombytes(f.read())
+            # The index leads with the size it covers; if a crash left it out of
+            # step with the header, fall back to scanning the whole journal.
+            if indexed and indexed[0] == self.compacted_bytes:
+                offsets = indexed[1:]
+                position = self.compacted_bytes
+        if os.path.exists(self.path):
+            with open(self.path, "rb") as f:
+                f.seek(position)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # torn write from a crash; dropped by the next flush
+                    offsets.append(position)
+                    position += len(line)
+        self._offsets = offsets
+        self._end = position
+        return offsets
+
+    def __len__(self) -> int:
+        return len(self._load_index()) + len(self._pending)
+
+    def __getitem__(self, index: int) -> Transaction:
+        offsets = self._load_index()
+        if index < 0:
+            index += len(self)
+        if index >= len(offsets):
+            return Transaction.deserialize(self._pending[index - len(offsets)])
+        with open(self.path, "rb") as f:
+            f.seek(offsets[index])
+            return Transaction.deserialize(f.readline())
+
+    def __iter__(self) -> Iterator[Transaction]:
+        self._load_index()
+        if os.path.exists(self.path):
+            with open(self.path, "rb") as f:
+                f.seek(0)
+                for _ in range(len(self._offsets)):
+                    yield Transaction.deserialize(f.readline())
+        for line in list(self._pending):
+            yield Transaction.deserialize(line)
+
+    def append(self, tx: Transaction) -> None:
+        self._pending.append(json.dumps(tx.to_dict(), separators=(",", ":")))
+
+    def flush(self, sync: bool = False) -> None:
+        """Write pending records; fsync once JOURNAL_SYNC_BATCH records are unsynced or on `sync`."""
+        offsets = self._load_index()
+        if self._pending:
+            with open(self.path, "ab") as f:
+                f.truncate(self._end)
+                for line in self._pending:
+                    data = (line + "\n").encode()
+                    f.write(data)
+                    offsets.append(self._end)
+                    self._end += len(data)
+                self._unsynced += len(self._pending)
+                self._pending = []
+                if sync or self._unsynced >= JOURNAL_SYNC_BATCH:
+                    f.flush()
+                    os.fsync(f.fileno())
+                    self._unsynced = 0
+        elif sync and self._unsynced and os.path.exists(self.path):
+            with open(self.path, "ab") as f:
+                os.fsync(f.fileno())
+            self._unsynced = 0
+
+    @property
+    def tail_records(self) -> int:
+        offsets = self._load_index()
+        return len(offsets) - bisect.bisect_left(offsets, self.compacted_bytes)
+
+    def compact(self) -> int:
+        """Drop duplicate transactions and index every record; returns the new compacted size."""
+        self.flush(sync=True)
+        seen = set()
+        offsets = array("Q")
+        position = 0
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as out, open(self.path, "rb") as journal:
+            for _ in range(len(self._offsets)):
+                line = journal.readline()
+                tx_id = json.loads(line)["tx_id"]
+                if tx_id in seen:
+                    continue
+                seen.add(tx_id)
+                offsets.append(position)
+                out.write(line)
+                position += len(line)
+            out.flush()
+            os.fsync(out.fileno())
+        # Index first, then journal; the header written by the caller commits both.
+        with open(self.path + INDEX_SUFFIX + ".tmp", "wb") as f:
+            f.write(array("Q", [position]).tobytes() + offsets.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(self.path + INDEX_SUFFIX + ".tmp", self.path + INDEX_SUFFIX)
+        os.replace(tmp, self.path)
+        self._offsets = offsets
+        self._end = self.compacted_bytes = position
+        return position
+
+def signing_message(tx: Transaction) -> bytes:
+    """The bytes a wallet signs for `tx`."""
+    message = f"{tx.tx_id}{tx.sender}{tx.receiver}{tx.amount}{tx.data}{tx.timestamp}"
+    if tx.fee:
+        # Like Transaction.calculate_hash: fee-less transactions sign as before fees existed.
+        message += f"{tx.fee}"
+    if tx.outputs is not None:
+        # One signature covers every output of a batch.
+        message += json.dumps(tx.outputs)
+    return message.encode()
+
+def verify_signature(public_key, tx: Transaction) -> bool:
+    """Check `tx.signature` against an RSA public key object."""
+    try:
+        public_key.verify(
+            base64.b64decode(tx.signature),
+            signing_message(tx),
+            padding.PSS(
+                mgf=padding.MGF1(hashes.SHA256()),
+                salt_length=padding.PSS.MAX_LENGTH
+            ),
+            hashes.SHA256()
+        )
+        return True
+    except InvalidSignature:
+        return False
+    except Exception:
+        return False
+
 class Wallet:
     def __init__(self, load_path: str = None):
         """Initialize a wallet with new or loaded keys and a fractal coordinate"""
@@ -23,6 +186,7 @@ class Wallet:
             # Initialize balance and transaction history
             self.balance = 0.0
             self.transactions = []
+            self._saved_meta: Optional[dict] = None
             
     def _generate_keypair(self) -> None:
         """Generate a proper RSA keypair for signatures"""
@@ -65,9 +229,7 @@ class Wallet:
     def sign_transaction(self, tx: Transaction) -> Transaction:
         """Sign a transaction with the wallet's private key"""
         # Create message from transaction data
-        message = (
-            f"{tx.tx_id}{tx.sender}{tx.receiver}{tx.amount}{tx.data}{tx.timestamp}"
-        ).encode()
+        message = signing_message(tx)
         
         # Sign the message using proper RSA signature
         signature = self.private_key.sign(
@@ -83,26 +245,56 @@ class Wallet:
         tx.signature = base64.b64encode(signature).decode()
         return tx
         
-    def create_transaction(self, receiver: str, amount: float, data: str = "") -> Transaction:
+    def create_transaction(self, receiver: str, amount: float, data: str = "", fee: float = 0.0) -> Transaction:
         """Create and sign a new transaction"""
         if amount <= 0:
             raise ValueError("Transaction amount must be positive")
+
+        if fee < 0:
+            raise ValueError("Transaction fee cannot be negative")
             
-        if self.balance < amount:
+        if self.balance < amount + fee:
             raise ValueError("Insufficient funds")
             
         tx = Transaction(
-            tx_id=f"tx-{int(time.time())}-{os.urandom(4).hex()}",
             sender=self.address,
             receiver=receiver,
             amount=amount,
             data=data,
-            timestamp=time.time()
+            timestamp=time.time(),
+            fee=fee
         )
         
         # Sign the transaction
-        return self.sign_transaction(tx)
+        tx = self.sign_transaction(tx)
+        return tx
     
+    def create_batch_transaction(self, outputs: List[Tuple[str, float]], data: str = "",
+                                 fee: float = 0.0) -> Transaction:
+        """Create one transaction, under one signature, paying every (receiver, amount) in `outputs`"""
+        if not outputs:
+            raise ValueError("Batch transaction needs at least one output")
+
+        if any(amount <= 0 for _, amount in outputs):
+            raise ValueError("Transaction amount must be positive")
+
+        if fee < 0:
+            raise ValueError("Transaction fee cannot be negative")
+
+        tx = Transaction.batch(
+            self.address,
+            outputs,
+            data,
+            timestamp=time.time(),
+            fee=fee
+        )
+
+        if self.balance < tx.amount + fee:
+            raise ValueError("Insufficient funds")
+
+        tx = self.sign_transaction(tx)
+        return tx
+
     def verify_transaction(self, tx: Transaction) -> bool:
         """Verify a transaction's signature using the sender's public key (mainly for demonstration)"""
         # This would normally need to retrieve the sender's public key from a directory or chain
@@ -112,43 +304,55 @@ class Wallet:
             # In a real system, you'd look up the sender's public key
             return False
             
-        message = (
-            f"{tx.tx_id}{tx.sender}{tx.receiver}{tx.amount}{tx.data}{tx.timestamp}"
-        ).encode()
-        
-        try:
-            # Decode the base64 signature
-            signature = base64.b64decode(tx.signature)
-            
-            # Verify the signature
-            self.public_key.verify(
-                signature,
-                message,
-                padding.PSS(
-                    mgf=padding.MGF1(hashes.SHA256()),
-                    salt_length=padding.PSS.MAX_LENGTH
-                ),
-                hashes.SHA256()
-            )
-            return True
-        except InvalidSignature:
-            return False
-        except Exception:
-            return False
+        return verify_signature(self.public_key, tx)
     
-    def save(self, path: str) -> None:
-        """Save wallet to a file (warning: unencrypted)"""
-        wallet_data = {
+    def record_transaction(self, tx: Transaction) -> None:
+        """Add a transaction to the wallet history; it reaches disk on the next save.
+
+        Creating a transaction does not record it: callers record it once it is
+        actually sent, so abandoned or rejected transactions stay out of history."""
+        self.transactions.append(tx)
+
+    def _metadata(self) -> dict:
+        return {
+            "format": WALLET_FORMAT,
             "address": self.address,
             "private_key": self._private_pem.decode(),
             "public_key": self._public_pem.decode(),
             "fractal_coord": self.fractal_coord.to_dict(),
-            "balance": self.balance,
-            "transactions": [json.loads(tx.serialize()) for tx in self.transactions]
+            "balance": self.balance
         }
-        
-        with open(path, 'w') as f:
-            json.dump(wallet_data, f, indent=2)
+
+    def save(self, path: str, sync: bool = False) -> None:
+        """Save wallet to a file (warning: unencrypted)
+
+        The header at `path` holds keys and metadata and is only rewritten when
+        they change; history is appended to `path.journal`.
+        """
+        journal = self.transactions
+        if not isinstance(journal, TransactionJournal) or journal.path != path + JOURNAL_SUFFIX:
+            # First save to this path: start a fresh journal from the in-memory history.
+            history = list(journal)
+            journal = TransactionJournal(path + JOURNAL_SUFFIX)
+            for stale in (journal.path, journal.path + INDEX_SUFFIX):
+                if os.path.exists(stale):
+                    os.remove(stale)
+            for tx in history:
+                journal.append(tx)
+            self.transactions = journal
+            self._saved_meta = None
+        journal.flush(sync=sync)
+        if journal.tail_records >= COMPACT_TAIL_RECORDS:
+            journal.compact()
+            self._saved_meta = None
+        meta = dict(self._metadata(), journal={"compacted_bytes": journal.compacted_bytes})
+        if meta != self._saved_meta:
+            with open(f"{path}.tmp", "w") as f:
+                json.dump(meta, f, separators=(",", ":"))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(f"{path}.tmp", path)
+            self._saved_meta = meta
     
     def _load_wallet(self, path: str) -> None:
         """Load wallet from a file"""
@@ -173,10 +377,15 @@ class Wallet:
         self.fractal_coord = FractalCoordinate.from_dict(wallet_data["fractal_coord"])
         self.balance = wallet_data["balance"]
         
-        # Load transaction history
-        self.transactions = []
-        for tx_data in wallet_data.get("transactions", []):
-            self.transactions.append(Transaction.deserialize(json.dumps(tx_data)))
+        if "transactions" in wallet_data:
+            # Pre-journal format: history is inline and moves to a journal on the next save
+            self.transactions = [Transaction.from_dict(tx) for tx in wallet_data["transactions"]]
+            self._saved_meta = None
+            return
+        # History stays on disk until something reads it
+        journal_meta = wallet_data.get("journal", {})
+        self.transactions = TransactionJournal(path + JOURNAL_SUFFIX, journal_meta.get("compacted_bytes", 0))
+        self._saved_meta = wallet_data
     
     def update_balance(self, blockchain) -> float:
         """Update wallet balance from blockchain"""